@@ -7,12 +7,13 @@ Metasequoia 启动主逻辑
 3. 接受、处理启动模式
 4. TODO 提供数据源管理器
 5. TODO 提供配置和日志管理器
+6. 可选地在部署后预热并定期刷新全部数据源的元数据缓存
 """
 
 __all__ = ["MetaSequoiaApplication"]
 
 import collections
-from typing import Optional, Union, Type, List, Dict
+from typing import Any, Optional, Union, Type, List, Dict
 
 import streamlit_app
 from metasequoia.application.main_page import MainPage
@@ -23,6 +24,8 @@ from metasequoia.core.plugin import PluginBase
 class MetaSequoiaApplication(streamlit_app.Application):
     """Metasequoia 的启动主逻辑"""
 
+    DEV_SECTION = "开发工具"  # 开发模式下自动添加的页面所在的分组
+
     def __init__(self,
                  mode: Union[str, ApplicationMode],
                  deploy_dir: Optional[str] = None,
@@ -36,6 +39,7 @@ class MetaSequoiaApplication(streamlit_app.Application):
 
         self._application_name: Optional[str] = None
         self._sections: Dict[str, List[Type[PluginBase]]] = collections.defaultdict(list)  # 分组列表
+        self._warm_up_params: Optional[Dict[str, Any]] = None  # 元数据预热参数，为 None 时不预热
 
     @property
     def mode(self) -> ApplicationMode:
@@ -45,6 +49,18 @@ class MetaSequoiaApplication(streamlit_app.Application):
         """设置应用名称"""
         self._application_name = application_name
 
+    def enable_warm_up(self, max_workers: int = 4, refresh_interval: float = 600) -> None:
+        """启用元数据预热：部署后在后台并发预热配置文件中全部数据源的元数据缓存，并定期刷新
+
+        Parameters
+        ----------
+        max_workers : int, default = 4
+            最大并发数
+        refresh_interval : float, default = 600
+            两次预热之间的间隔（秒）
+        """
+        self._warm_up_params = {"max_workers": max_workers, "refresh_interval": refresh_interval}
+
     def add_plugin(self, section: str, plugin: Type[PluginBase]) -> None:
         """添加插件
 
@@ -72,6 +88,12 @@ class MetaSequoiaApplication(streamlit_app.Application):
         self.set_main_page(MainPage, params=main_page_params)
 
     def deploy(self):
+        # 开发模式下自动添加缓存及连接池统计页面
+        if self.mode.is_dev:
+            from metasequoia.plugins.cache_stats.plugin_main import PluginCacheStats  # 延迟引用，避免循环引用
+            if PluginCacheStats not in self._sections[self.DEV_SECTION]:
+                self.add_plugin(self.DEV_SECTION, PluginCacheStats)
+
         # 将插件中的页面添加到 Streamlit-app 中
         for plugin_list in self._sections.values():
             for plugin in plugin_list:
@@ -80,5 +102,11 @@ class MetaSequoiaApplication(streamlit_app.Application):
         # 设置主页
         self.create_main_page()
 
+        # 启动元数据预热（后台线程，在部署逻辑阻塞期间持续运行）
+        if self._warm_up_params is not None:
+            from metasequoia.application.warm_up import MetadataWarmUp  # 延迟引用，避免在未启用预热时加载数据源依赖
+            from metasequoia.core.config import configuration
+            MetadataWarmUp(configuration, **self._warm_up_params).start()
+
         # 执行部署逻辑
         super().deploy()
@@ -0,0 +1,132 @@
+"""
+应用启动时的元数据预热
+
+在部署进程中枚举配置文件中的全部数据源，并发刷新 cache_data 中各函数的持久化缓存（persistent_cache），然后定期重新刷新。
+因为持久化缓存可以跨进程共享，所以 Streamlit 服务进程中的页面在首次访问时即可命中已预热的缓存。
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, List, Optional, Tuple
+
+from metasequoia.core.config import Configuration
+
+__all__ = ["MetadataWarmUp"]
+
+LOGGER = logging.getLogger(__name__)
+
+# 预热任务：(任务名称, 执行函数)；执行函数返回需要继续执行的后续任务
+WarmUpTask = Tuple[str, Callable[[], List["WarmUpTask"]]]
+
+
+def _refresh(cached_func: Callable, *args) -> Any:
+    """刷新 cache_data 中函数的持久化缓存（跳过进程内缓存）"""
+    persistent_func = getattr(cached_func, "__wrapped__", cached_func)
+    return persistent_func.refresh(*args)
+
+
+class MetadataWarmUp:
+    """并发预热配置文件中全部数据源的元数据，并定期刷新"""
+
+    def __init__(self, configuration: Configuration, max_workers: int = 4, refresh_interval: float = 600):
+        """
+
+        Parameters
+        ----------
+        configuration : Configuration
+            配置信息
+        max_workers : int, default = 4
+            最大并发数
+        refresh_interval : float, default = 600
+            两次预热之间的间隔（秒）
+        """
+        self._configuration = configuration
+        self._max_workers = max_workers
+        self._refresh_interval = refresh_interval
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """启动后台预热线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metadata-warm-up", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台预热线程"""
+        self._stop_event.set()
+
+    def run_once(self) -> None:
+        """执行一轮预热，执行完成全部任务（包括后续任务）后返回"""
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="metadata-warm-up") as executor:
+            futures = {executor.submit(func): name for name, func in self.list_tasks()}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    try:
+                        follow_up_tasks = future.result()
+                    except Exception as error:  # 单个数据源预热失败不影响其他数据源
+                        LOGGER.warning("元数据预热失败: %s (%s)", name, error)
+                        continue
+                    for follow_up_name, follow_up_func in follow_up_tasks:
+                        futures[executor.submit(follow_up_func)] = follow_up_name
+
+    def list_tasks(self) -> List[WarmUpTask]:
+        """枚举配置文件中全部数据源的预热任务"""
+        from metasequoia.components import cache_data  # 延迟引用，避免在未使用预热时加载数据源依赖
+
+        configuration = self._configuration
+        tasks: List[WarmUpTask] = []
+
+        for name in configuration.get_rds_list():
+            rds_instance = configuration.get_rds_instance(name)
+
+            def warm_up_rds(rds_instance=rds_instance) -> List[WarmUpTask]:
+                _refresh(cache_data.load_rds_catalog, rds_instance)
+                _refresh(cache_data.show_databases, rds_instance)
+                return []
+
+            tasks.append((f"RDS {name}", warm_up_rds))
+
+        for name in configuration.get_kafka_list():
+            kafka_server = configuration.get_kafka_server(name)
+            tasks.append((f"Kafka {name} topics",
+                          lambda kafka_server=kafka_server: self._no_follow_up(
+                              _refresh(cache_data.kafka_list_topics, kafka_server))))
+            tasks.append((f"Kafka {name} consumer groups",
+                          lambda kafka_server=kafka_server: self._no_follow_up(
+                              _refresh(cache_data.kafka_list_consumer_groups, kafka_server))))
+
+        for name in configuration.get_hive_list():
+            hive_instance = configuration.get_hive_instance(name)  # 不带用户名，与 cache_data.hive_catalog 使用的缓存一致
+            tasks.append((f"Hive {name} tables",
+                          lambda hive_instance=hive_instance: self._no_follow_up(
+                              _refresh(cache_data.hive_list_tables, hive_instance))))
+
+        for name in configuration.get_dolphin_meta_list():
+            instance = configuration.get_dolphin_meta_instance(name)
+
+            def warm_up_dolphin(instance=instance, name=name) -> List[WarmUpTask]:
+                projects = _refresh(cache_data.dolphin_meta_list_projects, instance)
+                return [(f"DolphinMeta {name} processes of {project['code']}",
+                         lambda project_code=project["code"]: self._no_follow_up(
+                             _refresh(cache_data.dolphin_meta_list_processes, instance, project_code)))
+                        for project in projects]
+
+            tasks.append((f"DolphinMeta {name} projects", warm_up_dolphin))
+
+        return tasks
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._stop_event.wait(self._refresh_interval)
+
+    @staticmethod
+    def _no_follow_up(_: Any) -> List[WarmUpTask]:
+        return []
@@ -1,95 +1,242 @@
 """
-使用 streamlit 缓存的工具函数
+使用缓存的工具函数
+
+各函数在带统计信息的进程内缓存（memory_cache）之下使用 persistent_cache 持久化缓存，使重新部署后的首次访问可以直接使用上次的结果；
+数据源变化后可以使用 invalidate_rds_instance、invalidate_kafka_server 只失效指定数据源的缓存（包括持久化缓存）。
+索引、目录等进程内共享的有状态对象使用 st.cache_resource 保存，不计入缓存统计
 """
 
 import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 import streamlit as st
 
+from metasequoia.components.memory_cache import memory_cache
+from metasequoia.components.persistent_cache import persistent_cache
 from metasequoia.connector.dolphin_meta_connector import DolphinMetaInstance
+from metasequoia.connector.hive_connector import HiveInstance, HiveTable
 from metasequoia.connector.kafka_connector import KafkaServer, KafkaTopic
 from metasequoia.connector.rds_connector import RdsInstance
 from metasequoia.connector.ssh_tunnel import SshTunnel
-from metasequoia.core.config import Configuration, PROPERTIES_PATH
+from metasequoia.core.config import Configuration, configuration
 from metasequoia.utils import dolphin_util
+from metasequoia.utils import hive_catalog_util
+from metasequoia.utils import hive_partition_util
+from metasequoia.utils.dolphin_lineage_util import DolphinLineageIndex
 from metasequoia.utils import kafka_util
+from metasequoia.utils.kafka_lag_util import KafkaLagSampler
 from metasequoia.utils import mysql_util
+from metasequoia.utils.search_util import SearchIndex
 
-__all__ = ["load_configuration", "show_databases", "show_tables", "show_create_table",
-           "kafka_list_topics", "kafka_list_consumer_groups", "kafka_get_topic_configs"]
+__all__ = ["load_configuration", "load_rds_catalog", "list_database_and_table",
+           "show_databases", "show_tables", "show_create_table",
+           "kafka_list_topics", "kafka_list_consumer_groups", "kafka_get_topic_configs", "kafka_lag_sampler",
+           "invalidate_rds_instance", "invalidate_kafka_server",
+           "hive_list_tables", "hive_catalog", "hive_partition_index",
+           "rds_table_search_index", "kafka_topic_search_index", "kafka_group_search_index", "hive_table_search_index",
+           "dolphin_process_name_resolver", "dolphin_lineage_index"]
 
 
 # ---------- 配置文件函数 ----------
 
-@st.cache_resource
-def load_configuration():
-    return Configuration(PROPERTIES_PATH)  # 读取配置信息
+def load_configuration() -> Configuration:
+    """获取配置信息的单例（配置文件在首次读取时加载，修改后自动重新加载）"""
+    return configuration
 
 
 # ---------- Mysql 工具函数 ----------
 
-@st.cache_data(ttl=datetime.timedelta(minutes=30), max_entries=128, hash_funcs={RdsInstance: hash, SshTunnel: hash})
+@memory_cache(ttl=datetime.timedelta(minutes=30), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=30))
+def load_rds_catalog(rds_instance: RdsInstance) -> mysql_util.RdsCatalog:
+    """获取 RDS 实例的库表目录（memory_cache 命中时不复制，所有调用方共享同一个目录）"""
+    return mysql_util.load_catalog(rds_instance)
+
+
 def list_database_and_table(rds_instance: RdsInstance, ignore_schema: List[str] = None):
-    if ignore_schema is not None:
-        ignore_schema_set = set(ignore_schema)
-    else:
-        ignore_schema_set = {"information_schema", "performance_schema", "sys"}
-
-    result = []
-    for schema in show_databases(rds_instance):
-        if schema in ignore_schema_set:
-            continue
-        for table in show_tables(rds_instance, schema=schema):
-            result.append({
-                "schema": schema,
-                "table": table
-            })
-    return result
-
-
-@st.cache_data(ttl=datetime.timedelta(minutes=30), max_entries=128, hash_funcs={RdsInstance: hash, SshTunnel: hash})
+    if ignore_schema is None:
+        ignore_schema = ["information_schema", "performance_schema", "sys"]
+
+    catalog = load_rds_catalog(rds_instance)
+    return [{"schema": schema, "table": table}
+            for schema in catalog.schemas(ignore_schema)
+            for table in catalog.tables(schema)]
+
+
+@memory_cache(ttl=datetime.timedelta(minutes=30), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=30))
 def show_databases(rds_instance: RdsInstance):
     return mysql_util.show_databases(rds_instance)
 
 
-@st.cache_data(ttl=datetime.timedelta(minutes=30), max_entries=128, hash_funcs={RdsInstance: hash, str: hash})
+@memory_cache(ttl=datetime.timedelta(minutes=30), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=30))
 def show_tables(rds_instance: RdsInstance, schema: str):
     return mysql_util.show_tables(rds_instance, schema)
 
 
-@st.cache_data(ttl=datetime.timedelta(minutes=30), max_entries=128,
-               hash_funcs={RdsInstance: hash, SshTunnel: hash, str: hash})
+@memory_cache(ttl=datetime.timedelta(minutes=30), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=30), stale_ttl=datetime.timedelta(minutes=10))
 def show_create_table(rds_instance: RdsInstance, schema: str, table: str, ssh_tunnel: Optional[SshTunnel] = None):
     return mysql_util.show_create_table(rds_instance, schema, table, ssh_tunnel)
 
 
+def invalidate_rds_instance(rds_instance: RdsInstance) -> None:
+    """失效 RDS 实例的全部缓存"""
+    load_rds_catalog.invalidate(rds_instance)
+    show_databases.invalidate(rds_instance)
+    show_tables.invalidate_if(lambda instance, *args, **kwargs: instance == rds_instance)
+    show_create_table.invalidate_if(lambda instance, *args, **kwargs: instance == rds_instance)
+
+
 # ---------- Kafka 工具函数 ----------
 
-@st.cache_data(ttl=datetime.timedelta(minutes=30), max_entries=128, hash_funcs={KafkaServer: hash})
+@memory_cache(ttl=datetime.timedelta(minutes=10), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=10))
 def kafka_list_topics(kafka_server: KafkaServer):
     return kafka_util.list_topics(kafka_server)
 
 
-@st.cache_data(ttl=datetime.timedelta(minutes=30), max_entries=128, hash_funcs={KafkaServer: hash})
+@memory_cache(ttl=datetime.timedelta(minutes=10), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=10))
 def kafka_list_consumer_groups(kafka_server: KafkaServer):
     return kafka_util.list_consumer_groups(kafka_server)
 
 
-@st.cache_data(ttl=datetime.timedelta(minutes=30), max_entries=128, hash_funcs={KafkaTopic: hash})
+@memory_cache(ttl=datetime.timedelta(minutes=30), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=30))
 def kafka_get_topic_configs(kafka_topic: KafkaTopic):
     return kafka_util.get_topic_configs(kafka_topic)
 
 
+def invalidate_kafka_server(kafka_server: KafkaServer) -> None:
+    """失效 Kafka 集群的全部缓存"""
+    kafka_list_topics.invalidate(kafka_server)
+    kafka_list_consumer_groups.invalidate(kafka_server)
+    kafka_get_topic_configs.invalidate_if(lambda kafka_topic: kafka_topic.kafka_server == kafka_server)
+
+
+@st.cache_resource
+def kafka_lag_sampler() -> KafkaLagSampler:
+    """获取进程级共享的 Kafka 消费延迟采样器（所有 Streamlit 会话共享同一个后台采样线程）"""
+    sampler = KafkaLagSampler()
+    sampler.start()
+    return sampler
+
+
 # ---------- 海豚调度工具函数 ----------
 
-@st.cache_data(ttl=datetime.timedelta(minutes=30), max_entries=128,
-               hash_funcs={DolphinMetaInstance: hash, SshTunnel: hash})
+@memory_cache(ttl=datetime.timedelta(minutes=30), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=30))
 def dolphin_meta_list_projects(instance: DolphinMetaInstance):
     return dolphin_util.list_projects(instance)
 
 
-@st.cache_data(ttl=datetime.timedelta(minutes=30), max_entries=128,
-               hash_funcs={DolphinMetaInstance: hash, SshTunnel: hash})
+@memory_cache(ttl=datetime.timedelta(minutes=30), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=30))
 def dolphin_meta_list_processes(instance: DolphinMetaInstance, project_code: str):
     return dolphin_util.list_processes(instance, project_code)
+
+
+@st.cache_resource(max_entries=16, hash_funcs={DolphinMetaInstance: hash})
+def dolphin_process_name_resolver(instance: DolphinMetaInstance) -> dolphin_util.ProcessNameResolver:
+    """获取海豚调度工作流名称解析器（进程内共享）"""
+    return dolphin_util.ProcessNameResolver(instance)
+
+
+@st.cache_resource(max_entries=16, hash_funcs={DolphinMetaInstance: hash})
+def _dolphin_lineage_index(instance: DolphinMetaInstance) -> DolphinLineageIndex:
+    return DolphinLineageIndex(instance)
+
+
+def dolphin_lineage_index(instance: DolphinMetaInstance,
+                          max_age: datetime.timedelta = datetime.timedelta(minutes=5)) -> DolphinLineageIndex:
+    """获取海豚调度工作流血缘索引（进程内共享），距上次刷新超过 max_age 时增量刷新"""
+    index = _dolphin_lineage_index(instance)
+    index.refresh_if_stale(max_age.total_seconds())
+    return index
+
+
+# ---------- Hive 工具函数 ----------
+
+@memory_cache(ttl=datetime.timedelta(minutes=30), max_entries=128)
+@persistent_cache(ttl=datetime.timedelta(minutes=30))
+def hive_list_tables(hive_instance: HiveInstance) -> Dict[str, List[str]]:
+    """获取 Hive 实例中全部数据库的表名列表（hive_catalog 和预热均传入不带用户名的实例，以共享缓存）"""
+    return hive_catalog_util.list_tables(hive_instance)
+
+
+@st.cache_resource(max_entries=16, hash_funcs={HiveInstance: hash})
+def _hive_catalog(hive_instance: HiveInstance) -> hive_catalog_util.HiveCatalog:
+    return hive_catalog_util.HiveCatalog(hive_instance, ttl=datetime.timedelta(minutes=30).total_seconds(),
+                                         table_loader=hive_list_tables)
+
+
+def hive_catalog(hive_instance: HiveInstance) -> hive_catalog_util.HiveCatalog:
+    """获取 Hive 实例的库表目录（进程内共享），库表列表直接使用 hive_list_tables 的缓存
+
+    库表目录不区分用户：忽略 hive_instance 的用户名，使用配置文件中不带用户名的实例获取元数据，
+    使各用户与预热（MetadataWarmUp）共享同一份目录和 hive_list_tables 缓存
+    """
+    return _hive_catalog(hive_instance.with_username(None))
+
+
+@st.cache_resource(max_entries=64, hash_funcs={HiveTable: hash})
+def _hive_partition_index(hive_table: HiveTable, date_key: Optional[str], date_format: str,
+                          timezone: Optional[datetime.tzinfo]) -> hive_partition_util.HivePartitionIndex:
+    return hive_partition_util.HivePartitionIndex(hive_table, date_key=date_key, date_format=date_format,
+                                                  timezone=timezone)
+
+
+def hive_partition_index(hive_table: HiveTable,
+                         date_key: Optional[str] = None,
+                         date_format: str = "%Y-%m-%d",
+                         timezone: Optional[datetime.tzinfo] = None,
+                         max_age: datetime.timedelta = datetime.timedelta(minutes=5)
+                         ) -> hive_partition_util.HivePartitionIndex:
+    """获取 Hive 表的分区索引（进程内共享），距上次刷新超过 max_age 时刷新最近日期的分区
+
+    date_key、date_format 和 timezone 含义与 HivePartitionIndex 相同，需要与表的日期分区字段一致
+    """
+    index = _hive_partition_index(hive_table, date_key, date_format, timezone)
+    index.refresh_if_stale(max_age.total_seconds())
+    return index
+
+
+# ---------- 搜索索引 ----------
+
+@st.cache_resource(max_entries=256, hash_funcs={RdsInstance: hash, HiveInstance: hash, KafkaServer: hash})
+def _search_index(kind: str, source: Any) -> SearchIndex:
+    """获取数据源的搜索索引（进程内共享，由调用方增量更新）"""
+    return SearchIndex()
+
+
+def rds_table_search_index(rds_instance: RdsInstance, schema: str) -> SearchIndex:
+    """获取 RDS 数据库中表名的搜索索引
+
+    使用目录中的表名元组而不是每次新建的列表，目录未刷新时 SearchIndex.update 可以通过对象相同直接跳过
+    """
+    index = _search_index("rds_table", (rds_instance, schema))
+    index.update(load_rds_catalog(rds_instance).table_names(schema))
+    return index
+
+
+def hive_table_search_index(hive_instance: HiveInstance, schema: str) -> SearchIndex:
+    """获取 Hive 数据库中表名的搜索索引"""
+    index = _search_index("hive_table", (hive_instance.with_username(None), schema))
+    index.update(hive_catalog(hive_instance).tables(schema))
+    return index
+
+
+def kafka_topic_search_index(kafka_server: KafkaServer) -> SearchIndex:
+    """获取 Kafka 集群中 TOPIC 的搜索索引"""
+    index = _search_index("kafka_topic", kafka_server)
+    index.update(kafka_list_topics(kafka_server))
+    return index
+
+
+def kafka_group_search_index(kafka_server: KafkaServer) -> SearchIndex:
+    """获取 Kafka 集群中消费者组的搜索索引"""
+    index = _search_index("kafka_group", kafka_server)
+    index.update(kafka_list_consumer_groups(kafka_server))
+    return index
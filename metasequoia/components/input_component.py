@@ -2,23 +2,28 @@
 用于输入的组件
 """
 
-from typing import Optional
+from typing import List, Optional
 
 import streamlit as st
 
 from metasequoia.components import cache_data
 from metasequoia.components.cache_data import kafka_list_topics, kafka_list_consumer_groups
+from metasequoia.connector.base import intern_value
 from metasequoia.connector.dolphin_meta_connector import DolphinMetaInstance
-from metasequoia.connector.hive_connector import HiveInstance, HiveTable
+from metasequoia.connector.hive_connector import HiveInstance, HiveTable, hive_connection_errors
 from metasequoia.connector.kafka_connector import KafkaServer, KafkaTopic, KafkaGroup
 from metasequoia.connector.rds_connector import RdsInstance, RdsTable
 from metasequoia.connector.ssh_tunnel import SshTunnel
+from metasequoia.utils.search_util import SearchIndex
 from streamlit_app import StreamlitPage
 
 __all__ = [
+    "input_search_select",
     "input_rds_name", "input_rds_schema", "input_rds_table_name", "input_rds_instance", "input_rds_table",
     "input_kafka_servers_name", "input_kafka_server", "input_kafka_topic", "input_kafka_group",
-    "input_hive_instance_name", "input_hive_instance", "input_hive_table",
+    "input_kafka_topic_list", "input_kafka_group_list",
+    "input_hive_instance_name", "input_hive_instance", "input_hive_schema", "input_hive_table_name",
+    "input_hive_table",
     "input_ssh_tunnel",
     # 海豚调度相关组件
     "input_dolphin_meta_name",
@@ -28,6 +33,45 @@ __all__ = [
 ]
 
 
+# ---------- 通用输入组件 ----------
+
+
+def input_search_select(label: str,
+                        index: Optional[SearchIndex],
+                        default: Optional[str] = None,
+                        max_options: int = 50) -> Optional[str]:
+    """【输入】先输入关键字搜索，再从按相关度排序的搜索结果中选择
+
+    Parameters
+    ----------
+    label : str
+        选择框的标签
+    index : Optional[SearchIndex]
+        可选项的搜索索引，为 None 时没有可选项
+    default : Optional[str], default = None
+        默认选中的值，存在于搜索索引中时作为第一个可选项
+    max_options : int, default = 50
+        最多展示的可选项数量
+    """
+    query = st.text_input(label=f"搜索{label}",
+                          value=None,
+                          placeholder="输入关键字，多个关键字使用空格分隔",
+                          key=StreamlitPage.get_streamlit_default_key())
+    if index is not None:
+        options = index.search(query, k=max_options) if query else index.names(max_options)
+        if default is not None and default in index:
+            options = [default] + [option for option in options if option != default]
+        if not query and len(index) > max_options:
+            st.caption(f"共 {len(index)} 项，仅展示前 {max_options} 项，请输入关键字搜索")
+    else:
+        options = []
+    return st.selectbox(label=label,
+                        options=options,
+                        placeholder=f"请选择{label}",
+                        index=0 if default is not None and options and options[0] == default else None,
+                        key=StreamlitPage.get_streamlit_default_key())
+
+
 # ---------- RDS 相关输入组件 ----------
 
 
@@ -45,7 +89,7 @@ def input_rds_name() -> str:
 def input_rds_schema(rds_instance: RdsInstance,
                      default_schema: Optional[str] = None) -> Optional[str]:
     """【输入】RDS 数据库名"""
-    databases = cache_data.show_databases(rds_instance) if rds_instance is not None else []
+    databases = cache_data.load_rds_catalog(rds_instance).schemas() if rds_instance is not None else []
     index = databases.index(default_schema) if default_schema is not None and default_schema in databases else None
     return st.selectbox(label="数据库",
                         options=databases,
@@ -58,13 +102,11 @@ def input_rds_table_name(rds_instance: RdsInstance,
                          schema: Optional[str],
                          default_table: Optional[str] = None) -> Optional[str]:
     """【输入】RDS 表名"""
-    tables = cache_data.show_tables(rds_instance, schema) if rds_instance is not None and schema is not None else []
-    index = tables.index(default_table) if default_table is not None and default_table in tables else None
-    return st.selectbox(label="表",
-                        options=tables,
-                        placeholder="请选择表",
-                        index=index,
-                        key=StreamlitPage.get_streamlit_default_key())
+    if rds_instance is not None and schema is not None:
+        index = cache_data.rds_table_search_index(rds_instance, schema)
+    else:
+        index = None
+    return input_search_select("表", index, default=default_table)
 
 
 def input_rds_instance(use_ssh: bool = False) -> Optional[RdsInstance]:
@@ -90,7 +132,7 @@ def input_rds_instance(use_ssh: bool = False) -> Optional[RdsInstance]:
         else:
             ssh_tunnel = None
         if host is not None and port is not None and user is not None and passwd is not None:
-            return RdsInstance(host=host, port=port, user=user, passwd=passwd, ssh_tunnel=ssh_tunnel)
+            return intern_value(RdsInstance(host=host, port=port, user=user, passwd=passwd, ssh_tunnel=ssh_tunnel))
     return None
 
 
@@ -102,7 +144,7 @@ def input_rds_table(use_ssh: bool = False,
     rds_schema = input_rds_schema(rds_instance, default_schema=default_schema)
     rds_table_name = input_rds_table_name(rds_instance, rds_schema, default_table=default_table)
     if rds_instance is not None and rds_schema is not None and rds_table_name is not None:
-        rds_table = RdsTable(rds_instance, rds_schema, rds_table_name)
+        rds_table = intern_value(RdsTable(rds_instance, rds_schema, rds_table_name))
         return rds_table
     else:
         return None
@@ -149,12 +191,8 @@ def input_kafka_server(use_ssh: bool = False) -> Optional[KafkaServer]:
 def input_kafka_topic(use_ssh: bool = False) -> Optional[KafkaTopic]:
     """【输入】Kafka Topic"""
     kafka_server = input_kafka_server(use_ssh=use_ssh)
-    topic_list = kafka_list_topics(kafka_server) if kafka_server is not None else []
-    topic = st.selectbox(label="TOPIC",
-                         options=topic_list,
-                         placeholder="请选择TOPIC",
-                         index=None,
-                         key=StreamlitPage.get_streamlit_default_key())
+    index = cache_data.kafka_topic_search_index(kafka_server) if kafka_server is not None else None
+    topic = input_search_select("TOPIC", index)
 
     if kafka_server is not None and topic is not None:
         return KafkaTopic(kafka_server=kafka_server, topic=topic)
@@ -165,12 +203,8 @@ def input_kafka_topic(use_ssh: bool = False) -> Optional[KafkaTopic]:
 def input_kafka_group(use_ssh: bool = False) -> Optional[KafkaGroup]:
     """【输入】Kafka Group"""
     kafka_server = input_kafka_server(use_ssh=use_ssh)
-    group_list = kafka_list_consumer_groups(kafka_server) if kafka_server is not None else []
-    group = st.selectbox(label="消费者组",
-                         options=group_list,
-                         placeholder="请选择消费者组",
-                         index=None,
-                         key=StreamlitPage.get_streamlit_default_key())
+    index = cache_data.kafka_group_search_index(kafka_server) if kafka_server is not None else None
+    group = input_search_select("消费者组", index)
 
     if kafka_server is not None and group is not None:
         return KafkaGroup(kafka_server=kafka_server, group=group)
@@ -178,6 +212,24 @@ def input_kafka_group(use_ssh: bool = False) -> Optional[KafkaGroup]:
         return None
 
 
+def input_kafka_topic_list(kafka_server: Optional[KafkaServer]) -> List[str]:
+    """【输入】Kafka 集群中的多个 TOPIC"""
+    topic_list = kafka_list_topics(kafka_server) if kafka_server is not None else []
+    return st.multiselect(label="TOPIC",
+                          options=topic_list,
+                          placeholder="请选择TOPIC",
+                          key=StreamlitPage.get_streamlit_default_key())
+
+
+def input_kafka_group_list(kafka_server: Optional[KafkaServer]) -> List[str]:
+    """【输入】Kafka 集群中的多个消费者组"""
+    group_list = kafka_list_consumer_groups(kafka_server) if kafka_server is not None else []
+    return st.multiselect(label="消费者组",
+                          options=group_list,
+                          placeholder="请选择消费者组",
+                          key=StreamlitPage.get_streamlit_default_key())
+
+
 # ---------- Hive 相关输入组件 ----------
 
 
@@ -202,9 +254,7 @@ def input_hive_instance(use_ssh: bool = False) -> Optional[HiveInstance]:
         name = input_hive_instance_name()
         username = st.text_input(label="username", value=None)
         if name is not None and username is not None:
-            hive_instance = configuration.get_hive_instance(name)
-            hive_instance.set_hive_username(username)
-            return hive_instance
+            return intern_value(configuration.get_hive_instance(name).with_username(username))
     else:
         hosts = st.text_input(label="Hive集群", value=None)
         port = int(st.text_input(label="端口", value=None))
@@ -214,17 +264,54 @@ def input_hive_instance(use_ssh: bool = False) -> Optional[HiveInstance]:
             ssh_tunnel = None
         username = st.text_input(label="username", value=None)
         if hosts is not None:
-            return HiveInstance(hosts=hosts.split(","), port=port, username=username, ssh_tunnel=ssh_tunnel)
+            return intern_value(HiveInstance(hosts=hosts.split(","), port=port, username=username, ssh_tunnel=ssh_tunnel))
     return None
 
 
-def input_hive_table(use_ssh: bool = False) -> Optional[HiveTable]:
+def input_hive_schema(hive_instance: Optional[HiveInstance],
+                      default_schema: Optional[str] = None) -> Optional[str]:
+    """【输入】Hive 数据库名（无法获取数据库列表时改为直接输入）"""
+    try:
+        databases = cache_data.hive_catalog(hive_instance).databases() if hive_instance is not None else []
+    except hive_connection_errors() as error:
+        st.warning(f"获取 Hive 数据库列表失败，请直接输入数据库名：{error}")
+        return st.text_input(label="数据库",
+                             value=default_schema,
+                             key=StreamlitPage.get_streamlit_default_key()) or None
+    index = databases.index(default_schema) if default_schema is not None and default_schema in databases else None
+    return st.selectbox(label="数据库",
+                        options=databases,
+                        placeholder="请选择数据库",
+                        index=index,
+                        key=StreamlitPage.get_streamlit_default_key())
+
+
+def input_hive_table_name(hive_instance: Optional[HiveInstance],
+                          schema: Optional[str],
+                          default_table: Optional[str] = None) -> Optional[str]:
+    """【输入】Hive 表名（无法获取表名列表时改为直接输入）"""
+    if hive_instance is not None and schema is not None:
+        try:
+            index = cache_data.hive_table_search_index(hive_instance, schema)
+        except hive_connection_errors() as error:
+            st.warning(f"获取 Hive 表名列表失败，请直接输入表名：{error}")
+            return st.text_input(label="表",
+                                 value=default_table,
+                                 key=StreamlitPage.get_streamlit_default_key()) or None
+    else:
+        index = None
+    return input_search_select("表", index, default=default_table)
+
+
+def input_hive_table(use_ssh: bool = False,
+                     default_schema: Optional[str] = None,
+                     default_table: Optional[str] = None) -> Optional[HiveTable]:
     """【输入】Hive 表"""
     hive_instance = input_hive_instance(use_ssh=use_ssh)
-    hive_schema = st.text_input(label="schema", value=None)
-    hive_table_name = st.text_input(label="table", value=None)
+    hive_schema = input_hive_schema(hive_instance, default_schema=default_schema)
+    hive_table_name = input_hive_table_name(hive_instance, hive_schema, default_table=default_table)
     if hive_instance is not None and hive_schema is not None and hive_table_name is not None:
-        hive_table = HiveTable(hive_instance, hive_schema, hive_table_name)
+        hive_table = intern_value(HiveTable(hive_instance, hive_schema, hive_table_name))
         return hive_table
     else:
         return None
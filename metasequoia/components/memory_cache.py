@@ -0,0 +1,209 @@
+"""
+带统计信息的进程内缓存
+
+用于替代 st.cache_data，在相同的 TTL 和 max_entries 语义之上，按被装饰的函数统计命中、未命中、淘汰次数及回源耗时，
+并支持按参数或条件精确失效：
+
+    @memory_cache(ttl=datetime.timedelta(minutes=10), max_entries=128)
+    @persistent_cache(ttl=datetime.timedelta(minutes=10))
+    def kafka_list_topics(kafka_server: KafkaServer):
+        ...
+
+    kafka_list_topics.invalidate(kafka_server)  # 只失效指定 Kafka 集群的缓存
+    kafka_get_topic_configs.invalidate_if(lambda kafka_topic: kafka_topic.kafka_server == kafka_server)
+
+实现说明：
+1. 缓存的键为参数本身，因此参数需要可哈希（连接器的描述对象均按值哈希）；参数不可哈希时直接执行函数
+2. 缓存的值直接返回给调用方而不复制，调用方不应修改返回值
+3. 失效时如果被装饰的函数（如 persistent_cache）也支持 invalidate、invalidate_if，则同时失效下层缓存；
+   invalidate_if 将条件传给下层缓存，因此不在进程内缓存中的下层缓存也会失效
+4. 下层缓存（如 persistent_cache）的 last_result_stale() 为 True 时不写入缓存，下次调用时重新读取下层缓存；
+   与 persistent_cache 组合使用时，ttl 不应超过下层缓存的 ttl
+"""
+
+import collections
+import datetime
+import functools
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+__all__ = ["memory_cache", "cache_stats", "clear_all"]
+
+_LATENCY_SAMPLES = 256  # 每个函数保留的最近回源耗时样本数
+
+_registry: List["_MemoryCache"] = []
+_registry_lock = threading.Lock()
+
+
+class _MemoryCache:
+    """单个函数的缓存数据和统计信息"""
+
+    def __init__(self, func: Callable, ttl: Optional[float], max_entries: Optional[int]):
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.entries: "collections.OrderedDict[Tuple[Any, ...], Tuple[float, Any, Tuple[Any, Dict[str, Any]]]]" = \
+            collections.OrderedDict()  # 键 -> (写入时间, 返回值, 调用参数)
+        self.lock = threading.Lock()
+
+        self.n_hits = 0
+        self.n_misses = 0
+        self.n_evictions = 0  # 超过 max_entries 被淘汰的次数
+        self.n_expirations = 0  # 超过 ttl 失效的次数
+        self.n_invalidations = 0  # 主动失效的次数
+        self.n_errors = 0  # 回源时抛出异常的次数
+        self.latencies: Deque[float] = collections.deque(maxlen=_LATENCY_SAMPLES)
+
+    def get(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        try:
+            key = (args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            return self.fetch(None, args, kwargs)  # 参数不可哈希时不使用缓存
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if self.ttl is None or time.monotonic() - entry[0] < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.n_hits += 1
+                    return entry[1]
+                del self.entries[key]
+                self.n_expirations += 1
+
+        return self.fetch(key, args, kwargs)
+
+    def fetch(self, key: Optional[Tuple[Any, ...]], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        """执行函数并写入缓存"""
+        start_time = time.monotonic()
+        try:
+            value = self.func(*args, **kwargs)
+        except Exception:
+            with self.lock:
+                self.n_misses += 1
+                self.n_errors += 1
+            raise
+        end_time = time.monotonic()
+        last_result_stale = getattr(self.func, "last_result_stale", None)
+        if last_result_stale is not None and last_result_stale():
+            key = None  # 下层缓存返回了旧值，不写入缓存
+
+        with self.lock:
+            self.n_misses += 1
+            self.latencies.append(end_time - start_time)
+            if key is not None:
+                self.entries[key] = (end_time, value, (args, kwargs))
+                self.entries.move_to_end(key)
+                while self.max_entries is not None and len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.n_evictions += 1
+        return value
+
+    def invalidate_if(self, predicate: Callable[..., bool]) -> int:
+        """失效调用参数满足条件的缓存，返回失效的数量"""
+        with self.lock:
+            matched = [(key, call_args) for key, (_, _, call_args) in self.entries.items()
+                       if predicate(*call_args[0], **call_args[1])]
+            for key, _ in matched:
+                del self.entries[key]
+            self.n_invalidations += len(matched)
+
+        inner_invalidate_if = getattr(self.func, "invalidate_if", None)
+        inner_invalidate = getattr(self.func, "invalidate", None)
+        if inner_invalidate_if is not None:
+            inner_invalidate_if(predicate)
+        elif inner_invalidate is not None:
+            for _, (args, kwargs) in matched:
+                inner_invalidate(*args, **kwargs)
+        return len(matched)
+
+    def invalidate(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+        """失效指定参数的缓存"""
+        with self.lock:
+            if self.entries.pop((args, tuple(sorted(kwargs.items()))), None) is not None:
+                self.n_invalidations += 1
+
+        inner_invalidate = getattr(self.func, "invalidate", None)
+        if inner_invalidate is not None:
+            inner_invalidate(*args, **kwargs)
+
+    def clear(self) -> None:
+        """清空函数的全部缓存（不包括下层缓存）"""
+        with self.lock:
+            self.n_invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            latencies = sorted(self.latencies)
+            n_requests = self.n_hits + self.n_misses
+            return {
+                "name": self.name,
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self.n_hits,
+                "misses": self.n_misses,
+                "hit_rate": self.n_hits / n_requests if n_requests > 0 else None,
+                "evictions": self.n_evictions,
+                "expirations": self.n_expirations,
+                "invalidations": self.n_invalidations,
+                "errors": self.n_errors,
+                "fetch_latency_avg_ms": sum(latencies) / len(latencies) * 1000 if latencies else None,
+                "fetch_latency_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+                "fetch_latency_max_ms": latencies[-1] * 1000 if latencies else None
+            }
+
+
+def memory_cache(ttl: Optional[datetime.timedelta] = None,
+                 max_entries: Optional[int] = None) -> Callable[[Callable], Callable]:
+    """带统计信息的进程内缓存装饰器
+
+    被装饰的函数增加如下方法：
+    - invalidate(*args, **kwargs)：失效指定参数的缓存
+    - invalidate_if(predicate)：失效调用参数满足 predicate(*args, **kwargs) 的缓存，返回失效的数量
+    - clear()：清空函数的全部缓存
+    - stats()：获取函数的缓存统计信息
+
+    Parameters
+    ----------
+    ttl : Optional[datetime.timedelta], default = None
+        缓存的有效期，为 None 时不过期
+    max_entries : Optional[int], default = None
+        最多缓存的参数组合数量，超过时淘汰最久未使用的缓存，为 None 时不限制
+    """
+
+    def decorator(func: Callable) -> Callable:
+        cache = _MemoryCache(func, ttl.total_seconds() if ttl is not None else None, max_entries)
+        with _registry_lock:
+            _registry.append(cache)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache.get(args, kwargs)
+
+        wrapper.invalidate = lambda *args, **kwargs: cache.invalidate(args, kwargs)
+        wrapper.invalidate_if = cache.invalidate_if
+        wrapper.clear = cache.clear
+        wrapper.stats = cache.stats
+        return wrapper
+
+    return decorator
+
+
+def cache_stats() -> List[Dict[str, Any]]:
+    """获取所有使用 memory_cache 的函数的缓存统计信息"""
+    with _registry_lock:
+        caches = list(_registry)
+    return [cache.stats() for cache in caches]
+
+
+def clear_all() -> None:
+    """清空所有使用 memory_cache 的函数的缓存"""
+    with _registry_lock:
+        caches = list(_registry)
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,317 @@
+"""
+跨进程、跨重启的持久化缓存
+
+用于在进程内缓存（memory_cache）之下增加一层持久化缓存，使重新部署后的首次访问不必等待各个数据源：
+
+    @memory_cache(ttl=datetime.timedelta(minutes=10), max_entries=128)
+    @persistent_cache(ttl=datetime.timedelta(minutes=10), stale_ttl=datetime.timedelta(days=1))
+    def kafka_list_topics(kafka_server: KafkaServer):
+        ...
+
+实现说明：
+1. 缓存的键为参数规范化表示（canonical_repr）的摘要：ValueObject 使用类名和 _value_key，其他对象使用类名和按属性名排序的属性，
+   与对象的创建方式、pickle 协议和字典顺序无关；缓存的值为返回值序列化（pickle）后的结果。
+   序列化后的参数同时写入存储后端，用于 invalidate_if 按条件失效尚未加载到进程内的缓存
+2. 写入时间在 ttl 以内的缓存直接返回；超过 ttl 但在 ttl + stale_ttl 以内的缓存立即返回旧值，同时在后台线程中刷新；
+   超过 ttl + stale_ttl 的缓存视为不存在，同步执行函数。返回旧值后 last_result_stale() 为 True，
+   memory_cache 据此不将旧值写入进程内缓存，避免后台刷新完成后仍在进程内缓存的有效期内返回旧值
+3. 存储后端可替换，默认使用 SQLite 文件，路径由环境变量 METASEQUOIA_CACHE_PATH 指定；存储后端不可用（例如目录无法创建）时直接执行函数
+4. 写入缓存时每隔 PURGE_INTERVAL 秒删除一次命名空间中超过 ttl + stale_ttl 的缓存，避免不再被访问的参数组合一直占用存储
+"""
+
+import abc
+import datetime
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+from metasequoia.connector.base import ValueObject
+
+__all__ = ["CacheBackend", "SqliteCacheBackend", "persistent_cache", "get_default_backend", "set_default_backend",
+           "canonical_repr"]
+
+LOGGER = logging.getLogger(__name__)
+
+CACHE_PATH = os.environ.get("METASEQUOIA_CACHE_PATH",
+                            os.path.join(os.path.expanduser("~"), ".metasequoia", "cache.sqlite3"))
+
+PURGE_INTERVAL = 3600  # 删除过期缓存的间隔（秒）
+
+
+class CacheBackend(abc.ABC):
+    """持久化缓存的存储后端"""
+
+    @abc.abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Tuple[float, bytes]]:
+        """获取缓存的写入时间（time.time）和序列化后的值，不存在时返回 None"""
+
+    @abc.abstractmethod
+    def set(self, namespace: str, key: str, stored_at: float, value: bytes, args: Optional[bytes] = None) -> None:
+        """写入缓存，args 为序列化后的调用参数"""
+
+    @abc.abstractmethod
+    def delete(self, namespace: str, key: Optional[str] = None) -> None:
+        """删除缓存，key 为 None 时删除整个命名空间"""
+
+    def list_args(self, namespace: str) -> List[Tuple[str, Optional[bytes]]]:
+        """获取命名空间中全部缓存的键和序列化后的调用参数；不支持时抛出 NotImplementedError"""
+        raise NotImplementedError
+
+    def purge(self, namespace: str, stored_before: float) -> None:
+        """删除命名空间中写入时间早于 stored_before（time.time）的缓存；默认不删除，由存储后端自行淘汰"""
+
+
+class SqliteCacheBackend(CacheBackend):
+    """使用 SQLite 文件存储的缓存后端，可以被多个进程同时使用"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache ("
+                           "  namespace TEXT NOT NULL, "
+                           "  key TEXT NOT NULL, "
+                           "  stored_at REAL NOT NULL, "
+                           "  value BLOB NOT NULL, "
+                           "  PRIMARY KEY (namespace, key))")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache)")}
+        if "args" not in columns:  # 兼容旧版本创建的缓存文件
+            self._conn.execute("ALTER TABLE cache ADD COLUMN args BLOB")
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[float, bytes]]:
+        with self._lock:
+            row = self._conn.execute("SELECT stored_at, value FROM cache WHERE namespace = ? AND key = ?",
+                                     (namespace, key)).fetchone()
+        return (row[0], row[1]) if row is not None else None
+
+    def set(self, namespace: str, key: str, stored_at: float, value: bytes, args: Optional[bytes] = None) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO cache (namespace, key, stored_at, value, args) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               (namespace, key, stored_at, value, args))
+
+    def delete(self, namespace: str, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+            else:
+                self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def list_args(self, namespace: str) -> List[Tuple[str, Optional[bytes]]]:
+        with self._lock:
+            return self._conn.execute("SELECT key, args FROM cache WHERE namespace = ?", (namespace,)).fetchall()
+
+    def purge(self, namespace: str, stored_before: float) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ? AND stored_at < ?", (namespace, stored_before))
+
+
+_default_backend: Optional[CacheBackend] = None
+_default_cache_backendlock = threading.Lock()
+
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="persistent-cache-refresh")
+_refreshing: Set[Tuple[str, str]] = set()  # 正在后台刷新的缓存，避免重复刷新
+_refreshing_lock = threading.Lock()
+
+
+def get_default_backend() -> CacheBackend:
+    """获取默认的存储后端，首次调用时创建 SQLite 文件"""
+    global _default_backend
+    with _default_cache_backendlock:
+        if _default_backend is None:
+            _default_backend = SqliteCacheBackend(CACHE_PATH)
+        return _default_backend
+
+
+def set_default_backend(backend: CacheBackend) -> None:
+    """替换默认的存储后端"""
+    global _default_backend
+    with _default_cache_backendlock:
+        _default_backend = backend
+
+
+def _canonical(value: Any) -> Any:
+    if value is None or isinstance(value, (str, bytes, bool, int, float)):
+        return value
+    if isinstance(value, (tuple, list)):
+        return type(value).__name__, tuple(_canonical(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return type(value).__name__, tuple(sorted((_canonical(item) for item in value), key=repr))
+    if isinstance(value, dict):
+        return "dict", tuple(sorted(((_canonical(k), _canonical(v)) for k, v in value.items()), key=repr))
+    name = f"{type(value).__module__}.{type(value).__qualname__}"
+    if isinstance(value, ValueObject):
+        return name, _canonical(value._value_key())
+    if hasattr(value, "__dict__") and not callable(value):  # 函数、类等不能按属性比较
+        return name, _canonical(vars(value))
+    raise TypeError(f"无法生成 {name} 的规范化表示")
+
+
+def canonical_repr(value: Any) -> str:
+    """获取值的规范化表示：相等的参数（包括按值比较的连接器对象）总是得到相同的字符串，不可规范化时抛出 TypeError"""
+    return repr(_canonical(value))
+
+
+def persistent_cache(ttl: datetime.timedelta,
+                     stale_ttl: datetime.timedelta = datetime.timedelta(days=1),
+                     namespace: Optional[str] = None,
+                     backend: Optional[CacheBackend] = None) -> Callable[[Callable], Callable]:
+    """持久化缓存装饰器
+
+    被装饰的函数增加如下方法：
+    - refresh(*args, **kwargs)：同步执行函数并更新缓存，返回最新结果
+    - invalidate(*args, **kwargs)：删除指定参数的缓存
+    - invalidate_if(predicate)：删除调用参数满足 predicate(*args, **kwargs) 的缓存，返回删除的数量
+    - clear()：删除函数的全部缓存
+    - last_result_stale()：当前线程最近一次调用是否返回了过期的旧值
+
+    Parameters
+    ----------
+    ttl : datetime.timedelta
+        缓存的有效期，有效期内直接返回缓存
+    stale_ttl : datetime.timedelta, default = 1 天
+        缓存过期后仍可以返回旧值的时间，在此期间返回旧值并在后台刷新
+    namespace : Optional[str], default = None
+        缓存的命名空间，为 None 时使用函数的模块名和名称
+    backend : Optional[CacheBackend], default = None
+        存储后端，为 None 时使用默认的存储后端
+    """
+    ttl_seconds = ttl.total_seconds()
+    stale_seconds = stale_ttl.total_seconds()
+
+    def decorator(func: Callable) -> Callable:
+        func_namespace = namespace if namespace is not None else f"{func.__module__}.{func.__qualname__}"
+        call_state = threading.local()  # 当前线程最近一次调用是否返回了旧值
+        last_purged_at = [0.0]  # 最近一次删除过期缓存的时间
+
+        def get_backend() -> Optional[CacheBackend]:
+            """获取存储后端，不可用时返回 None"""
+            try:
+                return backend if backend is not None else get_default_backend()
+            except (sqlite3.Error, OSError) as error:
+                LOGGER.warning("持久化缓存不可用，直接执行函数: %s (%s)", func_namespace, error)
+                return None
+
+        def serialize_args(args, kwargs) -> bytes:
+            return pickle.dumps((args, sorted(kwargs.items())), protocol=4)
+
+        def make_key(args, kwargs) -> str:
+            return hashlib.sha256(canonical_repr((args, kwargs)).encode("UTF-8")).hexdigest()
+
+        def compute_and_store(key: str, args, kwargs) -> Any:
+            value = func(*args, **kwargs)
+            cache_backend = get_backend()
+            if cache_backend is None:
+                return value
+            try:
+                serialized = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                now = time.time()
+                cache_backend.set(func_namespace, key, now, serialized, serialize_args(args, kwargs))
+                if now - last_purged_at[0] >= PURGE_INTERVAL:
+                    last_purged_at[0] = now
+                    cache_backend.purge(func_namespace, now - ttl_seconds - stale_seconds)
+            except (sqlite3.Error, OSError, pickle.PicklingError, TypeError, AttributeError) as error:
+                LOGGER.warning("写入持久化缓存失败: %s (%s)", func_namespace, error)
+            return value
+
+        def refresh_in_background(key: str, args, kwargs) -> None:
+            with _refreshing_lock:
+                if (func_namespace, key) in _refreshing:
+                    return
+                _refreshing.add((func_namespace, key))
+
+            def task():
+                try:
+                    compute_and_store(key, args, kwargs)
+                except Exception as error:  # 后台刷新失败时保留旧值，在下次访问时重试
+                    LOGGER.warning("后台刷新持久化缓存失败: %s (%s)", func_namespace, error)
+                finally:
+                    with _refreshing_lock:
+                        _refreshing.discard((func_namespace, key))
+
+            _refresh_executor.submit(task)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call_state.stale = False
+            try:
+                key = make_key(args, kwargs)
+            except TypeError:
+                return func(*args, **kwargs)  # 参数无法规范化时不使用持久化缓存
+            cache_backend = get_backend()
+            if cache_backend is None:
+                return func(*args, **kwargs)
+            try:
+                cached = cache_backend.get(func_namespace, key)
+            except (sqlite3.Error, OSError) as error:
+                LOGGER.warning("读取持久化缓存失败: %s (%s)", func_namespace, error)
+                cached = None
+
+            if cached is not None:
+                stored_at, value = cached
+                age = time.time() - stored_at
+                if age < ttl_seconds + stale_seconds:
+                    try:
+                        result = pickle.loads(value)
+                    except (pickle.UnpicklingError, AttributeError, ImportError, EOFError, TypeError):
+                        pass  # 缓存的值无法反序列化（例如类定义已变化），重新执行函数
+                    else:
+                        if age >= ttl_seconds:
+                            call_state.stale = True
+                            refresh_in_background(key, args, kwargs)
+                        return result
+
+            return compute_and_store(key, args, kwargs)
+
+        def refresh(*args, **kwargs):
+            return compute_and_store(make_key(args, kwargs), args, kwargs)
+
+        def invalidate(*args, **kwargs):
+            cache_backend = get_backend()
+            if cache_backend is not None:
+                cache_backend.delete(func_namespace, make_key(args, kwargs))
+
+        def invalidate_if(predicate: Callable[..., bool]) -> int:
+            cache_backend = get_backend()
+            if cache_backend is None:
+                return 0
+            try:
+                entries = cache_backend.list_args(func_namespace)
+            except NotImplementedError:  # 存储后端无法遍历缓存时删除函数的全部缓存
+                cache_backend.delete(func_namespace)
+                return 0
+            n_deleted = 0
+            for key, serialized_args in entries:
+                try:
+                    args, kwargs = pickle.loads(serialized_args)
+                    matched = predicate(*args, **dict(kwargs))
+                except (pickle.UnpicklingError, AttributeError, ImportError, EOFError, TypeError):
+                    matched = True  # 旧版本写入或无法反序列化的缓存一并删除
+                if matched:
+                    cache_backend.delete(func_namespace, key)
+                    n_deleted += 1
+            return n_deleted
+
+        def clear():
+            cache_backend = get_backend()
+            if cache_backend is not None:
+                cache_backend.delete(func_namespace)
+
+        wrapper.refresh = refresh
+        wrapper.invalidate = invalidate
+        wrapper.invalidate_if = invalidate_if
+        wrapper.clear = clear
+        wrapper.last_result_stale = lambda: getattr(call_state, "stale", False)
+        return wrapper
+
+    return decorator
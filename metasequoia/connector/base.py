@@ -2,9 +2,13 @@
 各个连接器的基础通用对象
 """
 
-from typing import Optional
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple, TypeVar
 
-__all__ = ["HostPort"]
+__all__ = ["HostPort", "ValueObject", "intern_value"]
+
+T = TypeVar("T", bound="ValueObject")
 
 
 class HostPort:
@@ -37,3 +41,65 @@ class HostPort:
         return (isinstance(other, HostPort) and
                 self._host == other._host and
                 self._port == other._port)
+
+
+class ValueObject:
+    """不可变、按值比较和哈希的描述对象基类
+
+    子类需要：
+    1. 定义 __slots__，并在 __init__ 中为每个属性赋值一次（赋值后不允许修改）
+    2. 实现 _value_key 方法，返回由全部属性组成的元组，用于比较和哈希
+
+    定义了 __getstate__ 和 __setstate__，使 pickle、copy 等依赖 __reduce__ 的操作可以正常使用。注意 Streamlit 不能哈希
+    __reduce__ 返回的重建函数，作为 st.cache_* 参数时仍需传入 hash_funcs={子类: hash}。
+    """
+
+    __slots__ = ("__weakref__",)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if hasattr(self, name):
+            raise AttributeError(f"{type(self).__name__} 是不可变对象，不允许修改属性 {name}")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} 是不可变对象，不允许删除属性 {name}")
+
+    def _value_key(self) -> Tuple[Any, ...]:
+        raise NotImplementedError
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = {}
+        for cls in type(self).__mro__:
+            slots = getattr(cls, "__slots__", ())
+            for name in (slots,) if isinstance(slots, str) else slots:
+                if name != "__weakref__" and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def __hash__(self):
+        return hash((type(self), self._value_key()))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._value_key() == other._value_key()
+
+
+_interned: "weakref.WeakValueDictionary[Tuple[Any, ...], ValueObject]" = weakref.WeakValueDictionary()
+_interned_lock = threading.Lock()
+
+
+def intern_value(obj: T) -> T:
+    """返回与 obj 相等的共享对象：如果已存在相等的对象则返回已存在的对象，否则登记并返回 obj
+
+    登记表只持有弱引用，不再被使用的对象会被自动回收。
+    """
+    key = (type(obj), obj._value_key())
+    with _interned_lock:
+        existing = _interned.get(key)
+        if existing is not None:
+            return existing
+        _interned[key] = obj
+        return obj
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Optional, Tuple
 
 from metasequoia.connector.rds_connector import RdsInstance, MysqlConnector
 from metasequoia.connector.ssh_tunnel import SshTunnel
@@ -7,6 +7,8 @@ from metasequoia.connector.ssh_tunnel import SshTunnel
 class DolphinMetaInstance(RdsInstance):
     """海豚调度元数据实例"""
 
+    __slots__ = ("_db",)
+
     def __init__(self, host: str, port: int, user: str, passwd: str, db: str, ssh_tunnel: Optional[SshTunnel] = None):
         super().__init__(host, port, user, passwd, ssh_tunnel)
         self._db = db
@@ -18,17 +20,12 @@ class DolphinMetaInstance(RdsInstance):
     def __repr__(self) -> str:
         return f"<DolphinMetaInstance host={self.host}, port={self.port}, user={self.user}, passwd={self.passwd}, ssh_tunnel={self.ssh_tunnel}, db={self.db}>"
 
-    def __hash__(self):
-        return hash((self.host, self.port, self.user, self.passwd, self.db, self.ssh_tunnel))
-
-    def __eq__(self, other):
-        return (isinstance(other, DolphinMetaInstance) and
-                self.host == other.host and
-                self.port == other.port and
-                self.user == other.user and
-                self.passwd == other.passwd and
-                self.db == other.db and
-                self.ssh_tunnel == other.ssh_tunnel)
+    def with_ssh_tunnel(self, ssh_tunnel: Optional[SshTunnel]) -> "DolphinMetaInstance":
+        """返回使用指定 SSH 隧道的新海豚调度元数据实例"""
+        return DolphinMetaInstance(self.host, self.port, self.user, self.passwd, self._db, ssh_tunnel)
+
+    def _value_key(self) -> Tuple[Any, ...]:
+        return super()._value_key() + (self._db,)
 
 
 class DolphinMetaConnector(MysqlConnector):
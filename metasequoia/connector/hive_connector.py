@@ -2,29 +2,39 @@
 Hive 连接器
 """
 
-import random
-from typing import List, Optional
+from __future__ import annotations
 
-import sshtunnel
-from pyhive import hive
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+from metasequoia.connector.base import ValueObject
 from metasequoia.connector.ssh_tunnel import SshTunnel
+from metasequoia.connector.ssh_tunnel_pool import ssh_tunnel_pool
+from metasequoia.utils.lazy_import_util import lazy_import
 
-__all__ = ["HiveInstance", "HiveTable", "HiveConn"]
+__all__ = ["HiveInstance", "HiveTable", "HiveHostSelector", "hive_host_selector", "HiveConn", "hive_connection_errors"]
 
+hive = lazy_import("pyhive.hive")
+paramiko = lazy_import("paramiko")
+TTransport = lazy_import("thrift.transport.TTransport")
 
-class HiveInstance:
+
+class HiveInstance(ValueObject):
     """Hive 实例"""
 
-    def __init__(self, hosts: List[str], port: int, username: Optional[str] = None,
+    __slots__ = ("_hosts", "_port", "_username", "_ssh_tunnel")
+
+    def __init__(self, hosts: Sequence[str], port: int, username: Optional[str] = None,
                  ssh_tunnel: Optional[SshTunnel] = None):
-        self._hosts = hosts
+        self._hosts = tuple(hosts)
         self._port = port
         self._username = username
         self._ssh_tunnel = ssh_tunnel
 
     @property
-    def hosts(self) -> List[str]:
+    def hosts(self) -> Tuple[str, ...]:
         return self._hosts
 
     @property
@@ -39,13 +49,22 @@ class HiveInstance:
     def ssh_tunnel(self) -> SshTunnel:
         return self._ssh_tunnel
 
-    def set_hive_username(self, username: str) -> None:
-        self._username = username
+    def with_username(self, username: Optional[str]) -> "HiveInstance":
+        """返回使用指定用户名的新 Hive 实例"""
+        return HiveInstance(self._hosts, self._port, username, self._ssh_tunnel)
+
+    def _value_key(self) -> Tuple[Any, ...]:
+        return self._hosts, self._port, self._username, self._ssh_tunnel
 
+    def __repr__(self) -> str:
+        return f"<HiveInstance hosts={self.hosts}, port={self.port}, username={self.username}, ssh_tunnel={self.ssh_tunnel}>"
 
-class HiveTable:
+
+class HiveTable(ValueObject):
     """Hive 表"""
 
+    __slots__ = ("_instance", "_schema", "_table")
+
     def __init__(self, instance: "HiveInstance", schema: str, table: str):
         self._instance = instance
         self._schema = schema
@@ -63,6 +82,131 @@ class HiveTable:
     def table(self) -> str:
         return self._table
 
+    def _value_key(self) -> Tuple[Any, ...]:
+        return self._instance, self._schema, self._table
+
+    def __repr__(self) -> str:
+        return f"<HiveTable instance={self.instance}, schema={self.schema}, table={self.table}>"
+
+
+class _HiveHostStats:
+    """单个 HiveServer2 的延迟和健康状态"""
+
+    def __init__(self):
+        self.connect_latency: Optional[float] = None  # 连接耗时的 EWMA（秒）
+        self.query_latency: Optional[float] = None  # 查询耗时的 EWMA（秒）
+        self.n_success = 0
+        self.n_failure = 0
+        self.consecutive_failures = 0
+        self.backoff_until = 0.0  # 在该时间（time.monotonic）之前尽量不选择该节点
+        self.last_error: Optional[str] = None
+
+    @property
+    def score(self) -> float:
+        """选择节点时的得分，越小越优先；没有统计数据的节点得分为 0，以便尽快获得统计数据"""
+        return (self.connect_latency or 0.0) + (self.query_latency or 0.0)
+
+
+class HiveHostSelector:
+    """根据延迟和健康状态选择 HiveServer2 节点
+
+    实现说明：
+    1. 按节点分别统计连接耗时和查询耗时的 EWMA，优先选择得分最低的节点
+    2. 连接失败的节点按连续失败次数指数退避，退避期间排在所有健康节点之后，只作为最后的备选
+    """
+
+    def __init__(self, alpha: float = 0.3, base_backoff: float = 5, max_backoff: float = 300):
+        """
+
+        Parameters
+        ----------
+        alpha : float, default = 0.3
+            EWMA 中最新样本的权重
+        base_backoff : float, default = 5
+            首次失败后的退避时间（秒）
+        max_backoff : float, default = 300
+            最大退避时间（秒）
+        """
+        self._alpha = alpha
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self._stats: Dict[Tuple[str, int], _HiveHostStats] = {}
+        self._lock = threading.Lock()
+
+    def order_hosts(self, hosts: Sequence[str], port: int) -> List[str]:
+        """将节点按优先级排序：健康节点按得分升序（得分相同时随机），退避中的节点按退避结束时间升序"""
+        now = time.monotonic()
+        shuffled = list(hosts)
+        random.shuffle(shuffled)
+        with self._lock:
+            stats = {host: self._stats.get((host, port), _HiveHostStats()) for host in shuffled}
+        healthy = sorted((host for host in shuffled if stats[host].backoff_until <= now),
+                         key=lambda host: stats[host].score)
+        backoff = sorted((host for host in shuffled if stats[host].backoff_until > now),
+                         key=lambda host: stats[host].backoff_until)
+        return healthy + backoff
+
+    def record_connect(self, host: str, port: int, latency: float) -> None:
+        """记录连接成功及连接耗时"""
+        with self._lock:
+            stats = self._get_stats(host, port)
+            stats.connect_latency = self._ewma(stats.connect_latency, latency)
+            stats.n_success += 1
+            stats.consecutive_failures = 0
+            stats.backoff_until = 0.0
+
+    def record_query(self, host: str, port: int, latency: float) -> None:
+        """记录查询耗时"""
+        with self._lock:
+            stats = self._get_stats(host, port)
+            stats.query_latency = self._ewma(stats.query_latency, latency)
+
+    def record_failure(self, host: str, port: int, error: Optional[BaseException] = None) -> None:
+        """记录连接失败，并按连续失败次数指数退避"""
+        with self._lock:
+            stats = self._get_stats(host, port)
+            stats.n_failure += 1
+            stats.consecutive_failures += 1
+            backoff = min(self._base_backoff * 2 ** (stats.consecutive_failures - 1), self._max_backoff)
+            stats.backoff_until = time.monotonic() + backoff
+            stats.last_error = repr(error) if error is not None else None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """获取各个节点的统计信息"""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "host": host,
+                "port": port,
+                "connect_latency_ms": stats.connect_latency * 1000 if stats.connect_latency is not None else None,
+                "query_latency_ms": stats.query_latency * 1000 if stats.query_latency is not None else None,
+                "success": stats.n_success,
+                "failure": stats.n_failure,
+                "consecutive_failures": stats.consecutive_failures,
+                "backoff_remaining_s": max(stats.backoff_until - now, 0.0),
+                "last_error": stats.last_error
+            } for (host, port), stats in self._stats.items()]
+
+    def _get_stats(self, host: str, port: int) -> _HiveHostStats:
+        """获取节点的统计信息，如果不存在则创建（调用时需持有锁）"""
+        if (host, port) not in self._stats:
+            self._stats[(host, port)] = _HiveHostStats()
+        return self._stats[(host, port)]
+
+    def _ewma(self, old: Optional[float], new: float) -> float:
+        return new if old is None else self._alpha * new + (1 - self._alpha) * old
+
+
+hive_host_selector = HiveHostSelector()  # 实现 HiveServer2 选择器的单例
+
+
+def hive_connection_errors() -> Tuple[type, ...]:
+    """连接或查询 Hive 失败时可能抛出的异常类型（网络、SSH 隧道、Thrift 传输以及 HiveServer2 返回的错误）
+
+    使用函数而不是常量，使引用本模块时不必加载 pyhive、thrift 和 paramiko
+    """
+    return OSError, paramiko.SSHException, TTransport.TTransportException, hive.OperationalError
+
 
 class HiveConn:
     def __init__(self,
@@ -82,9 +226,10 @@ class HiveConn:
         self.hive_instance_info = hive_instance  # MySQl 实例的配置
         self.schema = schema  # 数据库
 
-        # 初始化 Hive 连接和 SSH 隧道连接
+        # 初始化 Hive 连接、连接的节点和 SSH 隧道转发的远程地址
         self.hive_conn = None
-        self.ssh_tunnel = None
+        self.host = None
+        self.ssh_remote_address = None
 
     @staticmethod
     def create_by_hive_instance(hive_instance: HiveInstance,
@@ -95,36 +240,59 @@ class HiveConn:
     def __enter__(self):
         """在进入 with as 语句的时候被 with 调用，返回值作为 as 后面的变量
 
-        因为 pyhive 不支持连接多个 Hive Client 的集群，因此在其中随机选择
+        因为 pyhive 不支持连接多个 Hive Client 的集群，因此由 hive_host_selector 按延迟和健康状态排序后依次尝试连接，
+        直到连接成功为止；全部节点连接失败时抛出最后一个节点的异常。
+        获取 SSH 隧道失败与 HiveServer2 节点无关，不记为节点失败，直接抛出原异常
         """
-
-        choose_host = random.choice(self.hive_instance_info.hosts)
-
+        if not self.hive_instance_info.hosts:
+            raise ValueError(f"Hive 实例没有可连接的 HiveServer2 节点: {self.hive_instance_info}")
+        port = self.hive_instance_info.port
+        last_error = None
+        for host in hive_host_selector.order_hosts(self.hive_instance_info.hosts, port):
+            start_time = time.monotonic()
+            address = self._acquire_ssh_tunnel(host)
+            try:
+                self._connect(*address)
+            except Exception as error:
+                hive_host_selector.record_failure(host, port, error)
+                last_error = error
+                continue
+            hive_host_selector.record_connect(host, port, time.monotonic() - start_time)
+            self.host = host
+            return self.hive_conn
+        raise last_error
+
+    def _acquire_ssh_tunnel(self, choose_host: str) -> Tuple[str, int]:
+        """获取连接 HiveServer2 节点时实际使用的地址；配置了 SSH 隧道时从共享的 SSH 隧道池中获取转发端口"""
         ssh_tunnel_info = self.hive_instance_info.ssh_tunnel
-
-        if ssh_tunnel_info is not None:
-            # 启动 SSH 隧道
-            self.ssh_tunnel = sshtunnel.SSHTunnelForwarder(
-                ssh_address_or_host=(ssh_tunnel_info.host, ssh_tunnel_info.port),
-                ssh_username=ssh_tunnel_info.username,
-                ssh_pkey=ssh_tunnel_info.pkey,
-                remote_bind_address=(choose_host, self.hive_instance_info.port)
-            )
-            self.ssh_tunnel.start()
-
-            # 更新 MySQL 连接信息，令 MySQL 连接到 SSH 隧道
-            host = "127.0.0.1"
-            port = self.ssh_tunnel.local_bind_port
-        else:
-            host = choose_host
-            port = self.hive_instance_info.port
-
-        self.hive_conn = hive.Connection(host=host, port=port, username=self.hive_instance_info.username)
-
-        return self.hive_conn
+        if ssh_tunnel_info is None:
+            return choose_host, self.hive_instance_info.port
+        remote_address = (choose_host, self.hive_instance_info.port)
+        local_address = ssh_tunnel_pool.acquire(ssh_tunnel_info, remote_address)
+        self.ssh_remote_address = remote_address
+        return local_address
+
+    def _connect(self, host: str, port: int) -> None:
+        """连接到 HiveServer2 节点（或其 SSH 隧道的本地转发地址），失败时释放 SSH 隧道"""
+        try:
+            self.hive_conn = hive.Connection(host=host, port=port, username=self.hive_instance_info.username)
+        except Exception:
+            self._release_ssh_tunnel()
+            raise
+
+    def record_query_latency(self, latency: float) -> None:
+        """记录当前连接节点的查询耗时"""
+        if self.host is not None:
+            hive_host_selector.record_query(self.host, self.hive_instance_info.port, latency)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.hive_conn is not None:
             self.hive_conn.close()
-        if self.ssh_tunnel is not None:
-            self.ssh_tunnel.close()
+            self.hive_conn = None
+        self._release_ssh_tunnel()
+
+    def _release_ssh_tunnel(self) -> None:
+        """释放 SSH 隧道池中的转发端口"""
+        if self.ssh_remote_address is not None:
+            ssh_tunnel_pool.release(self.hive_instance_info.ssh_tunnel, self.ssh_remote_address)
+            self.ssh_remote_address = None
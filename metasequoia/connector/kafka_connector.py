@@ -2,20 +2,34 @@
 包含对象：
 - KafkaServer
 - KafkaTopic
-- ConnKafkaAdminClient
+- KafkaGroup
 
 包含连接器：
+- KafkaClientCache
+- ConnKafkaAdminClient
+- ConnKafkaConsumer
 """
 
-from typing import List, Optional
+from __future__ import annotations
 
-import sshtunnel
-from kafka.admin import KafkaAdminClient
+import contextlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from metasequoia.connector.base import HostPort
 from metasequoia.connector.ssh_tunnel import SshTunnel
+from metasequoia.connector.ssh_tunnel_pool import ssh_tunnel_pool
+from metasequoia.utils.lazy_import_util import lazy_import
+
+__all__ = ["KafkaServer", "KafkaTopic", "KafkaGroup", "KafkaClientCache", "kafka_client_cache",
+           "ConnKafkaAdminClient", "ConnKafkaConsumer"]
 
-__all__ = ["KafkaServer", "KafkaTopic", "KafkaGroup", "ConnKafkaAdminClient"]
+LOGGER = logging.getLogger(__name__)
+
+kafka = lazy_import("kafka")
+kafka_errors = lazy_import("kafka.errors")
 
 
 class KafkaServer:
@@ -105,42 +119,246 @@ class KafkaGroup:
                 self._group == other._group)
 
 
+class _KafkaClientEntry:
+    """缓存中的一个 Kafka 客户端，同一时间只允许一个使用者持有
+
+    使用 SSH 隧道时，为每个 broker 的地址分别建立本地转发端口：
+    1. bootstrap_servers 中的地址在创建客户端前转发
+    2. 集群元数据中 broker 的 advertised 地址在客户端首次连接该 broker 时转发，并将地址替换为对应的本地地址
+
+    从而使客户端可以通过 SSH 隧道并行访问各个分区的 leader，而不是只能访问一个 bootstrap broker
+    """
+
+    def __init__(self, kafka_server: KafkaServer,
+                 factory: Callable[[List[str], Callable[..., kafka.KafkaClient]], Any]):
+        self.kafka_server = kafka_server
+        self.factory = factory
+        self.client = None
+        self.local_addresses: Dict[Tuple[str, int], Tuple[str, int]] = {}  # 远程地址到本地转发地址的映射
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self._forward_lock = threading.Lock()  # kafka-python 可能在后台线程中连接 broker
+
+    def get_client(self) -> Any:
+        """获取客户端，如果客户端尚未创建则创建（调用时需持有 lock）"""
+        if self.client is None:
+            try:
+                if self.kafka_server.ssh_tunnel is not None:
+                    # 从共享的 SSH 隧道池中获取每个 broker 的转发端口，令 Kafka 集群连接到 SSH 隧道
+                    addresses = []
+                    for host_port in self.kafka_server.get_host_list():
+                        local_host, local_port = self._forward(host_port.host, host_port.port)
+                        addresses.append(f"{local_host}:{local_port}")
+                else:
+                    addresses = [f"{host_port.host}:{host_port.port}"
+                                 for host_port in self.kafka_server.get_host_list()]
+
+                # 启动 Kafka 集群连接
+                if self.kafka_server.ssh_tunnel is not None:
+                    self.client = self.factory(addresses, self._create_kafka_client)
+                else:
+                    self.client = self.factory(addresses, kafka.KafkaClient)
+            except Exception:
+                self.close()
+                raise
+        return self.client
+
+    def close(self) -> None:
+        """关闭客户端并释放 SSH 隧道池中的转发端口（调用时需持有 lock）"""
+        if self.client is not None:
+            try:
+                self.client.close()
+            except kafka_errors.KafkaError:
+                pass
+            finally:
+                self.client = None
+        with self._forward_lock:
+            for remote_address in self.local_addresses:
+                ssh_tunnel_pool.release(self.kafka_server.ssh_tunnel, remote_address)
+            self.local_addresses = {}
+
+    def _forward(self, host: str, port: int) -> Tuple[str, int]:
+        """获取远程地址对应的本地转发地址，每个远程地址只在 SSH 隧道池中获取一次"""
+        remote_address = (host, int(port))
+        with self._forward_lock:
+            if remote_address not in self.local_addresses:
+                self.local_addresses[remote_address] = ssh_tunnel_pool.acquire(self.kafka_server.ssh_tunnel,
+                                                                               remote_address)
+            return self.local_addresses[remote_address]
+
+    def _create_kafka_client(self, **configs) -> kafka.KafkaClient:
+        """创建将集群元数据中 broker 的地址替换为本地转发地址的 KafkaClient
+
+        kafka-python 的 KafkaClient 在连接任意节点（包括 bootstrap、broker 和 coordinator）前都会通过
+        ClusterMetadata.broker_metadata 获取节点地址，因此在这里替换即可覆盖所有连接。KafkaAdminClient 在构造时
+        就会连接 controller，所以需要通过 kafka_client 参数在构造 KafkaClient 时替换，而不能在构造完成后替换。
+        """
+        kafka_client = kafka.KafkaClient(**configs)
+        cluster = kafka_client.cluster
+        broker_metadata = cluster.broker_metadata
+
+        def resolve_broker_metadata(broker_id):
+            broker = broker_metadata(broker_id)
+            if broker is None:
+                return None
+            with self._forward_lock:
+                is_local = (broker.host, broker.port) in self.local_addresses.values()
+            if is_local:
+                return broker
+            local_host, local_port = self._forward(broker.host, broker.port)
+            return broker._replace(host=local_host, port=local_port)
+
+        cluster.broker_metadata = resolve_broker_metadata
+        return kafka_client
+
+
+class KafkaClientCache:
+    """按 KafkaServer 缓存常驻的 KafkaAdminClient 和 KafkaConsumer
+
+    实现说明：
+    1. 客户端在多次调用之间复用，从而复用客户端中已经获取的集群元数据
+    2. kafka-python 的客户端不是线程安全的，因此同一个客户端同一时间只允许一个使用者持有，其他 Streamlit 会话需要等待
+    3. 使用过程中出现 KafkaError 时关闭客户端，下次使用时重新创建
+    4. 后台线程定期关闭空闲超时的客户端
+    """
+
+    def __init__(self, idle_timeout: float = 600):
+        """
+
+        Parameters
+        ----------
+        idle_timeout : float, default = 600
+            客户端在空闲多少秒后关闭
+        """
+        self._idle_timeout = idle_timeout
+        self._entries: Dict[Tuple[Any, ...], _KafkaClientEntry] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @contextlib.contextmanager
+    def admin_client(self, kafka_server: KafkaServer):
+        """在 with 语句中持有 KafkaServer 对应的 KafkaAdminClient"""
+        with self._use(("admin", kafka_server), kafka_server,
+                       lambda addresses, kafka_client: kafka.KafkaAdminClient(bootstrap_servers=addresses,
+                                                                              kafka_client=kafka_client)) as client:
+            yield client
+
+    @contextlib.contextmanager
+    def consumer(self, kafka_server: KafkaServer, group_id: Optional[str] = None):
+        """在 with 语句中持有 KafkaServer、消费者组对应的 KafkaConsumer
+
+        消费者不会自动提交偏移量，避免查询时修改消费者组的偏移量
+        """
+        with self._use(("consumer", kafka_server, group_id), kafka_server,
+                       lambda addresses, kafka_client: kafka.KafkaConsumer(bootstrap_servers=addresses,
+                                                                           group_id=group_id,
+                                                                           enable_auto_commit=False,
+                                                                           kafka_client=kafka_client)) as client:
+            yield client
+
+    @contextlib.contextmanager
+    def _use(self, key: Tuple[Any, ...], kafka_server: KafkaServer,
+             factory: Callable[[List[str], Callable[..., kafka.KafkaClient]], Any]):
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = _KafkaClientEntry(kafka_server, factory)
+            entry = self._entries[key]
+            self._start_reaper()
+
+        with entry.lock:
+            client = entry.get_client()
+            try:
+                yield client
+            except kafka_errors.KafkaError:
+                entry.close()
+                raise
+            finally:
+                entry.last_used = time.monotonic()
+
+    def evict_idle(self) -> None:
+        """关闭空闲超时的客户端"""
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            # 正在被使用的客户端不需要关闭
+            if now - entry.last_used >= self._idle_timeout and entry.lock.acquire(blocking=False):
+                try:
+                    entry.close()
+                except Exception as error:  # 单个客户端关闭失败不影响其他客户端
+                    LOGGER.warning("关闭空闲 Kafka 客户端失败: %s (%s)",
+                                   ",".join(entry.kafka_server.bootstrap_servers), error)
+                finally:
+                    entry.lock.release()
+
+    def close_all(self) -> None:
+        """关闭所有客户端，并停止后台线程"""
+        with self._lock:
+            self._stop_event.set()
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            with entry.lock:
+                entry.close()
+
+    def _start_reaper(self) -> None:
+        """启动定期关闭空闲客户端的后台线程（调用时需持有锁）"""
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._stop_event = threading.Event()
+        self._reaper = threading.Thread(target=self._reap, args=(self._stop_event,),
+                                        name="kafka-client-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap(self, stop_event: threading.Event) -> None:
+        interval = max(self._idle_timeout / 2, 1.0)
+        while not stop_event.wait(interval):
+            try:
+                self.evict_idle()
+            except Exception as error:
+                LOGGER.warning("关闭空闲 Kafka 客户端失败: %s", error)
+
+
+kafka_client_cache = KafkaClientCache()  # 实现 Kafka 客户端缓存的单例
+
+
 class ConnKafkaAdminClient:
-    """根据 KafkaServer 对象创建 kafka-python 的 KafkaAdminClient 对象"""
+    """根据 KafkaServer 对象获取 kafka-python 的 KafkaAdminClient 对象
+
+    KafkaAdminClient 由 kafka_client_cache 缓存并复用，在 with 语句中持有，退出时归还
+    """
 
     def __init__(self, kafka_server: KafkaServer):
-        self.kafka_server = kafka_server  # MySQl 实例的配置
+        self.kafka_server = kafka_server  # Kafka 集群的配置
+        self._context = None
+
+    def __enter__(self) -> kafka.KafkaAdminClient:
+        """在进入 with as 语句的时候被 with 调用，返回值作为 as 后面的变量"""
+        self._context = kafka_client_cache.admin_client(self.kafka_server)
+        return self._context.__enter__()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        context, self._context = self._context, None
+        return context.__exit__(exc_type, exc_val, exc_tb)
+
+
+class ConnKafkaConsumer:
+    """根据 KafkaServer 对象获取 kafka-python 的 KafkaConsumer 对象
+
+    KafkaConsumer 由 kafka_client_cache 缓存并复用，在 with 语句中持有，退出时归还
+    """
 
-        # 初始化 MySQL 连接和 SSH 隧道连接
-        self.kafka_admin_client = None
-        self.ssh_tunnel = None
+    def __init__(self, kafka_server: KafkaServer, group_id: Optional[str] = None):
+        self.kafka_server = kafka_server  # Kafka 集群的配置
+        self.group_id = group_id  # 消费者组
+        self._context = None
 
-    def __enter__(self):
+    def __enter__(self) -> kafka.KafkaConsumer:
         """在进入 with as 语句的时候被 with 调用，返回值作为 as 后面的变量"""
-        if self.kafka_server.ssh_tunnel is not None:
-            # 启动 SSH 隧道
-            self.ssh_tunnel = sshtunnel.SSHTunnelForwarder(
-                ssh_address_or_host=self.kafka_server.ssh_tunnel.address,
-                ssh_username=self.kafka_server.ssh_tunnel.username,
-                ssh_pkey=self.kafka_server.ssh_tunnel.pkey,
-                remote_bind_addresses=[(host_port.host, host_port.port)
-                                       for host_port in self.kafka_server.get_host_list()]
-            )
-            self.ssh_tunnel.start()
-
-            # 更新 Kafka 集群连接信息，令 Kafka 集群连接到 SSH 隧道
-            addresses = [f"127.0.0.1:{self.ssh_tunnel.local_bind_port}"]
-        else:
-            addresses = [f"{host_port.host}:{host_port.port}" for host_port in self.kafka_server.get_host_list()]
-
-        # 启动 Kafka 集群连接
-        print(addresses)
-        self.kafka_admin_client = KafkaAdminClient(bootstrap_servers=addresses)
-
-        return self.kafka_admin_client
+        self._context = kafka_client_cache.consumer(self.kafka_server, self.group_id)
+        return self._context.__enter__()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.kafka_admin_client is not None:
-            self.kafka_admin_client.close()
-        if self.ssh_tunnel is not None:
-            self.ssh_tunnel.close()
+        context, self._context = self._context, None
+        return context.__exit__(exc_type, exc_val, exc_tb)
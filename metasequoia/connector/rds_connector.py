@@ -5,23 +5,37 @@
 
 包含连接器：
 - MysqlConn
+- MysqlConnectionPool
+- MysqlPoolManager
 """
 
-from typing import Optional
+from __future__ import annotations
 
-import pymysql
-import sshtunnel
+import collections
+import logging
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
+from metasequoia.connector.base import ValueObject
 from metasequoia.connector.ssh_tunnel import SshTunnel
+from metasequoia.connector.ssh_tunnel_pool import ssh_tunnel_pool
+from metasequoia.utils.lazy_import_util import lazy_import
 
 # from metasequoia.core.config import Configuration  # TODO 移除反向引用
 
-__all__ = ["RdsInstance", "RdsTable", "MysqlConnector"]
+__all__ = ["RdsInstance", "RdsTable", "MysqlConnector", "MysqlConnectionPool", "MysqlPoolManager", "mysql_pool_manager"]
 
+LOGGER = logging.getLogger(__name__)
 
-class RdsInstance:
+pymysql = lazy_import("pymysql")
+
+
+class RdsInstance(ValueObject):
     """RDS 实例"""
 
+    __slots__ = ("_host", "_port", "_user", "_passwd", "_ssh_tunnel")
+
     def __init__(self, host: str, port: int, user: str, passwd: str, ssh_tunnel: Optional[SshTunnel] = None):
         self._host = host
         self._port = port
@@ -49,16 +63,22 @@ class RdsInstance:
     def ssh_tunnel(self) -> SshTunnel:
         return self._ssh_tunnel
 
-    def set_ssh_tunnel(self, ssh_tunnel: Optional[SshTunnel]):
-        self._ssh_tunnel = ssh_tunnel
+    def with_ssh_tunnel(self, ssh_tunnel: Optional[SshTunnel]) -> "RdsInstance":
+        """返回使用指定 SSH 隧道的新 RDS 实例"""
+        return RdsInstance(self._host, self._port, self._user, self._passwd, ssh_tunnel)
+
+    def _value_key(self) -> Tuple[Any, ...]:
+        return self._host, self._port, self._user, self._passwd, self._ssh_tunnel
 
     def __repr__(self) -> str:
-        return f"<RdsTable host={self.host}, port={self.port}, user={self.user}, passwd={self.passwd}, ssh_tunnel={self.ssh_tunnel}>"
+        return f"<RdsInstance host={self.host}, port={self.port}, user={self.user}, passwd={self.passwd}, ssh_tunnel={self.ssh_tunnel}>"
 
 
-class RdsTable:
+class RdsTable(ValueObject):
     """RDS 表"""
 
+    __slots__ = ("_instance", "_schema", "_table")
+
     def __init__(self, instance: "RdsInstance", schema: str, table: str):
         self._instance = instance
         self._schema = schema
@@ -76,10 +96,325 @@ class RdsTable:
     def table(self) -> str:
         return self._table
 
+    def _value_key(self) -> Tuple[Any, ...]:
+        return self._instance, self._schema, self._table
+
     def __repr__(self) -> str:
         return f"<RdsTable instance={self.instance}, schema={self.schema}, table={self.table}>"
 
 
+class _PooledConnection:
+    """连接池中的 MySQL 连接"""
+
+    def __init__(self, connection: pymysql.Connection, ssh_remote_address: Optional[Tuple[str, int]]):
+        self.connection = connection
+        self.ssh_remote_address = ssh_remote_address  # 连接占用的 SSH 隧道转发的远程地址
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class MysqlConnectionPool:
+    """单个 RDS 实例、数据库的有界 MySQL 连接池
+
+    实现说明：
+    1. 借出连接时执行 ping 检查连接是否可用，不可用的连接直接关闭并重新获取
+    2. 超过最大存活时间的连接在借出或归还时关闭，空闲超时的连接在借出时关闭；
+       MysqlPoolManager 的后台线程定期调用 evict_expired，使不再使用的连接池也能关闭空闲连接
+    3. 归还连接时执行 rollback，避免下一个使用者读取到上一个事务的快照
+    4. 每个连接在存活期间持有 SSH 隧道池中的一个转发引用
+    """
+
+    def __init__(self,
+                 rds_instance: RdsInstance,
+                 schema: Optional[str] = None,
+                 ssh_tunnel_info: Optional[SshTunnel] = None,
+                 connect_timeout: int = 5,
+                 read_timeout: int = 10,
+                 max_size: int = 8,
+                 max_lifetime: float = 1800,
+                 idle_timeout: float = 300,
+                 wait_timeout: float = 30):
+        """
+
+        Parameters
+        ----------
+        rds_instance : RdsInstance
+            MySQL 实例的配置
+        schema : Optional[str], default = None
+            数据库名称
+        ssh_tunnel_info : Optional[SshTunnel], default = None
+            SSH 隧道的配置，如果为 None 则不需要 SSH 隧道
+        connect_timeout : int, default = 5
+            连接超时时间
+        read_timeout : int, default = 10
+            读取超时时间
+        max_size : int, default = 8
+            连接池的最大连接数（包括借出和空闲的连接）
+        max_lifetime : float, default = 1800
+            连接的最大存活时间（秒）
+        idle_timeout : float, default = 300
+            空闲连接的超时时间（秒）
+        wait_timeout : float, default = 30
+            连接池已满时等待可用连接的超时时间（秒）
+        """
+        self.rds_info = rds_instance
+        self.schema = schema
+        self.ssh_tunnel_info = ssh_tunnel_info
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+
+        self._idle: Deque[_PooledConnection] = collections.deque()
+        self._size = 0  # 连接总数（包括借出、空闲和正在创建的连接）
+        self._borrowed = 0
+        self._condition = threading.Condition()
+
+        # 统计信息
+        self._n_waits = 0
+        self._n_created = 0
+        self._n_closed = 0
+        self._create_latency_total = 0.0
+        self._create_latency_max = 0.0
+
+    def borrow(self) -> _PooledConnection:
+        """从连接池中借出连接，如果连接池已满则等待其他连接归还"""
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            self.evict_expired()
+            pooled = None
+            with self._condition:
+                if self._idle:
+                    pooled = self._idle.pop()  # 优先复用最近归还的连接
+                    self._borrowed += 1
+                elif self._size < self.max_size:
+                    self._size += 1
+                    self._borrowed += 1
+                else:
+                    self._n_waits += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise TimeoutError(f"等待 MySQL 连接池可用连接超时: {self.rds_info}, schema={self.schema}")
+                    continue
+
+            if pooled is None:
+                try:
+                    return self._create()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._borrowed -= 1
+                        self._condition.notify()
+                    raise
+
+            if self._is_usable(pooled):
+                return pooled
+            with self._condition:
+                self._borrowed -= 1
+            self._destroy(pooled)
+
+    def give_back(self, pooled: _PooledConnection, discard: bool = False) -> None:
+        """将连接归还到连接池
+
+        Parameters
+        ----------
+        pooled : _PooledConnection
+            借出的连接
+        discard : bool, default = False
+            是否直接关闭连接（例如连接在使用过程中出现了网络错误）
+        """
+        if not discard and time.monotonic() - pooled.created_at < self.max_lifetime:
+            try:
+                pooled.connection.rollback()
+            except pymysql.err.Error:
+                discard = True
+        else:
+            discard = True
+
+        with self._condition:
+            self._borrowed -= 1
+            if not discard:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+                self._condition.notify()
+                return
+        self._destroy(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取连接池的统计信息"""
+        with self._condition:
+            return {
+                "host": self.rds_info.host,
+                "port": self.rds_info.port,
+                "schema": self.schema,
+                "max_size": self.max_size,
+                "size": self._size,
+                "borrowed": self._borrowed,
+                "idle": len(self._idle),
+                "waits": self._n_waits,
+                "created": self._n_created,
+                "closed": self._n_closed,
+                "create_latency_avg_ms": (self._create_latency_total / self._n_created * 1000
+                                          if self._n_created > 0 else 0.0),
+                "create_latency_max_ms": self._create_latency_max * 1000
+            }
+
+    def close(self) -> None:
+        """关闭连接池中的所有空闲连接"""
+        with self._condition:
+            idle_list = list(self._idle)
+            self._idle.clear()
+        for pooled in idle_list:
+            self._destroy(pooled)
+
+    def _create(self) -> _PooledConnection:
+        """创建新的连接（调用前已在连接池中占用了名额）"""
+        start_time = time.monotonic()
+
+        ssh_remote_address = None
+        if self.ssh_tunnel_info is not None:
+            # 从共享的 SSH 隧道池中获取转发端口，令 MySQL 连接到 SSH 隧道
+            ssh_remote_address = (self.rds_info.host, self.rds_info.port)
+            host, port = ssh_tunnel_pool.acquire(self.ssh_tunnel_info, ssh_remote_address)
+        else:
+            host = self.rds_info.host
+            port = self.rds_info.port
+
+        # 启动 MySQL 连接
+        try:
+            connection = pymysql.connect(
+                host=host,
+                port=port,
+                user=self.rds_info.user,
+                passwd=self.rds_info.passwd,
+                db=self.schema,
+                connect_timeout=self.connect_timeout,
+                read_timeout=self.read_timeout
+            )
+        except Exception:
+            if ssh_remote_address is not None:
+                ssh_tunnel_pool.release(self.ssh_tunnel_info, ssh_remote_address)
+            raise
+
+        latency = time.monotonic() - start_time
+        with self._condition:
+            self._n_created += 1
+            self._create_latency_total += latency
+            self._create_latency_max = max(self._create_latency_max, latency)
+        return _PooledConnection(connection, ssh_remote_address)
+
+    def _is_usable(self, pooled: _PooledConnection) -> bool:
+        """检查借出的连接是否可用"""
+        if time.monotonic() - pooled.created_at >= self.max_lifetime:
+            return False
+        try:
+            pooled.connection.ping(reconnect=False)
+        except pymysql.err.Error:
+            return False
+        return True
+
+    def evict_expired(self) -> int:
+        """关闭空闲超时或超过最大存活时间的空闲连接（在锁以外关闭），返回关闭的连接数"""
+        now = time.monotonic()
+        with self._condition:
+            expired = [pooled for pooled in self._idle
+                       if now - pooled.last_used >= self.idle_timeout or now - pooled.created_at >= self.max_lifetime]
+            for pooled in expired:
+                self._idle.remove(pooled)
+        for pooled in expired:
+            self._destroy(pooled)
+        return len(expired)
+
+    def _destroy(self, pooled: _PooledConnection) -> None:
+        """关闭连接并释放连接池中的名额"""
+        try:
+            pooled.connection.close()
+        except pymysql.err.Error:
+            pass
+        if pooled.ssh_remote_address is not None:
+            ssh_tunnel_pool.release(self.ssh_tunnel_info, pooled.ssh_remote_address)
+        with self._condition:
+            self._size -= 1
+            self._n_closed += 1
+            self._condition.notify()
+
+
+class MysqlPoolManager:
+    """按 RDS 实例、数据库管理 MySQL 连接池，并在后台线程中定期关闭各连接池中过期的空闲连接"""
+
+    def __init__(self, reap_interval: float = 60):
+        """
+
+        Parameters
+        ----------
+        reap_interval : float, default = 60
+            检查过期空闲连接的间隔（秒）
+        """
+        self._pools: Dict[Tuple[Any, ...], MysqlConnectionPool] = {}
+        self._lock = threading.Lock()
+        self._reap_interval = reap_interval
+
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def get_pool(self,
+                 rds_instance: RdsInstance,
+                 schema: Optional[str] = None,
+                 ssh_tunnel_info: Optional[SshTunnel] = None,
+                 connect_timeout: int = 5,
+                 read_timeout: int = 10) -> MysqlConnectionPool:
+        """获取 RDS 实例、数据库对应的连接池，如果不存在则创建"""
+        key = (rds_instance, schema, ssh_tunnel_info, connect_timeout, read_timeout)
+        with self._lock:
+            self._start_reaper()
+            if key not in self._pools:
+                self._pools[key] = MysqlConnectionPool(rds_instance=rds_instance,
+                                                       schema=schema,
+                                                       ssh_tunnel_info=ssh_tunnel_info,
+                                                       connect_timeout=connect_timeout,
+                                                       read_timeout=read_timeout)
+            return self._pools[key]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """获取所有连接池的统计信息"""
+        with self._lock:
+            pools = list(self._pools.values())
+        return [pool.stats() for pool in pools]
+
+    def close_all(self) -> None:
+        """关闭所有连接池中的空闲连接，并停止后台线程"""
+        with self._lock:
+            self._stop_event.set()
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+
+    def _start_reaper(self) -> None:
+        """启动定期关闭过期空闲连接的后台线程（调用时需持有锁）"""
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._stop_event = threading.Event()
+        self._reaper = threading.Thread(target=self._reap, args=(self._stop_event,),
+                                        name="mysql-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap(self, stop_event: threading.Event) -> None:
+        while not stop_event.wait(self._reap_interval):
+            with self._lock:
+                pools = list(self._pools.values())
+            for pool in pools:
+                try:
+                    pool.evict_expired()
+                except Exception as error:  # 单个连接池失败不影响其他连接池，也不终止后台线程
+                    LOGGER.warning("关闭过期 MySQL 连接失败: %s:%s, schema=%s (%s)",
+                                   pool.rds_info.host, pool.rds_info.port, pool.schema, error)
+
+
+mysql_pool_manager = MysqlPoolManager()  # 实现 MySQL 连接池管理器的单例
+
+
 class MysqlConnector:
     def __init__(self,
                  rds_instance: RdsInstance,
@@ -108,9 +443,10 @@ class MysqlConnector:
         self.connect_timeout = connect_timeout
         self.read_timeout = read_timeout
 
-        # 初始化 MySQL 连接和 SSH 隧道连接
+        # 初始化连接池和借出的 MySQL 连接
+        self.mysql_pool = None
+        self.pooled_conn = None
         self.mysql_conn = None
-        self.ssh_tunnel = None
 
     @staticmethod
     def create_by_rds_instance(rds_instance: RdsInstance, schema: Optional[str] = None) -> "MysqlConnector":
@@ -141,39 +477,24 @@ class MysqlConnector:
         return MysqlConnector(rds_instance=rds_info, schema=schema, ssh_tunnel_info=ssh_tunnel_info)
 
     def __enter__(self):
-        """在进入 with as 语句的时候被 with 调用，返回值作为 as 后面的变量"""
-        if self.ssh_tunnel_info is not None:
-            # 启动 SSH 隧道
-            self.ssh_tunnel = sshtunnel.SSHTunnelForwarder(
-                ssh_address_or_host=(self.ssh_tunnel_info.host, self.ssh_tunnel_info.port),
-                ssh_username=self.ssh_tunnel_info.username,
-                ssh_pkey=self.ssh_tunnel_info.pkey,
-                remote_bind_address=(self.rds_info.host, self.rds_info.port)
-            )
-            self.ssh_tunnel.start()
-
-            # 更新 MySQL 连接信息，令 MySQL 连接到 SSH 隧道
-            host = "127.0.0.1"
-            port = self.ssh_tunnel.local_bind_port
-        else:
-            host = self.rds_info.host
-            port = self.rds_info.port
-
-        # 启动 MySQL 连接
-        self.mysql_conn = pymysql.connect(
-            host=host,
-            port=port,
-            user=self.rds_info.user,
-            passwd=self.rds_info.passwd,
-            db=self.schema,
-            connect_timeout=self.connect_timeout,
-            read_timeout=self.read_timeout
-        )
+        """在进入 with as 语句的时候被 with 调用，返回值作为 as 后面的变量
 
+        从 RDS 实例、数据库对应的连接池中借出连接，在退出 with 语句时归还
+        """
+        self.mysql_pool = mysql_pool_manager.get_pool(rds_instance=self.rds_info,
+                                                      schema=self.schema,
+                                                      ssh_tunnel_info=self.ssh_tunnel_info,
+                                                      connect_timeout=self.connect_timeout,
+                                                      read_timeout=self.read_timeout)
+        self.pooled_conn = self.mysql_pool.borrow()
+        self.mysql_conn = self.pooled_conn.connection
         return self.mysql_conn
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.mysql_conn is not None:
-            self.mysql_conn.close()
-        if self.ssh_tunnel is not None:
-            self.ssh_tunnel.close()
+        if self.pooled_conn is not None:
+            # 出现连接层面的异常时，不再将连接归还到连接池中复用
+            discard = exc_type is not None and issubclass(exc_type, (pymysql.err.OperationalError,
+                                                                     pymysql.err.InterfaceError))
+            self.mysql_pool.give_back(self.pooled_conn, discard=discard)
+            self.pooled_conn = None
+            self.mysql_conn = None
@@ -3,14 +3,18 @@
 - SshTunnel
 """
 
-from typing import Tuple
+from typing import Any, Tuple
+
+from metasequoia.connector.base import ValueObject
 
 __all__ = ["SshTunnel"]
 
 
-class SshTunnel:
+class SshTunnel(ValueObject):
     """SSH 隧道"""
 
+    __slots__ = ("_host", "_port", "_username", "_pkey")
+
     def __init__(self, host: str, port: int, username: str, pkey: str):
         self._host = host
         self._port = port
@@ -37,12 +41,5 @@ class SshTunnel:
     def address(self) -> Tuple[str, int]:
         return self.host, self.port
 
-    def __hash__(self):
-        return hash((self._host, self._port, self._username, self._pkey))
-
-    def __eq__(self, other):
-        return (isinstance(other, SshTunnel) and
-                self._host == other._host and
-                self._port == other._port and
-                self._username == other._username and
-                self._pkey == other._pkey)
+    def _value_key(self) -> Tuple[Any, ...]:
+        return self._host, self._port, self._username, self._pkey
@@ -0,0 +1,312 @@
+"""
+进程级共享的 SSH 隧道池
+
+包含对象：
+- SshTunnelPool
+- ssh_tunnel_pool（进程级单例）
+
+实现说明：
+1. 每个跳板机（SshTunnel）只维护一个 SSH Transport，不同远程地址的端口转发在同一个 Transport 上复用不同的 channel
+2. 每个（SshTunnel, 远程地址）对应一个本地监听端口，使用引用计数管理，引用数为 0 且空闲超时后关闭；
+   空闲检查在每次访问隧道池时执行，并由后台线程每隔 idle_timeout / 2 秒执行一次，没有新的访问时空闲的隧道也会被关闭
+3. 在 Transport 断开后，新的本地连接会自动重建 Transport，已分配的本地端口保持不变
+4. 建立 SSH 连接耗时较长，因此在隧道池的锁以外进行：同一跳板机同一时间只有一个线程建立连接，其他线程等待该连接的 Future，
+   不同跳板机的连接以及已建立的隧道的获取、释放互不阻塞
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import logging
+import select
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from metasequoia.connector.ssh_tunnel import SshTunnel
+from metasequoia.utils.lazy_import_util import lazy_import
+
+__all__ = ["SshTunnelPool", "ssh_tunnel_pool"]
+
+LOGGER = logging.getLogger(__name__)
+
+paramiko = lazy_import("paramiko")
+
+LOCAL_HOST = "127.0.0.1"
+
+
+class _SshTransport:
+    """跳板机的 SSH Transport，在断开后自动重连"""
+
+    def __init__(self, ssh_tunnel: SshTunnel, connect_timeout: float, keepalive: int):
+        self._ssh_tunnel = ssh_tunnel
+        self._connect_timeout = connect_timeout
+        self._keepalive = keepalive
+        self._client: Optional[paramiko.SSHClient] = None
+        self._lock = threading.Lock()
+
+    def get_transport(self) -> paramiko.Transport:
+        """获取可用的 Transport，如果 Transport 不可用则重新连接"""
+        with self._lock:
+            if self._client is not None:
+                transport = self._client.get_transport()
+                if transport is not None and transport.is_active():
+                    return transport
+                LOGGER.info("SSH 连接已断开，重新连接: %s", self._ssh_tunnel.address)
+                self._client.close()
+                self._client = None
+
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(hostname=self._ssh_tunnel.host,
+                           port=int(self._ssh_tunnel.port),
+                           username=self._ssh_tunnel.username,
+                           key_filename=self._ssh_tunnel.pkey,
+                           timeout=self._connect_timeout,
+                           allow_agent=False,
+                           look_for_keys=False)
+            transport = client.get_transport()
+            transport.set_keepalive(self._keepalive)
+            self._client = client
+            return transport
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+class _ForwardHandler(socketserver.BaseRequestHandler):
+    """将本地连接通过 SSH channel 转发到远程地址"""
+
+    BUFFER_SIZE = 32768
+
+    def handle(self) -> None:
+        forward: "_Forward" = self.server.forward
+        try:
+            channel = forward.ssh_transport.get_transport().open_channel(
+                kind="direct-tcpip",
+                dest_addr=forward.remote_address,
+                src_addr=self.client_address
+            )
+        except (paramiko.SSHException, OSError) as error:
+            LOGGER.warning("打开 SSH 转发通道失败: %s -> %s (%s)", self.client_address, forward.remote_address, error)
+            return
+
+        try:
+            while True:
+                readable, _, _ = select.select([self.request, channel], [], [])
+                if self.request in readable:
+                    data = self.request.recv(self.BUFFER_SIZE)
+                    if not data:
+                        break
+                    channel.sendall(data)
+                if channel in readable:
+                    data = channel.recv(self.BUFFER_SIZE)
+                    if not data:
+                        break
+                    self.request.sendall(data)
+        except OSError:
+            pass
+        finally:
+            channel.close()
+
+
+class _ForwardServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Forward:
+    """一个远程地址的本地端口转发"""
+
+    def __init__(self, ssh_transport: _SshTransport, remote_address: Tuple[str, int]):
+        self.ssh_transport = ssh_transport
+        self.remote_address = remote_address
+        self.ref_count = 0
+        self.last_used = time.monotonic()
+
+        self._server = _ForwardServer((LOCAL_HOST, 0), _ForwardHandler)
+        self._server.forward = self
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name=f"ssh-forward-{remote_address[0]}:{remote_address[1]}",
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def local_address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class SshTunnelPool:
+    """进程级共享、引用计数的 SSH 隧道池"""
+
+    def __init__(self, idle_timeout: float = 300, connect_timeout: float = 10, keepalive: int = 30):
+        """
+
+        Parameters
+        ----------
+        idle_timeout : float, default = 300
+            引用数为 0 的端口转发在空闲多少秒后关闭
+        connect_timeout : float, default = 10
+            SSH 连接超时时间（秒）
+        keepalive : int, default = 30
+            SSH 心跳间隔（秒）
+        """
+        self._idle_timeout = idle_timeout
+        self._connect_timeout = connect_timeout
+        self._keepalive = keepalive
+
+        self._transports: Dict[SshTunnel, _SshTransport] = {}
+        self._forwards: Dict[Tuple[SshTunnel, Tuple[str, int]], _Forward] = {}
+        self._connecting: Dict[SshTunnel, Future] = {}  # 正在建立 SSH 连接的跳板机
+        self._lock = threading.RLock()
+
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def acquire(self, ssh_tunnel: SshTunnel, remote_address: Tuple[str, int]) -> Tuple[str, int]:
+        """获取远程地址对应的本地转发地址，并增加引用计数
+
+        Parameters
+        ----------
+        ssh_tunnel : SshTunnel
+            SSH 隧道（跳板机）的配置
+        remote_address : Tuple[str, int]
+            需要转发的远程地址
+
+        Returns
+        -------
+        Tuple[str, int]
+            本地转发地址
+        """
+        remote_address = (remote_address[0], int(remote_address[1]))
+        self._evict_idle()
+        with self._lock:
+            self._start_reaper()
+            if ssh_tunnel not in self._transports:
+                self._transports[ssh_tunnel] = _SshTransport(ssh_tunnel, self._connect_timeout, self._keepalive)
+            ssh_transport = self._transports[ssh_tunnel]
+            future = self._connecting.get(ssh_tunnel)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._connecting[ssh_tunnel] = future
+
+        # 预先建立 SSH 连接，使连接错误在获取时抛出，而不是在使用端口时静默失败
+        if is_owner:
+            try:
+                ssh_transport.get_transport()
+                future.set_result(None)
+            except BaseException as error:
+                future.set_exception(error)
+            finally:
+                with self._lock:
+                    self._connecting.pop(ssh_tunnel, None)
+        future.result()
+
+        with self._lock:
+            # 连接期间 Transport 可能因没有端口转发被回收，重新登记（已关闭的 Transport 在使用时自动重连）
+            ssh_transport = self._transports.setdefault(ssh_tunnel, ssh_transport)
+            key = (ssh_tunnel, remote_address)
+            if key not in self._forwards:
+                self._forwards[key] = _Forward(ssh_transport, remote_address)
+            forward = self._forwards[key]
+            forward.ref_count += 1
+            forward.last_used = time.monotonic()
+            return forward.local_address
+
+    def release(self, ssh_tunnel: SshTunnel, remote_address: Tuple[str, int]) -> None:
+        """减少远程地址对应本地转发的引用计数"""
+        remote_address = (remote_address[0], int(remote_address[1]))
+        with self._lock:
+            forward = self._forwards.get((ssh_tunnel, remote_address))
+            if forward is not None and forward.ref_count > 0:
+                forward.ref_count -= 1
+                forward.last_used = time.monotonic()
+        self._evict_idle()
+
+    @contextlib.contextmanager
+    def forward(self, ssh_tunnel: SshTunnel, remote_address: Tuple[str, int]):
+        """在 with 语句中获取本地转发地址，退出时自动释放"""
+        local_address = self.acquire(ssh_tunnel, remote_address)
+        try:
+            yield local_address
+        finally:
+            self.release(ssh_tunnel, remote_address)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """获取各个端口转发的统计信息"""
+        self._evict_idle()
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "ssh_host": ssh_tunnel.host,
+                "ssh_port": ssh_tunnel.port,
+                "remote_host": remote_address[0],
+                "remote_port": remote_address[1],
+                "local_port": forward.local_address[1],
+                "ref_count": forward.ref_count,
+                "idle_s": now - forward.last_used if forward.ref_count == 0 else 0.0
+            } for (ssh_tunnel, remote_address), forward in self._forwards.items()]
+
+    def _evict_idle(self) -> None:
+        """关闭空闲超时的端口转发，以及不再有端口转发且没有正在建立连接的 SSH 连接（在锁以外关闭）"""
+        now = time.monotonic()
+        with self._lock:
+            idle_forwards = []
+            for key, forward in list(self._forwards.items()):
+                if forward.ref_count == 0 and now - forward.last_used >= self._idle_timeout:
+                    idle_forwards.append(forward)
+                    del self._forwards[key]
+
+            used_ssh_tunnels = {ssh_tunnel for ssh_tunnel, _ in self._forwards} | set(self._connecting)
+            idle_transports = [self._transports.pop(ssh_tunnel) for ssh_tunnel in list(self._transports)
+                               if ssh_tunnel not in used_ssh_tunnels]
+
+        for forward in idle_forwards:
+            forward.close()
+        for ssh_transport in idle_transports:
+            ssh_transport.close()
+
+    def _start_reaper(self) -> None:
+        """启动定期关闭空闲隧道的后台线程（调用时需持有锁）"""
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._stop_event = threading.Event()
+        self._reaper = threading.Thread(target=self._reap, args=(self._stop_event,),
+                                        name="ssh-tunnel-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap(self, stop_event: threading.Event) -> None:
+        interval = max(self._idle_timeout / 2, 1.0)
+        while not stop_event.wait(interval):
+            try:
+                self._evict_idle()
+            except Exception as error:  # 关闭失败不影响后续检查
+                LOGGER.warning("关闭空闲 SSH 隧道失败: %s", error)
+
+    def close_all(self) -> None:
+        """关闭所有端口转发和 SSH 连接，并停止后台线程"""
+        with self._lock:
+            self._stop_event.set()
+            forwards = list(self._forwards.values())
+            self._forwards.clear()
+            ssh_transports = list(self._transports.values())
+            self._transports.clear()
+        for forward in forwards:
+            forward.close()
+        for ssh_transport in ssh_transports:
+            ssh_transport.close()
+
+
+ssh_tunnel_pool = SshTunnelPool()  # 实现 SSH 隧道池的单例
+atexit.register(ssh_tunnel_pool.close_all)
@@ -1 +1,15 @@
-from metasequoia.core.plugin import PluginBase
+"""
+核心逻辑
+
+PluginBase 在首次访问时才引用，使只使用 metasequoia.core.config 的模块不必加载 streamlit
+"""
+
+__all__ = ["PluginBase"]
+
+
+def __getattr__(name: str):
+    if name == "PluginBase":
+        from metasequoia.core.plugin import PluginBase
+        globals()[name] = PluginBase
+        return PluginBase
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,11 @@
 import json
 import os
-from typing import Dict, Any, List
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 
+from metasequoia.connector.base import intern_value
 from metasequoia.connector.dolphin_meta_connector import DolphinMetaInstance
 from metasequoia.connector.hive_connector import HiveInstance
 from metasequoia.connector.kafka_connector import KafkaServer
@@ -13,133 +17,218 @@ __all__ = ["configuration", "Configuration", "MODE"]
 PROPERTIES_PATH = os.environ.get("PINALE_CONFIG_PATH")
 MODE = "dev"
 
+_EMPTY_SECTION: Mapping[str, Any] = types.MappingProxyType({})
+
 
 # TODO 将配置输出到文件：https://www.cnblogs.com/wengzx/p/18019494
 
 
 class Configuration:
+    """配置信息
+
+    实现说明：
+    1. 首次读取配置时才加载配置文件；之后每次读取时检查文件的修改时间（至多每 CHECK_INTERVAL 秒检查一次），文件变化时自动重新加载
+    2. 每个模式的配置在首次使用时合并（先加载 mode:common，再加载 mode:{mode}）为只读的 MappingProxyType，之后的读取不再复制和合并
+    3. 根据配置构造的 RdsInstance 等对象同样缓存到重新加载为止
+    """
+
     ENCODING = "UTF-8"  # 默认编码格式
+    CHECK_INTERVAL = 1.0  # 检查配置文件修改时间的最小间隔（秒）
 
-    def __init__(self, path: str):
+    def __init__(self, path: Optional[str]):
         """配置文件路径"""
         self.path = path
-        self._configuration = None
-        self.load()
+        self._configuration: Optional[Dict[str, Any]] = None
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._compiled: Dict[str, Dict[str, Dict[str, Mapping[str, Any]]]] = {}  # 模式 -> 类型 -> 名称 -> 合并后的配置
+        self._objects: Dict[Tuple[str, str], Any] = {}  # (类型, 名称) -> 根据配置构造的对象
+        self._lock = threading.RLock()
 
     def load(self):
-        with open(self.path, "r", encoding=self.ENCODING) as file:
-            self._configuration = json.load(file)
+        """立即重新加载配置文件"""
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, "r", encoding=self.ENCODING) as file:
+                self._configuration = json.load(file)
+            self._mtime = mtime
+            self._last_check = time.monotonic()
+            self._compiled.clear()
+            self._objects.clear()
+
+    def _raw(self) -> Dict[str, Any]:
+        """获取配置文件的原始内容，如果未加载或文件已修改则重新加载"""
+        now = time.monotonic()
+        if self._configuration is None or now - self._last_check >= self.CHECK_INTERVAL:
+            with self._lock:
+                if self._configuration is None:
+                    self.load()
+                elif now - self._last_check >= self.CHECK_INTERVAL:
+                    self._last_check = now
+                    if os.stat(self.path).st_mtime != self._mtime:
+                        self.load()
+        return self._configuration
+
+    def _get_object(self, section: str, name: str, factory: Callable[[], Any]) -> Any:
+        """获取根据配置构造的对象，配置文件重新加载后重新构造"""
+        self._raw()
+        key = (section, name)
+        obj = self._objects.get(key)
+        if obj is None:
+            obj = intern_value(factory())
+            with self._lock:
+                self._objects[key] = obj
+        return obj
 
     # ---------- 读取 RDS 相关配置 ----------
 
     def get_rds_list(self) -> List[str]:
         """获取 RDS 列表"""
-        return list(self._configuration.get("RDS", {}).keys())
+        return list(self._raw().get("RDS", {}).keys())
 
-    def get_rds(self, name: str, mode: str = MODE) -> Dict[str, Any]:
+    def get_rds(self, name: str, mode: str = MODE) -> Mapping[str, Any]:
         """获取 RDS 信息"""
         return self._confirm_params("RDS", self._get_section("RDS", name, mode), ["host", "port", "user"])
 
     def get_rds_instance(self, name: str) -> RdsInstance:
         """获取 RdsInstance 对象"""
-        rds_info = self.get_rds(name)
-        ssh_tunnel = self.get_ssh_tunnel(rds_info["use_ssh"]) if rds_info.get("use_ssh") else None
-        return RdsInstance(host=rds_info["host"],
-                           port=rds_info["port"],
-                           user=rds_info["user"],
-                           passwd=rds_info["passwd"],
-                           ssh_tunnel=ssh_tunnel)
+
+        def create() -> RdsInstance:
+            rds_info = self.get_rds(name)
+            ssh_tunnel = self.get_ssh_tunnel(rds_info["use_ssh"]) if rds_info.get("use_ssh") else None
+            return RdsInstance(host=rds_info["host"],
+                               port=rds_info["port"],
+                               user=rds_info["user"],
+                               passwd=rds_info["passwd"],
+                               ssh_tunnel=ssh_tunnel)
+
+        return self._get_object("RDS", name, create)
 
     def get_rds_name(self, name: str) -> str:
         """获取 RDS 的名称"""
-        return self._configuration["RDS"][name].get("_name", "")
+        return self._raw()["RDS"][name].get("_name", "")
 
     # ---------- 读取 SSH 相关配置 ----------
 
-    def get_ssh(self, name: str, mode: str = MODE) -> Dict[str, Any]:
+    def get_ssh(self, name: str, mode: str = MODE) -> Mapping[str, Any]:
         """获取 SSH 信息"""
         return self._confirm_params("SSH", self._get_section("SSH", name, mode), ["host", "port"])
 
     def get_ssh_tunnel(self, name: str) -> SshTunnel:
         """获取 SshTunnel 对象"""
-        ssh_info = self.get_ssh(name)
-        return SshTunnel(host=ssh_info["host"],
-                         port=ssh_info["port"],
-                         username=ssh_info["username"],
-                         pkey=ssh_info["pkey"])
+
+        def create() -> SshTunnel:
+            ssh_info = self.get_ssh(name)
+            return SshTunnel(host=ssh_info["host"],
+                             port=ssh_info["port"],
+                             username=ssh_info["username"],
+                             pkey=ssh_info["pkey"])
+
+        return self._get_object("SSH", name, create)
 
     def get_ssh_list(self):
         """获取 SSH 列表"""
-        return list(self._configuration["SSH"].keys())
+        return list(self._raw()["SSH"].keys())
 
     # ---------- 读取 Kafka 相关配置 ----------
 
     def get_kafka_list(self) -> List[str]:
         """获取 Kafka 列表"""
-        return list(self._configuration.get("Kafka", {}).keys())
+        return list(self._raw().get("Kafka", {}).keys())
 
-    def get_kafka_info(self, name: str, mode: str = MODE) -> Dict[str, Any]:
+    def get_kafka_info(self, name: str, mode: str = MODE) -> Mapping[str, Any]:
         return self._confirm_params("Kafka", self._get_section("Kafka", name, mode), ["bootstrap_servers"])
 
     def get_kafka_server(self, name: str) -> KafkaServer:
         """获取 Kafka Servers 对象"""
-        kafka_info = self.get_kafka_info(name)
-        ssh_tunnel = self.get_ssh_tunnel(kafka_info["use_ssh"]) if kafka_info.get("use_ssh") else None
-        return KafkaServer(bootstrap_servers=kafka_info["bootstrap_servers"],
-                           ssh_tunnel=ssh_tunnel)
+
+        def create() -> KafkaServer:
+            kafka_info = self.get_kafka_info(name)
+            ssh_tunnel = self.get_ssh_tunnel(kafka_info["use_ssh"]) if kafka_info.get("use_ssh") else None
+            return KafkaServer(bootstrap_servers=kafka_info["bootstrap_servers"],
+                               ssh_tunnel=ssh_tunnel)
+
+        return self._get_object("Kafka", name, create)
 
     # ---------- 读取 Hive 相关配置 ----------
 
     def get_hive_list(self) -> List[str]:
         """获取 Hive 列表"""
-        return list(self._configuration.get("Hive", {}).keys())
+        return list(self._raw().get("Hive", {}).keys())
 
-    def get_hive_info(self, name: str, mode: str = MODE) -> Dict[str, Any]:
+    def get_hive_info(self, name: str, mode: str = MODE) -> Mapping[str, Any]:
         return self._confirm_params("Hive", self._get_section("Hive", name, mode), ["hosts", "port"])
 
     def get_hive_instance(self, name: str) -> HiveInstance:
         """获取 Hive 列表"""
-        hive_info = self.get_hive_info(name)
-        ssh_tunnel = self.get_ssh_tunnel(hive_info["use_ssh"]) if hive_info.get("use_ssh") else None
-        return HiveInstance(hosts=hive_info["hosts"], port=hive_info["port"],
-                            ssh_tunnel=ssh_tunnel)
+
+        def create() -> HiveInstance:
+            hive_info = self.get_hive_info(name)
+            ssh_tunnel = self.get_ssh_tunnel(hive_info["use_ssh"]) if hive_info.get("use_ssh") else None
+            return HiveInstance(hosts=hive_info["hosts"], port=hive_info["port"],
+                                ssh_tunnel=ssh_tunnel)
+
+        return self._get_object("Hive", name, create)
 
     # ---------- 读取 DolphinScheduler 相关配置 ----------
 
     def get_dolphin_meta_list(self) -> List[str]:
         """获取海豚调度元数据清单"""
-        return list(self._configuration["DolphinMeta"])
+        return list(self._raw().get("DolphinMeta", {}))
 
-    def get_dolphin_meta_info(self, name: str, mode: str = MODE) -> Dict[str, Any]:
+    def get_dolphin_meta_info(self, name: str, mode: str = MODE) -> Mapping[str, Any]:
         """获取海豚调度元数据信息"""
         return self._get_section("DolphinMeta", name, mode)
 
     def get_dolphin_meta_instance(self, name: str) -> DolphinMetaInstance:
         """获取海豚调度元数据的 DolphinMetaInstance 对象"""
-        dolphin_meta_info = self.get_dolphin_meta_info(name)
-        ssh_tunnel = self.get_ssh_tunnel(dolphin_meta_info["use_ssh"]) if dolphin_meta_info.get("use_ssh") else None
-        return DolphinMetaInstance(
-            host=dolphin_meta_info["host"],
-            port=dolphin_meta_info["port"],
-            user=dolphin_meta_info["user"],
-            passwd=dolphin_meta_info["passwd"],
-            db=dolphin_meta_info["db"],
-            ssh_tunnel=ssh_tunnel
-        )
+
+        def create() -> DolphinMetaInstance:
+            dolphin_meta_info = self.get_dolphin_meta_info(name)
+            ssh_tunnel = (self.get_ssh_tunnel(dolphin_meta_info["use_ssh"])
+                          if dolphin_meta_info.get("use_ssh") else None)
+            return DolphinMetaInstance(
+                host=dolphin_meta_info["host"],
+                port=dolphin_meta_info["port"],
+                user=dolphin_meta_info["user"],
+                passwd=dolphin_meta_info["passwd"],
+                db=dolphin_meta_info["db"],
+                ssh_tunnel=ssh_tunnel
+            )
+
+        return self._get_object("DolphinMeta", name, create)
 
     # ---------- 其他工具方法 ----------
 
-    def _get_section(self, section: str, name: str, mode: str) -> Dict[str, Any]:
-        """获取每种类型的配置信息数据"""
-        if section not in self._configuration or name not in self._configuration[section]:
-            return {}
-        config = self._configuration[section][name].get("mode:common", {}).copy()  # 先加载通用配置
-        config.update(self._configuration[section][name].get(f"mode:{mode}", {}))  # 然后再加对应模式的配置
-        print(self._configuration[section][name])
-        return config
+    def _get_section(self, section: str, name: str, mode: str) -> Mapping[str, Any]:
+        """获取每种类型的配置信息数据（只读）"""
+        configuration = self._raw()
+        compiled = self._compiled.get(mode)
+        if compiled is None:
+            compiled = self._compile(configuration, mode)
+            with self._lock:
+                if configuration is self._configuration:  # 编译期间配置文件未被重新加载
+                    self._compiled[mode] = compiled
+        return compiled.get(section, {}).get(name, _EMPTY_SECTION)
+
+    @staticmethod
+    def _compile(configuration: Dict[str, Any], mode: str) -> Dict[str, Dict[str, Mapping[str, Any]]]:
+        """将每种类型、每个名称的配置合并为指定模式下的只读配置"""
+        compiled = {}
+        for section, items in configuration.items():
+            if not isinstance(items, dict):
+                continue
+            compiled[section] = {}
+            for name, item in items.items():
+                if not isinstance(item, dict):
+                    continue
+                config = dict(item.get("mode:common", {}))  # 先加载通用配置
+                config.update(item.get(f"mode:{mode}", {}))  # 然后再加对应模式的配置
+                compiled[section][name] = types.MappingProxyType(config)
+        return compiled
 
     @staticmethod
-    def _confirm_params(section: str, config: Dict[str, Any], params: List[str]) -> Dict[str, Any]:
+    def _confirm_params(section: str, config: Mapping[str, Any], params: List[str]) -> Mapping[str, Any]:
         """检查参数是否满足"""
         for param in params:
             assert param in config, f"param {param} not in {section} config"
@@ -157,4 +246,4 @@ class Configuration:
             print("配置文件模板生成完成")
 
 
-configuration = Configuration(PROPERTIES_PATH)  # 实现配置信息的单例
+configuration = Configuration(PROPERTIES_PATH)  # 实现配置信息的单例（首次读取配置时加载配置文件）
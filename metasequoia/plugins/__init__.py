@@ -1,2 +1,30 @@
-from metasequoia.plugins.get_kafka_topic_info.plugin_main import PluginGetKafkaTopicInfo
-from metasequoia.plugins.select_mysql_as_csv.plugin_main import PluginSelectMysqlAsCsv
+"""
+内置插件
+
+插件在首次访问时才引用，使每个页面只加载自身使用的插件及其依赖
+"""
+
+import importlib
+
+__all__ = ["PluginGetKafkaTopicInfo", "PluginSelectMysqlAsCsv", "PluginGetHiveTableInfo", "PluginSelectHive",
+           "PluginCacheStats"]
+
+_PLUGIN_MODULES = {
+    "PluginGetKafkaTopicInfo": "metasequoia.plugins.get_kafka_topic_info.plugin_main",
+    "PluginSelectMysqlAsCsv": "metasequoia.plugins.select_mysql_as_csv.plugin_main",
+    "PluginGetHiveTableInfo": "metasequoia.plugins.get_hive_table_info.plugin_main",
+    "PluginSelectHive": "metasequoia.plugins.select_hive.plugin_main",
+    "PluginCacheStats": "metasequoia.plugins.cache_stats.plugin_main",
+}
+
+
+def __getattr__(name: str):
+    if name in _PLUGIN_MODULES:
+        plugin = getattr(importlib.import_module(_PLUGIN_MODULES[name]), name)
+        globals()[name] = plugin
+        return plugin
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
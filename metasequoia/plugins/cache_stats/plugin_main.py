@@ -0,0 +1,51 @@
+"""
+【开发】缓存及连接池统计信息
+"""
+
+import streamlit as st
+
+from metasequoia.components import memory_cache
+from metasequoia.connector.hive_connector import hive_host_selector
+from metasequoia.connector.rds_connector import mysql_pool_manager
+from metasequoia.connector.ssh_tunnel_pool import ssh_tunnel_pool
+from metasequoia.core import PluginBase
+from metasequoia.utils.hive_result_cache_util import get_default_result_cache
+
+
+class PluginCacheStats(PluginBase):
+    @staticmethod
+    def page_name() -> str:
+        return "【开发】缓存及连接池统计信息"
+
+    def draw_page(self) -> None:
+        st.markdown("### 缓存及连接池统计信息\n"
+                    "\n"
+                    "本功能用于查看当前进程中各缓存函数的命中率、淘汰次数及回源耗时，以及各连接池的使用情况，用于调整缓存的 TTL 和 max_entries。")
+
+        st.divider()
+
+        st.markdown("#### 缓存函数")
+        cache_stats = memory_cache.cache_stats()
+        if cache_stats:
+            st.table(cache_stats)
+        else:
+            st.info("当前进程中没有缓存函数")
+        if st.button("清空全部进程内缓存"):
+            memory_cache.clear_all()
+            st.rerun()
+
+        st.markdown("#### Hive 查询结果缓存")
+        result_cache = get_default_result_cache()
+        st.table([result_cache.stats()])
+        if st.button("清空 Hive 查询结果缓存"):
+            result_cache.clear()
+            st.rerun()
+
+        st.markdown("#### MySQL 连接池")
+        st.table(mysql_pool_manager.stats())
+
+        st.markdown("#### HiveServer2 节点")
+        st.table(hive_host_selector.stats())
+
+        st.markdown("#### SSH 端口转发")
+        st.table(ssh_tunnel_pool.stats())
@@ -0,0 +1,58 @@
+"""
+查询 Hive 表的表结构
+"""
+
+import streamlit as st
+
+from metasequoia.components import cache_data
+from metasequoia.components.input_component import input_hive_instance, input_hive_schema
+from metasequoia.core import PluginBase
+
+
+class PluginGetHiveTableInfo(PluginBase):
+    @staticmethod
+    def page_name() -> str:
+        return "【Hive】表结构查询工具"
+
+    def draw_page(self) -> None:
+        st.markdown("### Hive 表结构查询工具\n"
+                    "\n"
+                    "本功能用于批量查询同一数据库中多张 Hive 表的字段和分区字段，表结构在进程内缓存 30 分钟。")
+
+        st.divider()
+
+        # 输入 Hive 集群、数据库和表名列表
+        hive_instance = input_hive_instance(use_ssh=self.mode.is_dev)
+        schema = input_hive_schema(hive_instance)
+        if hive_instance is not None and schema is not None:
+            options = cache_data.hive_catalog(hive_instance).tables(schema)
+        else:
+            options = []
+        tables = st.multiselect(label="表", options=options, placeholder="请选择表")
+
+        st.divider()
+
+        col1, col2 = st.columns(2)
+        if col2.button("刷新表结构缓存") and hive_instance is not None and schema is not None:
+            cache_data.hive_catalog(hive_instance).refresh(schema)
+
+        if col1.button("查询表结构"):
+            self.check_is_not_none(hive_instance, "未输入完整的 Hive 集群信息")
+            self.check_is_not_none(schema, "未选择数据库")
+            if not tables:
+                st.error("未选择表")
+                st.stop()
+
+            table_schemas = cache_data.hive_catalog(hive_instance).describe_many(schema, tables)
+            for table, table_schema in table_schemas.items():
+                st.markdown(f"#### {schema}.{table}")
+                if table_schema is None:
+                    st.warning("表不存在或没有权限")
+                    continue
+                st.markdown("##### 字段")
+                st.table([{"字段名": column["name"], "类型": column["type"], "注释": column["comment"]}
+                          for column in table_schema["columns"]])
+                if table_schema["partition_columns"]:
+                    st.markdown("##### 分区字段")
+                    st.table([{"字段名": column["name"], "类型": column["type"], "注释": column["comment"]}
+                              for column in table_schema["partition_columns"]])
@@ -3,11 +3,12 @@
 """
 
 import streamlit as st
-from kafka import KafkaConsumer, TopicPartition
 
 from metasequoia.components import cache_data
-from metasequoia.components.input_component import input_kafka_topic
+from metasequoia.components.input_component import input_kafka_server, input_kafka_topic_list, input_kafka_group_list
+from metasequoia.connector.kafka_connector import KafkaTopic, KafkaGroup
 from metasequoia.core import PluginBase
+from metasequoia.utils import kafka_util
 
 
 class PluginGetKafkaTopicInfo(PluginBase):
@@ -22,56 +23,106 @@ class PluginGetKafkaTopicInfo(PluginBase):
 
         st.divider()
 
-        # 输入 KafkaTopic 对象
-        kafka_topic = input_kafka_topic(use_ssh=self.mode.is_dev)
+        # 输入 Kafka 集群和 TOPIC 列表
+        kafka_server = input_kafka_server(use_ssh=self.mode.is_dev)
+        topics = input_kafka_topic_list(kafka_server)
 
         st.divider()
 
         if st.button("查询 TOPIC 配置信息"):
-            topic_configs = cache_data.kafka_get_topic_configs(kafka_topic)
-            topic_config_frame = []
-            for config_name, config_value in topic_configs.items():
-                topic_config_frame.append({
-                    "配置名": config_name,
-                    "配置值": config_value
-                })
-
-            retention_ms = int(topic_configs["retention.ms"]) / 1000 / 3600
-            st.markdown(f"##### 重要配置信息\n"
-                        f"\n"
-                        f"- 过期时间：{retention_ms}（小时）")
-
-            st.markdown("##### 完整配置信息")
-            st.table(topic_config_frame)
+            self.check_is_not_none(kafka_server, "未输入完整的 Kafka 集群信息")
+            for topic in topics:
+                topic_configs = cache_data.kafka_get_topic_configs(KafkaTopic(kafka_server=kafka_server, topic=topic))
+                topic_config_frame = []
+                for config_name, config_value in topic_configs.items():
+                    topic_config_frame.append({
+                        "配置名": config_name,
+                        "配置值": config_value
+                    })
+
+                retention_ms = int(topic_configs["retention.ms"]) / 1000 / 3600
+                st.markdown(f"#### {topic}\n"
+                            f"\n"
+                            f"##### 重要配置信息\n"
+                            f"\n"
+                            f"- 过期时间：{retention_ms}（小时）")
+
+                st.markdown("##### 完整配置信息")
+                st.table(topic_config_frame)
 
         st.divider()
 
-        group_id = st.text_input(label="消费者组", value=None)
+        groups = input_kafka_group_list(kafka_server)
 
-        # 创建 Kafka 连接
+        # 查询各消费者组、各分区的延迟；未选择 TOPIC 时查询消费者组消费的全部 TOPIC
         if st.button("查询各分区偏移量"):
-            self.check_is_not_none(kafka_topic, "未输入完整的 Kafka 集群、TOPIC 和消费者组信息")
-
-            consumer = KafkaConsumer(group_id=group_id,
-                                     bootstrap_servers=kafka_topic.kafka_server,
-                                     api_version=(0, 11))
-
-            # 查询并打印每个 TOPIC 的偏移量
-            tp_lst = [TopicPartition(kafka_topic.topic, int(partition))
-                      for partition in consumer.partitions_for_topic(kafka_topic.topic)]
-            tp_begin_dict = consumer.beginning_offsets(tp_lst)
-            tp_end_dict = consumer.end_offsets(tp_lst)
-            consumer.assign(tp_lst)
-            data_list = []
-            for tp in tp_lst:
-                data_list.append({
-                    "partition(分区)": tp.partition,
-                    "start_offset(最小偏移量)": tp_begin_dict[tp],
-                    "current_offset(当前偏移量)": consumer.position(tp),
-                    "end_offset(最大偏移量)": tp_end_dict[tp],
-                    "lag(延迟偏移量)": tp_end_dict[tp] - consumer.position(tp)
-                })
-            consumer.close()
+            self.check_is_not_none(kafka_server, "未输入完整的 Kafka 集群信息")
+            if not groups:
+                st.error("未选择消费者组")
+                st.stop()
+
+            lag_list = kafka_util.get_consumer_lag(kafka_server, groups, topics if topics else None)
+
+            # 展示各消费者组、TOPIC 的总延迟
+            total_lag = {}
+            for record in lag_list:
+                key = (record["group"], record["topic"])
+                total_lag[key] = total_lag.get(key, 0) + (record["lag"] or 0)
+            st.table([{"group(消费者组)": group, "topic(TOPIC)": topic, "lag(总延迟偏移量)": lag}
+                      for (group, topic), lag in total_lag.items()])
 
             # 展示各分区偏移量
-            st.table(data_list)
+            st.table([{
+                "group(消费者组)": record["group"],
+                "topic(TOPIC)": record["topic"],
+                "partition(分区)": record["partition"],
+                "start_offset(最小偏移量)": record["begin_offset"],
+                "current_offset(当前偏移量)": record["committed_offset"],
+                "end_offset(最大偏移量)": record["end_offset"],
+                "lag(延迟偏移量)": record["lag"]
+            } for record in lag_list])
+
+        st.divider()
+
+        self.draw_lag_sampler(kafka_server, topics, groups)
+
+    @staticmethod
+    def draw_lag_sampler(kafka_server, topics, groups) -> None:
+        """持续采样消费者组的延迟，展示各分区的生产速度、消费速度和追平时间"""
+        st.markdown("##### 持续采样\n"
+                    "\n"
+                    "在后台定期采样所选消费者组的偏移量，用于判断分区是消费中止还是消费较慢。")
+
+        sampler = cache_data.kafka_lag_sampler()
+        col1, col2, col3 = st.columns(3)
+        if col1.button("开始采样所选消费者组") and kafka_server is not None:
+            for group in groups:
+                kafka_group = KafkaGroup(kafka_server=kafka_server, group=group)
+                if topics:
+                    for topic in topics:
+                        sampler.watch(kafka_group, KafkaTopic(kafka_server=kafka_server, topic=topic))
+                else:
+                    sampler.watch(kafka_group)
+            sampler.sample_once()
+        if col2.button("停止采样所选消费者组") and kafka_server is not None:
+            for group in groups:
+                sampler.unwatch(KafkaGroup(kafka_server=kafka_server, group=group))
+        col3.button("刷新")
+
+        if kafka_server is None:
+            return
+
+        last_error = sampler.last_error(kafka_server)
+        if last_error is not None:
+            st.warning(f"最近一次采样失败：{last_error}")
+
+        st.table([{
+            "group(消费者组)": record["group"],
+            "topic(TOPIC)": record["topic"],
+            "partition(分区)": record["partition"],
+            "lag(延迟偏移量)": record["lag"],
+            "produce_rate(生产速度/秒)": record["produce_rate"],
+            "consume_rate(消费速度/秒)": record["consume_rate"],
+            "eta(追平时间/秒)": record["eta_seconds"],
+            "status(状态)": record["status"]
+        } for record in sampler.estimates(kafka_server)])
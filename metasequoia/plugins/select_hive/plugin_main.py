@@ -0,0 +1,48 @@
+"""
+【Hive】执行 Hive 查询并展示结果
+"""
+
+import datetime
+
+import streamlit as st
+
+from metasequoia.components.input_component import input_hive_instance
+from metasequoia.core import PluginBase
+from metasequoia.utils import hive_util
+
+
+class PluginSelectHive(PluginBase):
+    @staticmethod
+    def page_name() -> str:
+        return "【Hive】查询工具"
+
+    def draw_page(self) -> None:
+        st.markdown("### Hive 查询工具\n"
+                    "\n"
+                    "本功能用于执行 Hive 查询并展示前若干条结果。启用结果缓存后，缓存有效期内重复执行相同的查询"
+                    "（忽略大小写、空白和注释的差异）直接返回缓存的结果，不再访问集群。")
+
+        st.divider()
+
+        hive_instance = input_hive_instance(use_ssh=self.mode.is_dev)
+        select_sql = st.text_area(label="查询语句", value=None)
+        max_rows = int(st.number_input(label="最多展示的记录数", min_value=1, max_value=100000, value=1000))
+        use_cache = st.checkbox(label="使用结果缓存", value=True)
+        cache_hours = st.selectbox(label="缓存有效期（小时）", options=[1, 6, 24], index=0, disabled=not use_cache)
+
+        if st.button("执行查询"):
+            self.check_is_not_none(hive_instance, "未输入完整的 Hive 集群信息")
+            self.check_is_not_none(select_sql, "未输入查询语句")
+            sql = select_sql.strip()
+            if not sql.upper().startswith(("SELECT", "WITH")):
+                st.error("不支持 SELECT 以外的其他语法")
+                st.stop()
+            if ";" in sql.rstrip(";"):
+                st.error("不支持超过一个 SQL 语句")
+                st.stop()
+
+            cache_ttl = datetime.timedelta(hours=cache_hours) if use_cache else None
+            result = hive_util.execute_and_fetch_result(hive_instance, sql.rstrip(";"), max_rows=max_rows,
+                                                        cache_ttl=cache_ttl)
+            st.caption(f"共 {len(result)} 条记录")
+            st.dataframe(result)
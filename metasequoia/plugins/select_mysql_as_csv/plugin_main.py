@@ -1,7 +1,11 @@
 """
 【MySQL】查询MySQL并作为csv文件下载
+
+查询结果流式写入临时文件，但 st.download_button 会将文件的全部内容读入内存，因此最多导出 MAX_ROWS 条记录
 """
 
+import os
+import tempfile
 from typing import Optional
 
 import streamlit as st
@@ -9,10 +13,12 @@ import streamlit as st
 from metasequoia.components.input_component import input_rds_instance, input_rds_schema
 from metasequoia.connector.rds_connector import RdsInstance, MysqlConnector
 from metasequoia.core import PluginBase
-from metasequoia.utils.mysql_util import conn_select_sql_as_dict
+from metasequoia.utils.mysql_util import conn_select_sql_to_csv
 
 
 class PluginSelectMysqlAsCsv(PluginBase):
+    MAX_ROWS = 100000  # 最多导出的记录数，避免下载时将过大的文件读入内存
+
     @staticmethod
     def page_name() -> str:
         return "【MySQL】查询MySQL并作为csv文件下载"
@@ -21,23 +27,29 @@ class PluginSelectMysqlAsCsv(PluginBase):
         rds_instance = input_rds_instance()
         rds_schema = input_rds_schema(rds_instance)
         select_sql = st.text_input(label="查询语句", value=None)
+        st.caption(f"最多导出 {self.MAX_ROWS} 条记录，超出部分请在查询语句中分批导出")
 
         if rds_instance is not None and rds_schema is not None and select_sql is not None:
-            data = self.download_data_build_csv(rds_instance, rds_schema, select_sql)
+            path = self.download_data_build_csv(rds_instance, rds_schema, select_sql)
         else:
-            data = ""
+            path = None
 
-        st.download_button(
-            label="下载",
-            data=data,
-            file_name="download.csv",
-            mime="text/csv"
-        )
+        if path is None:
+            st.download_button(label="下载", data="", file_name="download.csv", mime="text/csv")
+            return
+        try:
+            # download_button 在调用时读取文件的全部内容，之后即可删除临时文件
+            with open(path, "rb") as file:
+                st.download_button(label="下载", data=file, file_name="download.csv", mime="text/csv")
+        finally:
+            os.remove(path)
 
-    @staticmethod
-    def download_data_build_csv(rds_instance: Optional[RdsInstance],
+    @classmethod
+    def download_data_build_csv(cls,
+                                rds_instance: Optional[RdsInstance],
                                 rds_schema: Optional[str],
-                                select_sql: Optional[str]):
+                                select_sql: Optional[str]) -> Optional[str]:
+        """执行查询并将前 MAX_ROWS 条结果流式写入临时 csv 文件，返回临时文件的路径；没有结果或查询失败时删除临时文件并返回 None"""
         if rds_instance is None:
             st.error("请输入 RDS 实例")
             return
@@ -57,21 +69,20 @@ class PluginSelectMysqlAsCsv(PluginBase):
             st.error("不支持超过一个 SQL 语句")
             return
 
-        columns = []
-        results = []
-        with MysqlConnector.create_by_rds_instance(rds_instance=rds_instance, schema=rds_schema) as conn:
-            records = conn_select_sql_as_dict(conn, select_sql)
-            if len(records) == 0:
-                st.warning("查询到 0 条记录")
-                return
-
-            # 获取列名
-            for column in records[0]:
-                columns.append(column)
-            results.append(",".join(columns))
+        file = tempfile.NamedTemporaryFile(mode="w", encoding="UTF-8", newline="", suffix=".csv", delete=False)
+        try:
+            with file:
+                with MysqlConnector.create_by_rds_instance(rds_instance=rds_instance, schema=rds_schema) as conn:
+                    n_rows = conn_select_sql_to_csv(conn, select_sql, file, max_rows=cls.MAX_ROWS)
+        except BaseException:
+            os.remove(file.name)
+            raise
 
-            for record in records:
-                values = [str(record[column]) for column in columns]
-                results.append(",".join(values))
+        if n_rows == 0:
+            os.remove(file.name)
+            st.warning("查询到 0 条记录")
+            return
+        if n_rows >= cls.MAX_ROWS:
+            st.warning(f"查询结果达到导出上限，只导出了前 {cls.MAX_ROWS} 条记录")
 
-        return "\n".join(results)
+        return file.name
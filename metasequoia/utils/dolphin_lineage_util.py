@@ -0,0 +1,272 @@
+"""
+海豚调度工作流血缘索引
+
+依赖：mysql_util、dolphin_util
+"""
+
+from __future__ import annotations
+
+import collections
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from metasequoia.connector.dolphin_meta_connector import DolphinMetaInstance, DolphinMetaConnector
+from metasequoia.utils import dolphin_util
+from metasequoia.utils import mysql_util
+from metasequoia.utils.lazy_import_util import lazy_import
+
+__all__ = ["DolphinLineageIndex", "parse_dependent_process_codes"]
+
+LOGGER = logging.getLogger(__name__)
+
+pymysql = lazy_import("pymysql")
+
+UPSTREAM = "upstream"
+DOWNSTREAM = "downstream"
+
+
+def parse_dependent_process_codes(task_params: Optional[str]) -> Set[int]:
+    """解析 DEPENDENT 任务的任务参数，返回依赖的工作流编码
+
+    任务参数的格式为：{"dependence": {"dependTaskList": [{"dependItemList": [{"projectCode": ..., "definitionCode": ...}]}]}}
+    """
+    if not task_params:
+        return set()
+    try:
+        params = json.loads(task_params)
+        depend_task_list = (params.get("dependence") or {}).get("dependTaskList") or []
+        return {int(item["definitionCode"])
+                for depend_task in depend_task_list
+                for item in depend_task.get("dependItemList") or []
+                if item.get("definitionCode") is not None}
+    except (ValueError, TypeError, AttributeError, KeyError) as error:
+        LOGGER.warning("解析 DEPENDENT 任务参数失败: %s (%s)", task_params[:200], error)
+        return set()
+
+
+class DolphinLineageIndex:
+    """海豚调度工作流之间依赖关系（血缘）的内存索引
+
+    工作流 A 中的 DEPENDENT 任务依赖工作流 B 时，B 是 A 的上游，A 是 B 的下游。
+
+    实现说明：
+    1. 首次刷新时一次性加载全部工作流、任务关系以及 DEPENDENT 任务的参数，解析为邻接表
+    2. 之后的刷新只查询 update_time 不早于上次最大 update_time 的记录（增量刷新）：
+       - 工作流、任务直接覆盖；任务关系变化的工作流重新查询该工作流的全部任务关系
+       - 删除的记录无法通过增量刷新发现，因此每隔 full_refresh_interval 秒执行一次全量刷新
+    3. 上下游查询为内存中的广度优先搜索；完整的上下游闭包按工作流缓存，在下次刷新后失效
+    """
+
+    def __init__(self, instance: DolphinMetaInstance, full_refresh_interval: float = 3600):
+        """
+
+        Parameters
+        ----------
+        instance : DolphinMetaInstance
+            海豚调度元数据实例
+        full_refresh_interval : float, default = 3600
+            两次全量刷新之间的间隔（秒）
+        """
+        self._instance = instance
+        self._full_refresh_interval = full_refresh_interval
+
+        self._processes: Dict[int, Dict[str, Any]] = {}  # 工作流编码 -> {project_code, code, name}
+        self._process_tasks: Dict[int, Set[int]] = {}  # 工作流编码 -> 任务编码集合
+        self._task_dependencies: Dict[int, Set[int]] = {}  # DEPENDENT 任务编码 -> 依赖的工作流编码集合
+        self._upstream: Dict[int, Set[int]] = {}  # 工作流编码 -> 直接上游工作流编码集合
+        self._downstream: Dict[int, Set[int]] = {}  # 工作流编码 -> 直接下游工作流编码集合
+        self._closures: Dict[Tuple[str, int], FrozenSet[int]] = {}
+
+        self._watermarks: Dict[str, Tuple[Any, FrozenSet[int]]] = {}  # 表名 -> (已加载记录的最大 update_time, 该时间的记录 id)
+        self._last_full_refresh: Optional[float] = None
+        self._last_refresh: Optional[float] = None
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+    # ---------- 刷新 ----------
+
+    def refresh(self, full: bool = False) -> None:
+        """刷新索引：首次刷新、指定 full 或距上次全量刷新超过 full_refresh_interval 时全量刷新，否则增量刷新"""
+        with self._refresh_lock:
+            now = time.monotonic()
+            if (full or self._last_full_refresh is None
+                    or now - self._last_full_refresh >= self._full_refresh_interval):
+                with DolphinMetaConnector(self._instance) as conn:
+                    self._full_refresh(conn)
+                self._last_full_refresh = now
+            else:
+                with DolphinMetaConnector(self._instance) as conn:
+                    self._incremental_refresh(conn)
+            self._last_refresh = now
+
+    def refresh_if_stale(self, max_age: float) -> None:
+        """距上次刷新超过 max_age 秒时刷新索引"""
+        if self._last_refresh is None or time.monotonic() - self._last_refresh >= max_age:
+            self.refresh()
+
+    def _full_refresh(self, conn: pymysql.Connection) -> None:
+        watermarks: Dict[str, Tuple[Any, FrozenSet[int]]] = {}
+        process_rows = self._select_since(conn, "t_ds_process_definition",
+                                          "`project_code`, `code`, `name`", None, watermarks)
+        relation_rows = self._select_since(conn, "t_ds_process_task_relation",
+                                           "`process_definition_code`, `post_task_code`", None, watermarks)
+        task_rows = self._select_since(conn, "t_ds_task_definition", self._TASK_COLUMNS, None, watermarks)
+
+        processes = {int(row["code"]): self._process_info(row) for row in process_rows}
+        process_tasks: Dict[int, Set[int]] = collections.defaultdict(set)
+        for row in relation_rows:
+            process_tasks[int(row["process_definition_code"])].add(int(row["post_task_code"]))
+        task_dependencies = {int(row["code"]): parse_dependent_process_codes(row["task_params"])
+                             for row in task_rows if row["task_type"] == "DEPENDENT"}
+
+        with self._lock:
+            self._processes = processes
+            self._process_tasks = dict(process_tasks)
+            self._task_dependencies = task_dependencies
+            self._watermarks = watermarks
+            self._rebuild_adjacency()
+
+    def _incremental_refresh(self, conn: pymysql.Connection) -> None:
+        watermarks = dict(self._watermarks)
+        process_rows = self._select_since(conn, "t_ds_process_definition", "`project_code`, `code`, `name`",
+                                          self._watermarks.get("t_ds_process_definition"), watermarks)
+        relation_rows = self._select_since(conn, "t_ds_process_task_relation", "`process_definition_code`",
+                                           self._watermarks.get("t_ds_process_task_relation"), watermarks)
+        task_rows = self._select_since(conn, "t_ds_task_definition", self._TASK_COLUMNS,
+                                       self._watermarks.get("t_ds_task_definition"), watermarks)
+
+        # 任务关系在保存工作流时整体重写，因此重新查询任务关系发生变化的工作流的全部任务关系
+        process_tasks = {code: set(task_codes) for code, task_codes in dolphin_util.conn_get_tasks_of_processes_batch(
+            conn, [row["process_definition_code"] for row in relation_rows]).items()}
+
+        with self._lock:
+            for row in process_rows:
+                self._processes[int(row["code"])] = self._process_info(row)
+            self._process_tasks.update(process_tasks)
+            for row in task_rows:
+                if row["task_type"] == "DEPENDENT":
+                    self._task_dependencies[int(row["code"])] = parse_dependent_process_codes(row["task_params"])
+                else:
+                    self._task_dependencies.pop(int(row["code"]), None)
+            self._watermarks = watermarks
+            if process_rows or relation_rows or task_rows:
+                self._rebuild_adjacency()
+
+    # 只读取 DEPENDENT 任务的参数，避免加载 SHELL、SQL 等任务的脚本
+    _TASK_COLUMNS = "`code`, `task_type`, IF(`task_type` = 'DEPENDENT', `task_params`, NULL) AS `task_params`"
+
+    @staticmethod
+    def _select_since(conn: pymysql.Connection, table: str, columns: str,
+                      since: Optional[Tuple[Any, FrozenSet[int]]],
+                      watermarks: Dict[str, Tuple[Any, FrozenSet[int]]]) -> List[Dict[str, Any]]:
+        """查询上次刷新之后新增或更新的记录（since 为 None 时查询全部记录），并将新的水位写入 watermarks
+
+        水位为 (最大 update_time, update_time 等于该时间的记录 id)。查询条件使用“不早于”而不是“晚于”，
+        避免遗漏与上次最大 update_time 在同一秒内更新的记录；再按 id 去掉上次已读取的、update_time 等于水位的记录，
+        使没有变化时返回空列表
+        """
+        if since is None:
+            rows = mysql_util.conn_select_sql_as_dict(
+                conn, f"SELECT `id`, {columns}, `update_time` FROM {table}")
+        else:
+            rows = mysql_util.conn_select_sql_as_dict(
+                conn, f"SELECT `id`, {columns}, `update_time` FROM {table} WHERE `update_time` >= %s", (since[0],))
+
+        update_times = [row["update_time"] for row in rows if row["update_time"] is not None]
+        if update_times:
+            max_time = max(update_times)
+            watermarks[table] = (max_time, frozenset(int(row["id"]) for row in rows if row["update_time"] == max_time))
+        elif since is not None:
+            watermarks[table] = since
+
+        if since is None:
+            return list(rows)
+        since_time, since_ids = since
+        return [row for row in rows if not (row["update_time"] == since_time and int(row["id"]) in since_ids)]
+
+    @staticmethod
+    def _process_info(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {"project_code": int(row["project_code"]), "code": int(row["code"]), "name": row["name"]}
+
+    def _rebuild_adjacency(self) -> None:
+        """根据工作流的任务和 DEPENDENT 任务的依赖重新构造邻接表（调用时需持有锁）"""
+        upstream: Dict[int, Set[int]] = collections.defaultdict(set)
+        downstream: Dict[int, Set[int]] = collections.defaultdict(set)
+        for process_code, task_codes in self._process_tasks.items():
+            for task_code in task_codes:
+                for upstream_code in self._task_dependencies.get(task_code, ()):
+                    if upstream_code != process_code:
+                        upstream[process_code].add(upstream_code)
+                        downstream[upstream_code].add(process_code)
+        self._upstream = dict(upstream)
+        self._downstream = dict(downstream)
+        self._closures = {}
+
+    # ---------- 查询 ----------
+
+    def process(self, process_code: int) -> Optional[Dict[str, Any]]:
+        """获取工作流的项目编码、编码和名称，工作流不存在时返回 None"""
+        with self._lock:
+            return self._processes.get(int(process_code))
+
+    def direct_upstream(self, process_code: int) -> Set[int]:
+        """获取工作流的直接上游工作流编码"""
+        with self._lock:
+            return set(self._upstream.get(int(process_code), ()))
+
+    def direct_downstream(self, process_code: int) -> Set[int]:
+        """获取工作流的直接下游工作流编码"""
+        with self._lock:
+            return set(self._downstream.get(int(process_code), ()))
+
+    def upstream(self, process_code: int, max_depth: Optional[int] = None) -> Dict[int, int]:
+        """广度优先搜索工作流的上游工作流，返回上游工作流编码到层级（直接上游为 1）的映射"""
+        return self._bfs(UPSTREAM, [int(process_code)], max_depth)
+
+    def downstream(self, process_code: int, max_depth: Optional[int] = None) -> Dict[int, int]:
+        """广度优先搜索工作流的下游工作流，返回下游工作流编码到层级（直接下游为 1）的映射"""
+        return self._bfs(DOWNSTREAM, [int(process_code)], max_depth)
+
+    def all_upstream(self, process_code: int) -> FrozenSet[int]:
+        """获取工作流的全部（传递闭包）上游工作流编码"""
+        return self._closure(UPSTREAM, int(process_code))
+
+    def all_downstream(self, process_code: int) -> FrozenSet[int]:
+        """获取工作流的全部（传递闭包）下游工作流编码，即工作流变化时可能受影响的全部工作流"""
+        return self._closure(DOWNSTREAM, int(process_code))
+
+    def describe(self, process_codes: Iterable[int]) -> List[Dict[str, Any]]:
+        """获取多个工作流的项目编码、编码和名称，不存在的工作流名称为 None"""
+        with self._lock:
+            return [self._processes.get(int(code), {"project_code": None, "code": int(code), "name": None})
+                    for code in process_codes]
+
+    def _bfs(self, direction: str, start: Iterable[int], max_depth: Optional[int]) -> Dict[int, int]:
+        with self._lock:
+            adjacency = self._upstream if direction == UPSTREAM else self._downstream
+            start = list(start)
+            visited: Set[int] = set(start)
+            depths: Dict[int, int] = {}
+            queue = collections.deque((code, 0) for code in start)
+            while queue:
+                code, depth = queue.popleft()
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                for next_code in adjacency.get(code, ()):
+                    if next_code not in visited:
+                        visited.add(next_code)
+                        depths[next_code] = depth + 1
+                        queue.append((next_code, depth + 1))
+            return depths
+
+    def _closure(self, direction: str, process_code: int) -> FrozenSet[int]:
+        with self._lock:
+            key = (direction, process_code)
+            closure = self._closures.get(key)
+            if closure is None:
+                closure = frozenset(self._bfs(direction, [process_code], None))
+                self._closures[key] = closure
+            return closure
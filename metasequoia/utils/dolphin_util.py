@@ -2,14 +2,26 @@
 海豚调度工具类
 
 依赖：mysql_util
+
+所有查询均使用参数化 SQL；批量查询函数（conn_get_*_batch）将编码列表按 chunk_size 切分为多个 `IN (...)` 查询，
+用于替代逐个编码查询的 N+1 模式。
 """
 
-from typing import List, Dict, Any, Tuple
+from __future__ import annotations
 
-import pymysql
+import collections
+import threading
+from typing import List, Dict, Any, Tuple, Iterable, Iterator, Optional, Union
 
 from metasequoia.connector.dolphin_meta_connector import DolphinMetaInstance, DolphinMetaConnector
 from metasequoia.utils import mysql_util
+from metasequoia.utils.lazy_import_util import lazy_import
+
+pymysql = lazy_import("pymysql")
+
+DEFAULT_CHUNK_SIZE = 500  # 批量查询时每个 IN 子句的最大编码数量
+
+Code = Union[int, str]
 
 
 def list_projects(instance: DolphinMetaInstance) -> Tuple[Dict[str, Any], ...]:
@@ -24,6 +36,12 @@ def list_processes(instance: DolphinMetaInstance, project_code: str) -> Tuple[Di
         return conn_list_processes(conn, project_code)
 
 
+def get_process_names(instance: DolphinMetaInstance, process_codes: Iterable[Code]) -> Dict[int, str]:
+    """批量获取海豚调度工作流的名称"""
+    with DolphinMetaConnector(instance) as conn:
+        return conn_get_process_names_batch(conn, process_codes)
+
+
 def conn_list_projects(conn: pymysql.Connection) -> Tuple[Dict[str, Any], ...]:
     """获取海豚调度的项目列表"""
     return mysql_util.conn_select_sql_as_dict(
@@ -35,18 +53,20 @@ def conn_list_projects(conn: pymysql.Connection) -> Tuple[Dict[str, Any], ...]:
 def conn_list_processes(conn: pymysql.Connection, project_code: str) -> Tuple[Dict[str, Any], ...]:
     """获取海豚调度指定项目的工作流列表"""
     return mysql_util.conn_select_sql_as_dict(
-        conn, f"SELECT `code`, `name` "
-              f"FROM t_ds_process_definition "
-              f"WHERE `project_code` = '{project_code}'"
+        conn, "SELECT `code`, `name` "
+              "FROM t_ds_process_definition "
+              "WHERE `project_code` = %s",
+        (project_code,)
     )
 
 
 def conn_get_process_name(conn: pymysql.Connection, project_code: str, process_code: str) -> str:
     """获取海豚调度指定工作流的名称"""
     return mysql_util.conn_select_sql_as_dict(
-        conn, f"SELECT `name` "
-              f"FROM t_ds_process_definition "
-              f"WHERE `project_code` = '{project_code}' AND `code` = '{process_code}'"
+        conn, "SELECT `name` "
+              "FROM t_ds_process_definition "
+              "WHERE `project_code` = %s AND `code` = %s",
+        (project_code, process_code)
     )[0].get("name")
 
 
@@ -56,10 +76,11 @@ def conn_get_tasks_of_processes(conn: pymysql.Connection,
                                 ) -> Tuple[Dict[str, Any], ...]:
     """获取海豚调度指定项目、工作流的任务列表"""
     return mysql_util.conn_select_sql_as_dict(
-        conn, f"SELECT DISTINCT `post_task_code` "
-              f"FROM t_ds_process_task_relation "
-              f"WHERE `project_code` = '{project_code}' "
-              f"  AND `process_definition_code`= '{process_code}'"
+        conn, "SELECT DISTINCT `post_task_code` "
+              "FROM t_ds_process_task_relation "
+              "WHERE `project_code` = %s "
+              "  AND `process_definition_code` = %s",
+        (project_code, process_code)
     )
 
 
@@ -69,13 +90,14 @@ def conn_get_downstream_process(conn: pymysql.Connection,
                                 ) -> Tuple[Dict[str, Any], ...]:
     """获取海豚工作流的下游工作流"""
     return mysql_util.conn_select_sql_as_dict(
-        conn, f"SELECT t1.project_code, t1.process_definition_code "
-              f"FROM t_ds_process_task_relation AS t1 "
-              f"INNER JOIN ("
-              f"    SELECT `project_code`, `code` "
-              f"    FROM t_ds_task_definition "
-              f"    WHERE task_type = 'DEPENDENT' AND task_params LIKE '%{project_code}%{process_code}%'"
-              f") AS t2 ON t1.project_code = t2.project_code AND t1.post_task_code = t2.code;"
+        conn, "SELECT t1.project_code, t1.process_definition_code "
+              "FROM t_ds_process_task_relation AS t1 "
+              "INNER JOIN ("
+              "    SELECT `project_code`, `code` "
+              "    FROM t_ds_task_definition "
+              "    WHERE task_type = 'DEPENDENT' AND task_params LIKE %s"
+              ") AS t2 ON t1.project_code = t2.project_code AND t1.post_task_code = t2.code",
+        (f"%{project_code}%{process_code}%",)
     )
 
 
@@ -83,11 +105,122 @@ def conn_get_task_params_of_dependent_task(conn: pymysql.Connection,
                                            project_code: str,
                                            task_code_list: List[str]) -> Tuple[Dict[str, Any], ...]:
     """获取海豚指定任务列表中依赖的其他工作流任务的任务参数"""
-    task_code_str = ", ".join(f"'{task_code}'" for task_code in task_code_list)
+    if not task_code_list:
+        return tuple()
     return mysql_util.conn_select_sql_as_dict(
         conn, f"SELECT `task_params` "
               f"FROM t_ds_task_definition "
-              f"WHERE `project_code` = '{project_code}' "
-              f"  AND `code` IN ({task_code_str}) "
-              f"  AND `task_type` ='DEPENDENT'"
+              f"WHERE `project_code` = %s "
+              f"  AND `code` IN ({_placeholders(len(task_code_list))}) "
+              f"  AND `task_type` = 'DEPENDENT'",
+        [project_code, *task_code_list]
     )
+
+
+# ---------- 批量查询 ----------
+
+def _placeholders(n: int) -> str:
+    return ", ".join(["%s"] * n)
+
+
+def _chunks(codes: Iterable[Code], chunk_size: int) -> Iterator[List[int]]:
+    """将编码去重、排序后按 chunk_size 切分；排序使相同编码集合生成相同的 SQL，便于服务端复用执行计划"""
+    codes = sorted({int(code) for code in codes})
+    for i in range(0, len(codes), chunk_size):
+        yield codes[i:i + chunk_size]
+
+
+def conn_get_process_names_batch(conn: pymysql.Connection,
+                                 process_codes: Iterable[Code],
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[int, str]:
+    """批量获取海豚调度工作流的名称，返回工作流编码到名称的映射（不存在的工作流不包含在结果中）"""
+    result = {}
+    for chunk in _chunks(process_codes, chunk_size):
+        for row in mysql_util.conn_select_sql_as_dict(
+                conn, f"SELECT `code`, `name` "
+                      f"FROM t_ds_process_definition "
+                      f"WHERE `code` IN ({_placeholders(len(chunk))})",
+                chunk):
+            result[int(row["code"])] = row["name"]
+    return result
+
+
+def conn_get_tasks_of_processes_batch(conn: pymysql.Connection,
+                                      process_codes: Iterable[Code],
+                                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[int, List[int]]:
+    """批量获取海豚调度工作流的任务列表，返回工作流编码到任务编码列表的映射（没有任务的工作流对应空列表）"""
+    result = {}
+    for chunk in _chunks(process_codes, chunk_size):
+        result.update((code, []) for code in chunk)
+        for row in mysql_util.conn_select_sql_as_dict(
+                conn, f"SELECT DISTINCT `process_definition_code`, `post_task_code` "
+                      f"FROM t_ds_process_task_relation "
+                      f"WHERE `process_definition_code` IN ({_placeholders(len(chunk))})",
+                chunk):
+            result[int(row["process_definition_code"])].append(int(row["post_task_code"]))
+    return result
+
+
+def conn_get_task_params_of_dependent_tasks_batch(conn: pymysql.Connection,
+                                                  task_codes: Iterable[Code],
+                                                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[int, str]:
+    """批量获取海豚调度 DEPENDENT 任务的任务参数，返回任务编码到任务参数的映射（非 DEPENDENT 任务不包含在结果中）"""
+    result = {}
+    for chunk in _chunks(task_codes, chunk_size):
+        for row in mysql_util.conn_select_sql_as_dict(
+                conn, f"SELECT `code`, `task_params` "
+                      f"FROM t_ds_task_definition "
+                      f"WHERE `code` IN ({_placeholders(len(chunk))}) "
+                      f"  AND `task_type` = 'DEPENDENT'",
+                chunk):
+            result[int(row["code"])] = row["task_params"]
+    return result
+
+
+class ProcessNameResolver:
+    """海豚调度工作流编码到名称的解析器
+
+    使用 LRU 缓存已解析的名称，每次解析只批量查询未缓存的编码；不存在的工作流也会被缓存（名称为 None），避免重复查询。
+    """
+
+    def __init__(self, instance: DolphinMetaInstance, max_size: int = 4096):
+        self._instance = instance
+        self._max_size = max_size
+        self._names: "collections.OrderedDict[int, Optional[str]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, process_codes: Iterable[Code]) -> Dict[int, Optional[str]]:
+        """批量解析工作流名称，返回工作流编码到名称的映射，不存在的工作流名称为 None"""
+        codes = {int(code) for code in process_codes}
+        result: Dict[int, Optional[str]] = {}
+        with self._lock:
+            for code in codes:
+                if code in self._names:
+                    self._names.move_to_end(code)
+                    result[code] = self._names[code]
+        missing = codes - result.keys()
+        if not missing:
+            return result
+
+        with DolphinMetaConnector(self._instance) as conn:
+            names = conn_get_process_names_batch(conn, missing)
+        with self._lock:
+            for code in missing:
+                result[code] = self._names[code] = names.get(code)
+                self._names.move_to_end(code)
+            while len(self._names) > self._max_size:
+                self._names.popitem(last=False)
+        return result
+
+    def get(self, process_code: Code) -> Optional[str]:
+        """解析单个工作流的名称，不存在时返回 None"""
+        return self.resolve([process_code])[int(process_code)]
+
+    def invalidate(self, process_codes: Optional[Iterable[Code]] = None) -> None:
+        """失效指定工作流的名称缓存，为 None 时清空全部缓存"""
+        with self._lock:
+            if process_codes is None:
+                self._names.clear()
+            else:
+                for code in process_codes:
+                    self._names.pop(int(code), None)
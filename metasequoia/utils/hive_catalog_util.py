@@ -0,0 +1,236 @@
+"""
+Hive 元数据目录工具类
+
+实现说明：
+1. list_tables 先执行 SHOW DATABASES，再将数据库平均分给最多 max_workers 个线程，每个线程使用一个 Hive 连接依次执行 SHOW TABLES
+2. describe_tables 同样将表平均分给多个线程，每个线程使用一个 Hive 连接依次执行 DESCRIBE，避免为每张表建立一次连接
+3. HiveCatalog 在进程内缓存表结构，按表缓存，超过 ttl 后重新获取，也可以通过 refresh 主动刷新；
+   库表列表只在使用默认的 list_tables 时由 HiveCatalog 按 ttl 缓存，指定 table_loader 时每次调用 table_loader，
+   由 table_loader 自身负责缓存（例如 cache_data.hive_list_tables），避免两层缓存的有效期叠加
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from metasequoia.connector.hive_connector import HiveInstance, HiveConn
+from metasequoia.utils.lazy_import_util import lazy_import
+
+__all__ = ["HiveCatalog", "show_databases", "show_tables", "list_tables", "describe_tables", "parse_describe"]
+
+hive = lazy_import("pyhive.hive")
+
+# 表结构：{"columns": [{"name": 列名, "type": 类型, "comment": 注释}], "partition_columns": [...]}
+TableSchema = Dict[str, List[Dict[str, Optional[str]]]]
+
+
+def _quote(identifier: str) -> str:
+    return "`" + identifier.replace("`", "``") + "`"
+
+
+def _run_in_chunks(hive_instance: HiveInstance, items: Sequence[Any], max_workers: int,
+                   func: Callable[[Any, Any], Any]) -> Dict[Any, Any]:
+    """将 items 平均分给最多 max_workers 个线程，每个线程使用一个 Hive 游标依次执行 func(cursor, item)"""
+
+    def run(chunk: Sequence[Any]) -> Dict[Any, Any]:
+        with HiveConn(hive_instance) as conn:
+            with conn.cursor() as cursor:
+                return {item: func(cursor, item) for item in chunk}
+
+    if not items:
+        return {}
+    n_workers = max(min(max_workers, len(items)), 1)
+    chunks = [items[i::n_workers] for i in range(n_workers)]
+    result = {}
+    with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="hive-catalog") as executor:
+        for chunk_result in executor.map(run, chunks):
+            result.update(chunk_result)
+    return result
+
+
+def _cursor_show_tables(cursor, schema: str) -> List[str]:
+    cursor.execute(f"SHOW TABLES IN {_quote(schema)}")
+    return sorted(row[0] for row in cursor.fetchall())
+
+
+def _cursor_describe(cursor, table: Tuple[str, str]) -> Optional[TableSchema]:
+    try:
+        cursor.execute(f"DESCRIBE {_quote(table[0])}.{_quote(table[1])}")
+    except hive.OperationalError:  # 表不存在或没有权限
+        return None
+    return parse_describe(cursor.fetchall())
+
+
+def parse_describe(rows: Sequence[Tuple[Any, ...]]) -> TableSchema:
+    """解析 DESCRIBE 的结果
+
+    DESCRIBE 的结果先列出全部字段（包括分区字段），然后在“# Partition Information”之后再次列出分区字段；
+    返回的 columns 不包括分区字段。
+    """
+    columns: List[Dict[str, Optional[str]]] = []
+    partition_columns: List[Dict[str, Optional[str]]] = []
+    target: Optional[list] = columns
+    for row in rows:
+        name = (row[0] or "").strip()
+        if not name:
+            continue
+        if name.startswith("#"):
+            if name == "# Partition Information":
+                target = partition_columns
+            elif name != "# col_name":
+                target = None  # 其他说明信息（例如 # Detailed Table Information）
+            continue
+        if target is not None:
+            target.append({"name": name,
+                           "type": (row[1] or "").strip() if len(row) > 1 else "",
+                           "comment": ((row[2] or "").strip() or None) if len(row) > 2 else None})
+    partition_names = {column["name"] for column in partition_columns}
+    return {"columns": [column for column in columns if column["name"] not in partition_names],
+            "partition_columns": partition_columns}
+
+
+def show_databases(hive_instance: HiveInstance) -> List[str]:
+    """执行：SHOW DATABASES"""
+    with HiveConn(hive_instance) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW DATABASES")
+            return sorted(row[0] for row in cursor.fetchall())
+
+
+def show_tables(hive_instance: HiveInstance, schema: str) -> List[str]:
+    """执行：SHOW TABLES，返回按表名排序的表名列表"""
+    with HiveConn(hive_instance) as conn:
+        with conn.cursor() as cursor:
+            return _cursor_show_tables(cursor, schema)
+
+
+def list_tables(hive_instance: HiveInstance,
+                schemas: Optional[Sequence[str]] = None,
+                max_workers: int = 4) -> Dict[str, List[str]]:
+    """并发获取多个数据库中的表名列表
+
+    Parameters
+    ----------
+    hive_instance : HiveInstance
+        Hive 实例
+    schemas : Optional[Sequence[str]], default = None
+        数据库名称列表，为 None 时获取全部数据库
+    max_workers : int, default = 4
+        并发执行的最大线程数（即最多同时使用的连接数）
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        数据库名称到按表名排序的表名列表的映射
+    """
+    if schemas is None:
+        schemas = show_databases(hive_instance)
+    return _run_in_chunks(hive_instance, list(schemas), max_workers, _cursor_show_tables)
+
+
+def describe_tables(hive_instance: HiveInstance,
+                    schema: str,
+                    tables: Sequence[str],
+                    max_workers: int = 4) -> Dict[str, Optional[TableSchema]]:
+    """并发获取多张表的表结构，表不存在或没有权限时为 None"""
+    result = _run_in_chunks(hive_instance, [(schema, table) for table in tables], max_workers, _cursor_describe)
+    return {table: result[(schema, table)] for table in tables}
+
+
+class HiveCatalog:
+    """Hive 实例的库表目录缓存（线程安全）"""
+
+    def __init__(self,
+                 hive_instance: HiveInstance,
+                 ttl: float = 1800,
+                 max_workers: int = 4,
+                 table_loader: Optional[Callable[[HiveInstance], Dict[str, List[str]]]] = None):
+        """
+
+        Parameters
+        ----------
+        hive_instance : HiveInstance
+            Hive 实例
+        ttl : float, default = 1800
+            表结构的有效期（秒），不指定 table_loader 时同时作为库表列表的有效期
+        max_workers : int, default = 4
+            并发获取元数据的最大线程数
+        table_loader : Optional[Callable[[HiveInstance], Dict[str, List[str]]]], default = None
+            获取全部库表列表的函数，为 None 时使用 list_tables 并在进程内缓存；指定时每次调用该函数，由其自身负责缓存，
+            支持 invalidate 方法时在强制刷新前调用
+        """
+        self._hive_instance = hive_instance
+        self._ttl = ttl
+        self._max_workers = max_workers
+        self._table_loader = table_loader if table_loader is not None else list_tables
+
+        self._tables: Optional[Tuple[float, Dict[str, List[str]]]] = None  # (获取时间, 数据库名称 -> 表名列表)
+        self._schemas: Dict[Tuple[str, str], Tuple[float, Optional[TableSchema]]] = {}  # (库, 表) -> (获取时间, 表结构)
+        self._lock = threading.Lock()
+
+    @property
+    def hive_instance(self) -> HiveInstance:
+        return self._hive_instance
+
+    def load(self, force: bool = False) -> Dict[str, List[str]]:
+        """获取全部库表列表，缓存有效时直接返回"""
+        if self._table_loader is not list_tables:
+            if force and hasattr(self._table_loader, "invalidate"):
+                self._table_loader.invalidate(self._hive_instance)
+            return self._table_loader(self._hive_instance)
+
+        with self._lock:
+            cached = self._tables
+        if not force and cached is not None and time.monotonic() - cached[0] < self._ttl:
+            return cached[1]
+        tables = list_tables(self._hive_instance, max_workers=self._max_workers)
+        with self._lock:
+            self._tables = (time.monotonic(), tables)
+        return tables
+
+    def databases(self) -> List[str]:
+        """获取数据库列表"""
+        return sorted(self.load())
+
+    def tables(self, schema: str) -> List[str]:
+        """获取数据库中的表名列表（按表名排序）"""
+        return self.load().get(schema, [])
+
+    def describe(self, schema: str, table: str) -> Optional[TableSchema]:
+        """获取表结构，表不存在或没有权限时返回 None"""
+        return self.describe_many(schema, [table])[table]
+
+    def describe_many(self, schema: str, tables: Sequence[str]) -> Dict[str, Optional[TableSchema]]:
+        """批量获取表结构：缓存有效的表直接返回，其余的表并发执行 DESCRIBE"""
+        now = time.monotonic()
+        result: Dict[str, Optional[TableSchema]] = {}
+        with self._lock:
+            for table in tables:
+                cached = self._schemas.get((schema, table))
+                if cached is not None and now - cached[0] < self._ttl:
+                    result[table] = cached[1]
+        missing = [table for table in dict.fromkeys(tables) if table not in result]
+        if missing:
+            fetched = describe_tables(self._hive_instance, schema, missing, max_workers=self._max_workers)
+            fetched_time = time.monotonic()
+            with self._lock:
+                for table, table_schema in fetched.items():
+                    self._schemas[(schema, table)] = (fetched_time, table_schema)
+            result.update(fetched)
+        return {table: result[table] for table in tables}
+
+    def refresh(self, schema: Optional[str] = None, table: Optional[str] = None) -> None:
+        """使缓存失效：不指定参数时失效全部缓存并重新获取库表列表，指定 schema 时失效该数据库中表的表结构，同时指定 table 时只失效该表的表结构"""
+        with self._lock:
+            if schema is None:
+                self._schemas.clear()
+            elif table is None:
+                for key in [key for key in self._schemas if key[0] == schema]:
+                    del self._schemas[key]
+            else:
+                self._schemas.pop((schema, table), None)
+        if schema is None:
+            self.load(force=True)
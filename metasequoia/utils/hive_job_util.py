@@ -0,0 +1,342 @@
+"""
+Hive 作业执行器
+
+用于并发执行多个不需要返回结果的 Hive 语句（DDL、INSERT OVERWRITE 回刷等），也可以按依赖关系依次执行：
+
+    jobs = [HiveJob("ods", "INSERT OVERWRITE TABLE ods ..."),
+            HiveJob("dwd", "INSERT OVERWRITE TABLE dwd ...", depends_on=["ods"]),
+            HiveJob("dim", "INSERT OVERWRITE TABLE dim ...")]
+    with HiveJobRunner(hive_instance, max_workers=4) as runner:
+        runner.run(jobs)  # ods 与 dim 并发执行，ods 成功后执行 dwd
+
+实现说明：
+1. 每个作业在工作线程中使用独立的 Hive 连接，通过 pyhive 的异步模式（async_=True）提交语句，然后按 poll_interval 轮询操作状态并读取日志
+2. 取消作业时设置作业的取消事件，由执行该作业的工作线程在下一次轮询时取消服务端的操作（Thrift 连接不是线程安全的）
+3. 依赖的作业没有执行成功时，后续作业不再执行，状态为 SKIPPED
+4. 操作状态为 INITIALIZED、PENDING、RUNNING 以外的状态（包括 TIMEDOUT 等新版本增加的状态）均视为结束
+5. 执行器只保留未结束的作业和最近结束的作业（总数不超过 max_history），长期运行的执行器不会无限增长
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, Future, wait
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from metasequoia.connector.hive_connector import HiveInstance, HiveConn
+from metasequoia.utils.lazy_import_util import lazy_import
+
+__all__ = ["HiveJob", "HiveJobRunner"]
+
+LOGGER = logging.getLogger(__name__)
+
+hive = lazy_import("pyhive.hive")
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+CANCELLED = "CANCELLED"
+SKIPPED = "SKIPPED"
+
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED, SKIPPED)
+
+
+class HiveJob:
+    """一个 Hive 作业及其执行状态"""
+
+    def __init__(self, name: str, sql: str, depends_on: Iterable[str] = ()):
+        """
+
+        Parameters
+        ----------
+        name : str
+            作业名称，在同一批作业中唯一
+        sql : str
+            Hive 语句
+        depends_on : Iterable[str], default = ()
+            依赖的作业名称，依赖的作业全部执行成功后才执行当前作业
+        """
+        self._name = name
+        self._sql = sql
+        self._depends_on = tuple(depends_on)
+
+        self._state = PENDING
+        self._error: Optional[str] = None
+        self._logs: List[str] = []
+        self._start_time: Optional[float] = None
+        self._end_time: Optional[float] = None
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def sql(self) -> str:
+        return self._sql
+
+    @property
+    def depends_on(self) -> tuple:
+        return self._depends_on
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def error(self) -> Optional[str]:
+        """执行失败或跳过的原因"""
+        return self._error
+
+    @property
+    def logs(self) -> List[str]:
+        """已读取的 HiveServer2 操作日志"""
+        with self._lock:
+            return list(self._logs)
+
+    @property
+    def done(self) -> bool:
+        return self._state in FINAL_STATES
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        """执行耗时（秒），尚未开始执行时为 None"""
+        if self._start_time is None:
+            return None
+        return (self._end_time or time.monotonic()) - self._start_time
+
+    def cancel(self) -> None:
+        """取消作业：尚未执行的作业不再执行，正在执行的作业在下一次轮询时取消服务端的操作"""
+        self._cancel_event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待作业结束，返回作业是否已结束"""
+        return self._done_event.wait(timeout)
+
+    def _start(self) -> None:
+        self._state = RUNNING
+        self._start_time = time.monotonic()
+
+    def _finish(self, state: str, error: Optional[str] = None) -> None:
+        self._state = state
+        self._error = error
+        self._end_time = time.monotonic()
+        self._done_event.set()
+
+    def _append_logs(self, logs: Iterable[str]) -> None:
+        with self._lock:
+            self._logs.extend(logs)
+
+    def __repr__(self) -> str:
+        return f"<HiveJob name={self.name}, state={self.state}>"
+
+
+class HiveJobRunner:
+    """在有界的线程池中并发执行 Hive 作业"""
+
+    def __init__(self, hive_instance: HiveInstance, max_workers: int = 4, poll_interval: float = 1.0,
+                 max_history: int = 1000):
+        """
+
+        Parameters
+        ----------
+        hive_instance : HiveInstance
+            Hive 实例
+        max_workers : int, default = 4
+            最大并发执行的作业数
+        poll_interval : float, default = 1.0
+            轮询操作状态和日志的间隔（秒）
+        max_history : int, default = 1000
+            保留的作业数量上限，超过时丢弃最早结束的作业（未结束的作业总是保留）
+        """
+        self._hive_instance = hive_instance
+        self._poll_interval = poll_interval
+        self._max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hive-job")
+        self._jobs: List[HiveJob] = []
+        self._n_submitted = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "HiveJobRunner":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.cancel_all()
+        self.shutdown(wait=True)
+
+    @property
+    def jobs(self) -> List[HiveJob]:
+        """未结束的作业和最近结束的作业（按提交顺序）"""
+        with self._lock:
+            return list(self._jobs)
+
+    def submit(self, job: HiveJob) -> Future:
+        """提交一个作业（忽略依赖关系），返回作业执行结束时完成的 Future"""
+        with self._lock:
+            self._jobs.append(job)
+            self._n_submitted += 1
+            if len(self._jobs) > self._max_history:
+                self._prune()
+        return self._executor.submit(self._execute, job)
+
+    def submit_sql(self, sql: str, name: Optional[str] = None) -> HiveJob:
+        """提交一个独立的 Hive 语句，返回对应的作业"""
+        if name is None:
+            with self._lock:
+                name = f"job-{self._n_submitted}"
+        job = HiveJob(name, sql)
+        self.submit(job)
+        return job
+
+    def _prune(self) -> None:
+        """丢弃最早结束的作业，使作业数量不超过 max_history（调用时需持有锁）"""
+        n_drop = len(self._jobs) - self._max_history
+        kept = []
+        for job in self._jobs:
+            if n_drop > 0 and job.done:
+                n_drop -= 1
+            else:
+                kept.append(job)
+        self._jobs = kept
+
+    def run(self, jobs: Sequence[HiveJob], timeout: Optional[float] = None) -> List[HiveJob]:
+        """按依赖关系执行一批作业：没有依赖或依赖全部成功的作业立即并发执行，阻塞直到全部作业结束
+
+        Parameters
+        ----------
+        jobs : Sequence[HiveJob]
+            需要执行的作业
+        timeout : Optional[float], default = None
+            最长等待时间（秒），超时后取消全部未结束的作业；为 None 时不限制
+
+        Returns
+        -------
+        List[HiveJob]
+            与 jobs 顺序一致的作业
+        """
+        jobs_by_name = self._check_dependencies(jobs)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        waiting = {job.name: job for job in jobs}
+        futures: Dict[Future, HiveJob] = {}
+        while waiting or futures:
+            for job in list(waiting.values()):
+                dependencies = [jobs_by_name[name] for name in job.depends_on]
+                if job._cancel_event.is_set():
+                    del waiting[job.name]
+                    job._finish(CANCELLED)
+                elif any(dependency.done and dependency.state != SUCCEEDED for dependency in dependencies):
+                    del waiting[job.name]
+                    failed = [dependency.name for dependency in dependencies if dependency.state != SUCCEEDED]
+                    job._finish(SKIPPED, f"依赖的作业没有执行成功: {', '.join(failed)}")
+                elif all(dependency.state == SUCCEEDED for dependency in dependencies):
+                    del waiting[job.name]
+                    futures[self.submit(job)] = job
+            if not futures:
+                continue
+
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            done, _ = wait(futures, timeout=max(remaining, 0) if remaining is not None else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:  # 超时
+                for job in list(waiting.values()) + list(futures.values()):
+                    job.cancel()
+                deadline = None
+                continue
+            for future in done:
+                del futures[future]
+        return list(jobs)
+
+    def cancel_all(self) -> None:
+        """取消全部未结束的作业"""
+        for job in self.jobs:
+            if not job.done:
+                job.cancel()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    @staticmethod
+    def _check_dependencies(jobs: Sequence[HiveJob]) -> Dict[str, HiveJob]:
+        """检查作业名称是否唯一、依赖的作业是否存在以及是否存在循环依赖"""
+        jobs_by_name: Dict[str, HiveJob] = {}
+        for job in jobs:
+            if job.name in jobs_by_name:
+                raise ValueError(f"作业名称重复: {job.name}")
+            jobs_by_name[job.name] = job
+        for job in jobs:
+            for name in job.depends_on:
+                if name not in jobs_by_name:
+                    raise ValueError(f"作业 {job.name} 依赖的作业不存在: {name}")
+
+        # 拓扑排序：无法排序的作业之间存在循环依赖
+        in_degree = {job.name: len(job.depends_on) for job in jobs}
+        dependents: Dict[str, List[str]] = {job.name: [] for job in jobs}
+        for job in jobs:
+            for name in job.depends_on:
+                dependents[name].append(job.name)
+        ready = [name for name, degree in in_degree.items() if degree == 0]
+        while ready:
+            for name in dependents[ready.pop()]:
+                in_degree[name] -= 1
+                if in_degree[name] == 0:
+                    ready.append(name)
+        cycle = [name for name, degree in in_degree.items() if degree > 0]
+        if cycle:
+            raise ValueError(f"作业之间存在循环依赖: {', '.join(cycle)}")
+        return jobs_by_name
+
+    def _execute(self, job: HiveJob) -> HiveJob:
+        """在工作线程中执行作业"""
+        if job._cancel_event.is_set():
+            job._finish(CANCELLED)
+            return job
+        job._start()
+        try:
+            state, error = self._execute_async(job)
+        except Exception as exception:
+            state, error = FAILED, repr(exception)
+        job._finish(state, error)
+        if state == FAILED:
+            LOGGER.warning("Hive 作业执行失败: %s (%s)", job.name, error)
+        return job
+
+    def _execute_async(self, job: HiveJob):
+        operation_state = hive.ttypes.TOperationState
+        active_states = (operation_state.INITIALIZED_STATE, operation_state.PENDING_STATE,
+                         operation_state.RUNNING_STATE)
+        with HiveConn(self._hive_instance) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(job.sql, async_=True)
+                fetch_logs = True
+                while True:
+                    if job._cancel_event.is_set():
+                        cursor.cancel()
+                        return CANCELLED, None
+
+                    status = cursor.poll()
+                    if fetch_logs:
+                        try:
+                            job._append_logs(cursor.fetch_logs())
+                        except Exception:  # 部分 HiveServer2 版本不支持读取日志
+                            fetch_logs = False
+
+                    # 作业耗时取决于语句本身，不记录到 HiveServer2 节点的延迟统计中
+                    state = status.operationState
+                    if state in active_states:
+                        job._cancel_event.wait(self._poll_interval)
+                        continue
+                    if state == operation_state.FINISHED_STATE:
+                        return SUCCEEDED, None
+                    if state in (operation_state.CANCELED_STATE, operation_state.CLOSED_STATE):
+                        return CANCELLED, None
+                    if status.errorMessage:
+                        return FAILED, status.errorMessage
+                    state_names = getattr(operation_state, "_VALUES_TO_NAMES", {})
+                    return FAILED, f"操作状态为 {state_names.get(state, state)}"
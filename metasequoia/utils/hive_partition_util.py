@@ -0,0 +1,288 @@
+"""
+Hive 分区索引
+
+用于在内存中回答“最新分区是哪个”“某个日期范围内缺少哪些分区”等数据就绪检查，避免每次都对大量分区的表执行 SHOW PARTITIONS。
+
+实现说明：
+1. 首次刷新时执行一次完整的 SHOW PARTITIONS，将形如 dt=2024-01-01/hour=00 的分区名解析为分区值元组，
+   分区值使用 sys.intern 驻留，全部分区按分区值排序后存储为列表
+2. 之后的刷新只对最近 recent_days 天及明天的日期分区值执行 SHOW PARTITIONS ... PARTITION (日期字段 = '日期')，
+   并替换这些日期下的分区；早于该范围的分区新增或删除只能通过每隔 full_refresh_interval 秒的全量刷新发现。
+   “今天”按 timezone 指定的时区计算，包含明天是为了覆盖分区日期所在时区早于服务器时区的情况
+3. 日期字段默认为第一个分区字段，日期格式由 date_format 指定，同一格式的日期字符串按字符串排序即按时间排序；
+   如果日期字段不存在，或已有的日期分区值无法按 date_format 解析，则无法增量刷新，每次刷新都执行全量刷新
+4. 分区字段在全量刷新时通过 DESCRIBE 获取；非分区表不执行 SHOW PARTITIONS，只在每次全量刷新时重新检查
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime
+import itertools
+import logging
+import sys
+import threading
+import time
+import urllib.parse
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from metasequoia.connector.hive_connector import HiveConn, HiveTable
+from metasequoia.utils import hive_catalog_util
+
+__all__ = ["HivePartitionIndex", "parse_partition_name"]
+
+LOGGER = logging.getLogger(__name__)
+
+DateLike = Union[str, datetime.date]
+
+
+def parse_partition_name(partition_name: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """将 SHOW PARTITIONS 返回的分区名解析为 (分区字段元组, 分区值元组)，分区值中的转义字符（%XX）会被还原"""
+    keys, values = [], []
+    for item in partition_name.split("/"):
+        key, _, value = item.partition("=")
+        keys.append(sys.intern(key))
+        values.append(sys.intern(urllib.parse.unquote(value)))
+    return tuple(keys), tuple(values)
+
+
+def _quote_value(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+class HivePartitionIndex:
+    """Hive 表的分区索引（线程安全）"""
+
+    def __init__(self,
+                 hive_table: HiveTable,
+                 date_key: Optional[str] = None,
+                 date_format: str = "%Y-%m-%d",
+                 recent_days: int = 3,
+                 full_refresh_interval: float = 86400,
+                 timezone: Optional[datetime.tzinfo] = None):
+        """
+
+        Parameters
+        ----------
+        hive_table : HiveTable
+            Hive 表
+        date_key : Optional[str], default = None
+            日期分区字段，为 None 时使用第一个分区字段
+        date_format : str, default = "%Y-%m-%d"
+            日期分区值的格式
+        recent_days : int, default = 3
+            增量刷新时重新获取分区的最近天数（包括今天，另外总是包括明天）
+        full_refresh_interval : float, default = 86400
+            两次全量刷新之间的间隔（秒）
+        timezone : Optional[datetime.tzinfo], default = None
+            计算最近日期时使用的时区，应与分区日期的时区一致；为 None 时使用服务器的本地时区
+        """
+        self._hive_table = hive_table
+        self._date_key = date_key
+        self._date_format = date_format
+        self._recent_days = recent_days
+        self._full_refresh_interval = full_refresh_interval
+        self._timezone = timezone
+
+        self._keys: Tuple[str, ...] = ()
+        self._partitions: List[Tuple[str, ...]] = []  # 按分区值排序
+        self._incremental = False  # 是否可以增量刷新，在全量刷新后确定
+        self._last_full_refresh: Optional[float] = None
+        self._last_refresh: Optional[float] = None
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def hive_table(self) -> HiveTable:
+        return self._hive_table
+
+    @property
+    def keys(self) -> Tuple[str, ...]:
+        """分区字段，尚未刷新或表没有分区时为空元组"""
+        return self._keys
+
+    @property
+    def date_key(self) -> Optional[str]:
+        """日期分区字段"""
+        if self._date_key is not None:
+            return self._date_key
+        return self._keys[0] if self._keys else None
+
+    def __len__(self) -> int:
+        return len(self._partitions)
+
+    # ---------- 刷新 ----------
+
+    def refresh(self, full: bool = False) -> None:
+        """刷新索引：首次刷新、指定 full 或距上次全量刷新超过 full_refresh_interval 时全量刷新；
+        否则对分区表增量刷新最近的日期（无法增量刷新时全量刷新），非分区表不做任何处理"""
+        with self._refresh_lock:
+            now = time.monotonic()
+            if (full or self._last_full_refresh is None
+                    or now - self._last_full_refresh >= self._full_refresh_interval):
+                self._full_refresh()
+                self._last_full_refresh = now
+            elif not self._keys:
+                pass  # 非分区表
+            elif self._incremental:
+                self._incremental_refresh()
+            else:
+                self._full_refresh()
+                self._last_full_refresh = now
+            self._last_refresh = now
+
+    def refresh_if_stale(self, max_age: float) -> None:
+        """距上次刷新超过 max_age 秒时刷新索引"""
+        if self._last_refresh is None or time.monotonic() - self._last_refresh >= max_age:
+            self.refresh()
+
+    def _table_name(self) -> str:
+        return f"`{self._hive_table.schema}`.`{self._hive_table.table}`"
+
+    def _full_refresh(self) -> None:
+        with HiveConn(self._hive_table.instance) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DESCRIBE {self._table_name()}")
+                partition_columns = hive_catalog_util.parse_describe(cursor.fetchall())["partition_columns"]
+                keys = tuple(sys.intern(column["name"]) for column in partition_columns)
+                rows = []
+                if keys:
+                    cursor.execute(f"SHOW PARTITIONS {self._table_name()}")
+                    rows = cursor.fetchall()
+        partitions = sorted(parse_partition_name(row[0])[1] for row in rows)
+        incremental = self._check_incremental(keys, partitions)
+        with self._lock:
+            self._keys = keys
+            self._partitions = partitions
+            self._incremental = incremental
+
+    def _check_incremental(self, keys: Tuple[str, ...], partitions: List[Tuple[str, ...]]) -> bool:
+        """检查是否可以增量刷新：日期字段存在，且已有的日期分区值均可以按 date_format 解析"""
+        date_key = self._date_key if self._date_key is not None else (keys[0] if keys else None)
+        if date_key not in keys:
+            if keys:
+                LOGGER.warning("%s 不存在日期分区字段 %s，每次刷新都需要全量刷新", self._hive_table, date_key)
+            return False
+        date_idx = keys.index(date_key)
+        for value in {values[date_idx] for values in partitions}:
+            try:
+                datetime.datetime.strptime(value, self._date_format)
+            except ValueError:
+                LOGGER.warning("%s 的日期分区值 %s 不符合格式 %s，每次刷新都需要全量刷新",
+                               self._hive_table, value, self._date_format)
+                return False
+        return True
+
+    def _incremental_refresh(self) -> None:
+        date_key = self.date_key
+        date_idx = self._keys.index(date_key)
+        tomorrow = datetime.datetime.now(self._timezone).date() + datetime.timedelta(days=1)
+        dates = [(tomorrow - datetime.timedelta(days=i)).strftime(self._date_format)
+                 for i in range(self._recent_days + 1)]
+
+        fetched: List[Tuple[str, ...]] = []
+        with HiveConn(self._hive_table.instance) as conn:
+            with conn.cursor() as cursor:
+                for date in dates:
+                    cursor.execute(f"SHOW PARTITIONS {self._table_name()} "
+                                   f"PARTITION (`{date_key}` = {_quote_value(date)})")
+                    fetched.extend(parse_partition_name(row[0])[1] for row in cursor.fetchall())
+
+        date_set = set(dates)
+        with self._lock:
+            partitions = [values for values in self._partitions if values[date_idx] not in date_set]
+            partitions.extend(fetched)
+            partitions.sort()
+            self._partitions = partitions
+
+    # ---------- 查询 ----------
+
+    def partitions(self) -> List[Dict[str, str]]:
+        """获取全部分区（按分区值排序）"""
+        with self._lock:
+            return [dict(zip(self._keys, values)) for values in self._partitions]
+
+    def contains(self, spec: Dict[str, str]) -> bool:
+        """是否存在与 spec 匹配的分区；spec 可以只包含部分分区字段"""
+        with self._lock:
+            if set(spec) - set(self._keys):
+                return False
+            if len(spec) == len(self._keys):
+                values = tuple(spec[key] for key in self._keys)
+                idx = bisect.bisect_left(self._partitions, values)
+                return idx < len(self._partitions) and self._partitions[idx] == values
+            return any(True for _ in self._match(spec))
+
+    def values(self, key: Optional[str] = None) -> List[str]:
+        """获取分区字段的全部取值（排序后去重），key 为 None 时使用日期分区字段"""
+        key = key if key is not None else self.date_key
+        with self._lock:
+            if key not in self._keys:
+                return []
+            idx = self._keys.index(key)
+            return sorted({values[idx] for values in self._partitions})
+
+    def latest(self, spec: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+        """获取日期最新的分区，日期相同时取分区值最大的分区；spec 不为空时只在与 spec 匹配的分区中查找"""
+        with self._lock:
+            if not self._partitions or (spec and set(spec) - set(self._keys)):
+                return None
+            date_idx = self._keys.index(self.date_key) if self.date_key in self._keys else 0
+            candidates = self._match(spec) if spec else self._partitions
+            if date_idx == 0 and not spec:
+                best = self._partitions[-1]
+            else:
+                best = max(candidates, key=lambda values: (values[date_idx], values), default=None)
+            return dict(zip(self._keys, best)) if best is not None else None
+
+    def missing(self,
+                start: DateLike,
+                end: DateLike,
+                expected: Optional[Dict[str, Sequence[str]]] = None) -> List[Dict[str, str]]:
+        """获取日期范围内缺少的分区
+
+        Parameters
+        ----------
+        start : Union[str, datetime.date]
+            开始日期（包含）
+        end : Union[str, datetime.date]
+            结束日期（包含）
+        expected : Optional[Dict[str, Sequence[str]]], default = None
+            其他分区字段的期望取值，例如 {"hour": ["00", "01", ..., "23"]}；为 None 时只检查每个日期是否存在分区
+
+        Returns
+        -------
+        List[Dict[str, str]]
+            缺少的分区（只包含日期分区字段和 expected 中的分区字段），按日期排序
+        """
+        date_key = self.date_key
+        expected = expected or {}
+        check_keys = [date_key] + list(expected)
+        with self._lock:
+            if any(key not in self._keys for key in check_keys):
+                raise ValueError(f"分区字段不存在: {[key for key in check_keys if key not in self._keys]}")
+            indexes = [self._keys.index(key) for key in check_keys]
+            dates = self._date_range(start, end)
+            date_set = set(dates)
+            existing = {tuple(values[idx] for idx in indexes)
+                        for values in self._partitions if values[indexes[0]] in date_set}
+
+        result = []
+        for date in dates:
+            for combination in itertools.product(*expected.values()):
+                if (date,) + combination not in existing:
+                    result.append(dict(zip(check_keys, (date,) + combination)))
+        return result
+
+    def _match(self, spec: Dict[str, str]) -> Iterable[Tuple[str, ...]]:
+        """遍历与 spec 匹配的分区（调用时需持有锁）"""
+        conditions = [(self._keys.index(key), value) for key, value in spec.items()]
+        return (values for values in self._partitions if all(values[idx] == value for idx, value in conditions))
+
+    def _date_range(self, start: DateLike, end: DateLike) -> List[str]:
+        if isinstance(start, str):
+            start = datetime.datetime.strptime(start, self._date_format).date()
+        if isinstance(end, str):
+            end = datetime.datetime.strptime(end, self._date_format).date()
+        return [(start + datetime.timedelta(days=i)).strftime(self._date_format)
+                for i in range((end - start).days + 1)]
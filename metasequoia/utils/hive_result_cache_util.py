@@ -0,0 +1,249 @@
+"""
+Hive 查询结果的磁盘缓存
+
+用于缓存重复执行的 Hive 查询（例如分析人员一天内多次执行的聚合查询）的结果，需要在 hive_util.execute_and_fetch_result
+中通过 cache_ttl 参数主动启用：
+
+    hive_util.execute_and_fetch_result(hive_instance, sql, cache_ttl=datetime.timedelta(hours=1))
+
+实现说明：
+1. 缓存的键为 (Hive 节点, 端口, 用户名, SSH 隧道的地址和用户名)、规范化后的 SQL 语句和 max_rows 组成的元组的 repr 的摘要；
+   规范化时先去掉字符串字面值以外的 -- 和 /* */ 注释，再将连续空白合并为一个空格、字母转为小写，并去掉末尾的分号，字符串字面值保持不变
+2. 每个缓存为目录中的一个文件：文件头为魔数和写入时间（time.time），之后为 zlib 压缩后的 pickle 结果；写入时先写临时文件再重命名，
+   可以被多个进程同时使用
+3. 读取时如果超过调用方指定的 ttl 则视为不存在；命中时更新文件的修改时间，作为 LRU 淘汰的依据；
+   实例维护缓存文件总大小的估计值（创建时扫描一次目录，之后按写入和删除的大小更新），估计值超过 max_bytes 时才扫描目录，
+   按修改时间从旧到新删除文件，并用扫描结果校正估计值；其他进程的写入在下一次扫描时计入
+4. 缓存目录由环境变量 METASEQUOIA_HIVE_RESULT_CACHE_PATH 指定
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import re
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from metasequoia.connector.hive_connector import HiveInstance
+
+__all__ = ["HiveResultCache", "normalize_sql", "get_default_result_cache"]
+
+LOGGER = logging.getLogger(__name__)
+
+CACHE_PATH = os.environ.get("METASEQUOIA_HIVE_RESULT_CACHE_PATH",
+                            os.path.join(os.path.expanduser("~"), ".metasequoia", "hive_result_cache"))
+
+_MAGIC = b"MSHR1"
+_HEADER = struct.Struct("<5sd")  # 魔数, 写入时间
+_SUFFIX = ".bin"
+
+# 单引号或双引号字符串（支持反斜杠转义）、单行注释或多行注释，从左到右匹配，因此字符串中的注释符号和注释中的引号均不会被误认
+_LITERAL_OR_COMMENT = re.compile(r"(?P<literal>'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")"
+                                 r"|--[^\n]*|/\*.*?\*/", re.S)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """规范化 SQL 语句：去掉注释，字符串字面值以外的连续空白合并为一个空格、字母转为小写，去掉首尾空白和末尾的分号"""
+    parts = []
+    code = []  # 上一个字符串字面值之后的代码片段，注释替换为空格
+    position = 0
+    for match in _LITERAL_OR_COMMENT.finditer(sql):
+        code.append(sql[position:match.start()].lower())
+        if match.group("literal") is not None:
+            parts.append(_WHITESPACE.sub(" ", "".join(code)))
+            parts.append(match.group())
+            code = []
+        else:
+            code.append(" ")
+        position = match.end()
+    code.append(sql[position:].lower())
+    parts.append(_WHITESPACE.sub(" ", "".join(code)))
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+class HiveResultCache:
+    """Hive 查询结果的磁盘缓存（线程安全、多进程安全）"""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = 1024 * 1024 * 1024, compress_level: int = 6):
+        """
+
+        Parameters
+        ----------
+        path : str
+            缓存目录
+        max_bytes : int, default = 1 GB
+            缓存文件的总大小上限（字节）
+        compress_level : int, default = 6
+            zlib 压缩级别
+        """
+        self._path = path
+        self._max_bytes = max_bytes
+        self._compress_level = compress_level
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._scan())  # 缓存文件总大小的估计值
+
+        self._n_hits = 0
+        self._n_misses = 0
+        self._n_evictions = 0
+
+    @staticmethod
+    def make_key(hive_instance: HiveInstance, sql: str, max_rows: Optional[int] = None) -> str:
+        ssh_tunnel = hive_instance.ssh_tunnel
+        tunnel = (ssh_tunnel.host, ssh_tunnel.port, ssh_tunnel.username) if ssh_tunnel is not None else None
+        instance = (tuple(hive_instance.hosts), hive_instance.port, hive_instance.username, tunnel)
+        return hashlib.sha256(repr((instance, normalize_sql(sql), max_rows)).encode("UTF-8")).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self._path, key + _SUFFIX)
+
+    def get(self, key: str, ttl: float) -> Optional[Any]:
+        """获取写入时间在 ttl 秒以内的缓存结果，不存在或已过期时返回 None"""
+        path = self._file(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            magic, stored_at = _HEADER.unpack_from(data)
+            if magic != _MAGIC:
+                raise ValueError("unknown format")
+            if time.time() - stored_at >= ttl:
+                self._count(hit=False)
+                return None
+            value = pickle.loads(zlib.decompress(data[_HEADER.size:]))
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+        except (OSError, ValueError, struct.error, zlib.error, pickle.UnpicklingError, EOFError) as error:
+            LOGGER.warning("读取 Hive 结果缓存失败: %s (%s)", path, error)
+            self._discard(path)
+            self._count(hit=False)
+            return None
+
+        try:
+            os.utime(path)  # 更新修改时间，作为 LRU 淘汰的依据
+        except OSError:
+            pass
+        self._count(hit=True)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """写入缓存结果，写入后如果总大小的估计值超过上限则淘汰最久未使用的缓存"""
+        data = _HEADER.pack(_MAGIC, time.time()) + zlib.compress(
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self._compress_level)
+        if len(data) > self._max_bytes:
+            LOGGER.warning("Hive 查询结果超过缓存大小上限，不写入缓存: %d 字节", len(data))
+            return
+        path = self._file(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self._path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            old_size = self._size(path)
+            os.replace(tmp_path, path)
+        except OSError as error:
+            LOGGER.warning("写入 Hive 结果缓存失败: %s (%s)", key, error)
+            self._remove(tmp_path)
+            return
+        with self._lock:
+            self._total_bytes += len(data) - old_size
+            need_evict = self._total_bytes > self._max_bytes
+        if need_evict:
+            self._evict()
+
+    def invalidate(self, key: str) -> None:
+        self._discard(self._file(key))
+
+    def clear(self) -> None:
+        """删除全部缓存"""
+        for entry in self._entries():
+            self._discard(entry.path)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        with self._lock:
+            return {
+                "path": self._path,
+                "files": len(entries),
+                "bytes": sum(entry.stat().st_size for entry in entries),
+                "max_bytes": self._max_bytes,
+                "hits": self._n_hits,
+                "misses": self._n_misses,
+                "evictions": self._n_evictions
+            }
+
+    def _entries(self) -> List[os.DirEntry]:
+        with os.scandir(self._path) as iterator:
+            return [entry for entry in iterator if entry.name.endswith(_SUFFIX) and entry.is_file()]
+
+    def _scan(self) -> List[Tuple[float, int, str]]:
+        """获取全部缓存文件的 (修改时间, 大小, 路径)"""
+        files = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:  # 已被其他进程删除
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict(self) -> None:
+        """扫描缓存目录，按修改时间从旧到新删除文件直到总大小不超过上限，并校正总大小的估计值"""
+        files = self._scan()
+        total = sum(size for _, size, _ in files)
+        n_evicted = 0
+        for _, size, path in sorted(files):
+            if total <= self._max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            n_evicted += 1
+        with self._lock:
+            self._total_bytes = total
+            self._n_evictions += n_evicted
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._n_hits += 1
+            else:
+                self._n_misses += 1
+
+    def _discard(self, path: str) -> None:
+        """删除缓存文件并更新总大小的估计值"""
+        size = self._size(path)
+        self._remove(path)
+        with self._lock:
+            self._total_bytes = max(self._total_bytes - size, 0)
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.stat(path).st_size
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_default_result_cache: Optional[HiveResultCache] = None
+_default_result_cache_lock = threading.Lock()
+
+
+def get_default_result_cache() -> HiveResultCache:
+    """获取默认的 Hive 结果缓存，首次调用时创建缓存目录"""
+    global _default_result_cache
+    with _default_result_cache_lock:
+        if _default_result_cache is None:
+            _default_result_cache = HiveResultCache(CACHE_PATH)
+        return _default_result_cache
@@ -1,18 +1,248 @@
+"""
+Hive 工具类
+
+流式读取的实现说明：
+1. HiveResultStream 在 with 语句中保持 Hive 连接和游标，迭代时每次通过 fetchmany 读取 batch_size 条记录，
+   游标的 arraysize 同时设置为 batch_size，使每次向 HiveServer2 请求的记录数与批次大小一致
+2. 批次默认为行元组的列表；指定 columnar=True 时转换为“列名 -> 列值列表”的字典，便于按列写入表格或数据框
+3. 达到 max_rows、调用 cancel() 或提前退出 with 语句时停止读取，并取消、关闭服务端的操作，不再读取剩余结果
+
+execute_and_fetch_result 可以通过 cache_ttl 参数启用查询结果的磁盘缓存，详见 hive_result_cache_util。
+"""
+
+import csv
+import datetime
+import threading
+import time
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple, Union
+
 from metasequoia.connector.hive_connector import HiveInstance, HiveConn
+from metasequoia.utils.hive_result_cache_util import HiveResultCache, get_default_result_cache
+
+__all__ = ["HiveResultStream", "iter_batches", "fetch_to_csv", "execute", "execute_and_fetch_result"]
+
+Batch = Union[List[Tuple[Any, ...]], Dict[str, List[Any]]]
+
+
+class HiveResultStream:
+    """流式读取的 Hive 查询结果
+
+    使用方法：
+
+        with HiveResultStream(hive_instance, sql, batch_size=1000, max_rows=100000) as stream:
+            print(stream.columns)
+            for batch in stream:
+                ...
+
+    cancel() 可以在其他线程中调用，当前批次读取完成后停止读取。
+    """
+
+    def __init__(self,
+                 hive_instance: HiveInstance,
+                 sql: str,
+                 batch_size: int = 1000,
+                 max_rows: Optional[int] = None,
+                 columnar: bool = False):
+        """
+
+        Parameters
+        ----------
+        hive_instance : HiveInstance
+            Hive 实例
+        sql : str
+            SQL 语句
+        batch_size : int, default = 1000
+            每批读取的记录数
+        max_rows : Optional[int], default = None
+            最多读取的记录数，为 None 时不限制
+        columnar : bool, default = False
+            是否以“列名 -> 列值列表”的字典返回批次
+        """
+        self._hive_conn = HiveConn(hive_instance)
+        self._sql = sql
+        self._batch_size = batch_size
+        self._max_rows = max_rows
+        self._columnar = columnar
+
+        self._cursor = None
+        self._columns: List[str] = []
+        self._n_rows = 0
+        self._exhausted = False  # 是否已读取全部结果
+        self._truncated = False  # 是否因达到 max_rows 停止读取
+        self._cancel_event = threading.Event()
+
+    @property
+    def columns(self) -> List[str]:
+        """结果的列名"""
+        return self._columns
+
+    @property
+    def n_rows(self) -> int:
+        """已读取的记录数"""
+        return self._n_rows
+
+    @property
+    def truncated(self) -> bool:
+        """是否因达到 max_rows 而停止读取（之后可能还有未读取的结果）"""
+        return self._truncated
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        """停止读取（线程安全）：当前批次读取完成后停止迭代，退出 with 语句时取消服务端的操作"""
+        self._cancel_event.set()
+
+    def __enter__(self) -> "HiveResultStream":
+        conn = self._hive_conn.__enter__()
+        try:
+            self._cursor = conn.cursor(arraysize=self._batch_size)
+            start_time = time.monotonic()
+            self._cursor.execute(self._sql)
+            self._hive_conn.record_query_latency(time.monotonic() - start_time)
+            self._columns = [column[0] for column in self._cursor.description or ()]
+        except BaseException:
+            self._close()
+            raise
+        return self
+
+    def __iter__(self) -> Iterator[Batch]:
+        if self._cursor is None:
+            raise RuntimeError("HiveResultStream 需要在 with 语句中使用")
+        while not self._exhausted and not self.cancelled:
+            size = self._batch_size
+            if self._max_rows is not None:
+                size = min(size, self._max_rows - self._n_rows)
+                if size <= 0:
+                    self._truncated = True
+                    return
+            rows = self._cursor.fetchmany(size)
+            if not rows:
+                self._exhausted = True
+                return
+            self._n_rows += len(rows)
+            if len(rows) < size:
+                self._exhausted = True
+            yield self._to_columnar(rows) if self._columnar else rows
+
+    def _to_columnar(self, rows: List[Tuple[Any, ...]]) -> Dict[str, List[Any]]:
+        return {column: list(values) for column, values in zip(self._columns, zip(*rows))}
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._close()
+
+    def _close(self) -> None:
+        if self._cursor is not None:
+            if not self._exhausted:
+                try:
+                    self._cursor.cancel()
+                except Exception:  # 操作已结束时取消失败，不影响关闭
+                    pass
+            self._cursor.close()
+            self._cursor = None
+        self._hive_conn.__exit__(None, None, None)
+
+
+def iter_batches(hive_instance: HiveInstance,
+                 sql: str,
+                 batch_size: int = 1000,
+                 max_rows: Optional[int] = None,
+                 columnar: bool = False,
+                 cancel_event: Optional[threading.Event] = None) -> Iterator[Batch]:
+    """执行 Hive 语句并按批次流式返回结果
+
+    生成器在迭代结束或被关闭（close 或垃圾回收）前保持 Hive 连接；提前停止迭代时取消服务端的操作。
+
+    Parameters
+    ----------
+    hive_instance : HiveInstance
+        Hive 实例
+    sql : str
+        SQL 语句
+    batch_size : int, default = 1000
+        每批读取的记录数
+    max_rows : Optional[int], default = None
+        最多读取的记录数，为 None 时不限制
+    columnar : bool, default = False
+        是否以“列名 -> 列值列表”的字典返回批次
+    cancel_event : Optional[threading.Event], default = None
+        取消事件，设置后在当前批次读取完成后停止迭代
+    """
+    with HiveResultStream(hive_instance, sql, batch_size=batch_size, max_rows=max_rows, columnar=columnar) as stream:
+        for batch in stream:
+            yield batch
+            if cancel_event is not None and cancel_event.is_set():
+                stream.cancel()
+
+
+def fetch_to_csv(hive_instance: HiveInstance,
+                 sql: str,
+                 file: IO[str],
+                 batch_size: int = 1000,
+                 max_rows: Optional[int] = None,
+                 null_value: str = "") -> int:
+    """执行 Hive 语句，并将结果流式写入 csv 文件（包含标题行）
+
+    Parameters
+    ----------
+    hive_instance : HiveInstance
+        Hive 实例
+    sql : str
+        SQL 语句
+    file : IO[str]
+        写入的文本文件，需要以 newline="" 打开
+    batch_size : int, default = 1000
+        每批读取的记录数
+    max_rows : Optional[int], default = None
+        最多写入的记录数，为 None 时不限制
+    null_value : str, default = ""
+        NULL 值在 csv 文件中的值
+
+    Returns
+    -------
+    int
+        写入的记录数（不包括标题行）
+    """
+    writer = csv.writer(file)
+    with HiveResultStream(hive_instance, sql, batch_size=batch_size, max_rows=max_rows) as stream:
+        writer.writerow(stream.columns)
+        for rows in stream:
+            writer.writerows([null_value if value is None else value for value in row] for row in rows)
+        return stream.n_rows
 
 
 def execute(hive_instance: HiveInstance, sql: str):
     """执行 Hive 语句"""
-    with HiveConn(hive_instance) as conn:
+    hive_conn = HiveConn(hive_instance)
+    with hive_conn as conn:
         with conn.cursor() as cursor:
+            start_time = time.monotonic()
             result = cursor.execute(sql)
+            hive_conn.record_query_latency(time.monotonic() - start_time)
             return result
 
 
-def execute_and_fetch_result(hive_instance: HiveInstance, sql: str):
-    """执行 Hive 语句"""
-    with HiveConn(hive_instance) as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(sql)
-            result = cursor.fetchall()
-            return result
+def execute_and_fetch_result(hive_instance: HiveInstance, sql: str, max_rows: Optional[int] = None,
+                             batch_size: int = 1000, cache_ttl: Optional[datetime.timedelta] = None,
+                             result_cache: Optional[HiveResultCache] = None):
+    """执行 Hive 语句，并返回结果（最多 max_rows 条记录，为 None 时返回全部结果）
+
+    指定 cache_ttl 时启用结果缓存：相同 Hive 实例、规范化后相同的 SQL 语句在 cache_ttl 以内直接返回缓存的结果，不再访问集群；
+    result_cache 为 None 时使用默认的磁盘缓存。
+    """
+    if cache_ttl is not None:
+        result_cache = result_cache if result_cache is not None else get_default_result_cache()
+        key = result_cache.make_key(hive_instance, sql, max_rows)
+        cached = result_cache.get(key, cache_ttl.total_seconds())
+        if cached is not None:
+            return cached
+
+    with HiveResultStream(hive_instance, sql, batch_size=batch_size, max_rows=max_rows) as stream:
+        result = []
+        for rows in stream:
+            result.extend(rows)
+
+    if cache_ttl is not None:
+        result_cache.set(key, result)
+    return result
@@ -0,0 +1,123 @@
+"""
+引用耗时检查工具类
+
+在新的 Python 进程中使用 `-X importtime` 引用模块，统计冷启动的引用耗时，并检查是否引用了不应引用的依赖。
+
+命令行用法（检查全部内置插件页面，存在不符合要求的页面时返回非 0 状态码，在 CI 中执行，见 .github/workflows/import_time.yml）：
+
+    python -m metasequoia.utils.import_time_util
+"""
+
+import re
+import subprocess
+import sys
+from typing import Dict, Iterable, List, Optional
+
+__all__ = ["ImportTimeReport", "measure_import_time", "check_plugin_budgets", "PLUGIN_IMPORT_BUDGETS"]
+
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)\s*$")
+
+# 内置插件页面的引用要求：插件所在模块 -> {forbidden: 不应引用的依赖, max_ms: 引用耗时上限（毫秒），为 None 时不限制}
+# 各插件的冷启动耗时主要来自 streamlit（约 500 ~ 800 ms），上限在此基础上预留余量，用于发现误引用重量级依赖的回归
+PLUGIN_IMPORT_BUDGETS: Dict[str, Dict[str, object]] = {
+    "metasequoia.plugins.get_kafka_topic_info.plugin_main": {
+        "forbidden": ["pymysql", "pyhive", "thrift", "paramiko"],
+        "max_ms": 1500
+    },
+    "metasequoia.plugins.select_mysql_as_csv.plugin_main": {
+        "forbidden": ["kafka", "pyhive", "thrift", "paramiko"],
+        "max_ms": 1500
+    },
+    "metasequoia.plugins.get_hive_table_info.plugin_main": {
+        "forbidden": ["pymysql", "kafka", "pyhive", "thrift", "paramiko"],
+        "max_ms": 1500
+    },
+    "metasequoia.plugins.select_hive.plugin_main": {
+        "forbidden": ["pymysql", "kafka", "pyhive", "thrift", "paramiko"],
+        "max_ms": 1500
+    },
+    "metasequoia.plugins.cache_stats.plugin_main": {
+        "forbidden": ["pymysql", "kafka", "pyhive", "thrift", "paramiko"],
+        "max_ms": 1500
+    },
+}
+
+
+class ImportTimeReport:
+    """一个模块的冷启动引用耗时"""
+
+    def __init__(self, module: str, self_us: Dict[str, int], cumulative_us: Dict[str, int]):
+        self.module = module
+        self.self_us = self_us  # 模块名 -> 自身引用耗时（微秒）
+        self.cumulative_us = cumulative_us  # 模块名 -> 包括子模块的引用耗时（微秒）
+
+    @property
+    def total_ms(self) -> float:
+        """引用目标模块的总耗时（毫秒）"""
+        return self.cumulative_us.get(self.module, sum(self.self_us.values())) / 1000
+
+    def imported(self, package: str) -> bool:
+        """是否引用了指定包或其子模块"""
+        return any(name == package or name.startswith(package + ".") for name in self.self_us)
+
+    def top_packages(self, n: int = 10) -> List[Dict[str, object]]:
+        """按顶级包汇总自身引用耗时，返回耗时最多的 n 个包"""
+        packages: Dict[str, int] = {}
+        for name, self_us in self.self_us.items():
+            top_level = name.split(".")[0]
+            packages[top_level] = packages.get(top_level, 0) + self_us
+        return [{"package": package, "self_ms": self_us / 1000}
+                for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:n]]
+
+    def check(self, forbidden: Iterable[str] = (), max_ms: Optional[float] = None) -> List[str]:
+        """检查是否引用了不应引用的依赖、引用耗时是否超过上限，返回不符合要求的说明，全部符合时返回空列表"""
+        problems = [f"引用了 {package}" for package in forbidden if self.imported(package)]
+        if max_ms is not None and self.total_ms > max_ms:
+            problems.append(f"引用耗时 {self.total_ms:.1f} ms 超过上限 {max_ms} ms")
+        return problems
+
+
+def measure_import_time(module: str, python: Optional[str] = None) -> ImportTimeReport:
+    """在新的 Python 进程中引用模块并统计引用耗时
+
+    Parameters
+    ----------
+    module : str
+        需要引用的模块
+    python : Optional[str], default = None
+        Python 解释器路径，为 None 时使用当前解释器
+    """
+    process = subprocess.run([python or sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if process.returncode != 0:
+        errors = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+        raise ImportError(f"引用 {module} 失败:\n" + "\n".join(errors))
+
+    self_us: Dict[str, int] = {}
+    cumulative_us: Dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match is not None:
+            name = match.group(3)
+            self_us[name] = int(match.group(1))
+            cumulative_us[name] = int(match.group(2))
+    return ImportTimeReport(module, self_us, cumulative_us)
+
+
+def check_plugin_budgets() -> int:
+    """检查全部内置插件页面的引用要求并打印结果，返回不符合要求的页面数量"""
+    n_failed = 0
+    for plugin_module, budget in PLUGIN_IMPORT_BUDGETS.items():
+        plugin_report = measure_import_time(plugin_module)
+        plugin_problems = plugin_report.check(budget["forbidden"], budget["max_ms"])
+        print(f"{plugin_module}: {plugin_report.total_ms:.1f} ms")
+        for item in plugin_report.top_packages(5):
+            print(f"    {item['package']}: {item['self_ms']:.1f} ms")
+        for problem in plugin_problems:
+            print(f"    [不符合要求] {problem}")
+        n_failed += bool(plugin_problems)
+    return n_failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check_plugin_budgets() else 0)
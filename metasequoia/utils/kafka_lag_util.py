@@ -0,0 +1,209 @@
+"""
+Kafka 消费延迟的持续采样工具类
+
+依赖：kafka_util
+"""
+
+import collections
+import logging
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from metasequoia.connector.kafka_connector import KafkaServer, KafkaTopic, KafkaGroup
+from metasequoia.utils import kafka_util
+
+__all__ = ["KafkaLagSampler"]
+
+LOGGER = logging.getLogger(__name__)
+
+
+class KafkaLagSampler:
+    """在后台线程中定期采样消费者组的已提交偏移量和 TOPIC 的最大偏移量，并估算生产速度、消费速度和追平时间
+
+    实现说明：
+    1. 同一个 Kafka 集群的所有消费者组和 TOPIC 在每轮采样中通过 kafka_util.get_consumer_lag 批量获取（指定和未指定 TOPIC 的消费者组各一次）
+    2. 每个分区在内存中保留最近 window 秒的样本，速度为窗口内首尾两个样本的偏移量差除以时间差
+    3. 采样成功后删除本轮没有返回的分区（TOPIC 或分区已删除、消费者组不再消费该 TOPIC）的样本
+    """
+
+    def __init__(self, interval: float = 30, window: float = 600):
+        """
+
+        Parameters
+        ----------
+        interval : float, default = 30
+            采样间隔（秒）
+        window : float, default = 600
+            计算速度时使用的滚动窗口长度（秒）
+        """
+        self._interval = interval
+        self._window = window
+
+        # Kafka 集群 -> 消费者组 -> 消费的 TOPIC 集合（为空时采样消费者组消费的全部 TOPIC）
+        self._watches: Dict[KafkaServer, Dict[str, Set[str]]] = {}
+        # (Kafka 集群, 消费者组, TOPIC, 分区) -> [(采样时间, 最大偏移量, 已提交偏移量)]
+        self._samples: Dict[Tuple[KafkaServer, str, str, int], Deque[Tuple[float, int, Optional[int]]]] = {}
+        self._last_error: Dict[KafkaServer, str] = {}
+        self._lock = threading.Lock()
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, kafka_group: KafkaGroup, kafka_topic: Optional[KafkaTopic] = None) -> None:
+        """添加需要采样的消费者组，kafka_topic 为 None 时采样消费者组消费的全部 TOPIC"""
+        with self._lock:
+            topics = self._watches.setdefault(kafka_group.kafka_server, {}).setdefault(kafka_group.group, set())
+            if kafka_topic is not None:
+                topics.add(kafka_topic.topic)
+
+    def unwatch(self, kafka_group: KafkaGroup) -> None:
+        """移除消费者组的采样及已有的样本"""
+        with self._lock:
+            groups = self._watches.get(kafka_group.kafka_server, {})
+            groups.pop(kafka_group.group, None)
+            if not groups:
+                self._watches.pop(kafka_group.kafka_server, None)
+            for key in list(self._samples):
+                if key[0] == kafka_group.kafka_server and key[1] == kafka_group.group:
+                    del self._samples[key]
+
+    def watched_groups(self) -> List[KafkaGroup]:
+        """获取正在采样的消费者组"""
+        with self._lock:
+            return [KafkaGroup(kafka_server=kafka_server, group=group)
+                    for kafka_server, groups in self._watches.items()
+                    for group in groups]
+
+    def start(self) -> None:
+        """启动后台采样线程，重复调用时不会启动多个线程"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="kafka-lag-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台采样线程"""
+        self._stop_event.set()
+
+    def sample_once(self) -> None:
+        """立即执行一轮采样"""
+        with self._lock:
+            watches = {kafka_server: {group: set(topics) for group, topics in groups.items()}
+                       for kafka_server, groups in self._watches.items()}
+
+        for kafka_server, groups in watches.items():
+            # 指定了 TOPIC 的消费者组与未指定 TOPIC 的消费者组分开批量查询
+            topic_groups = [group for group, topics in groups.items() if topics]
+            all_topic_groups = [group for group, topics in groups.items() if not topics]
+            topics = sorted({topic for group in topic_groups for topic in groups[group]})
+            try:
+                records = []
+                if topic_groups:
+                    records.extend(record for record in kafka_util.get_consumer_lag(kafka_server, topic_groups, topics)
+                                   if record["topic"] in groups[record["group"]])
+                if all_topic_groups:
+                    records.extend(kafka_util.get_consumer_lag(kafka_server, all_topic_groups))
+            except Exception as error:  # 采样失败时保留已有样本，在下一轮重试
+                LOGGER.warning("采样 Kafka 消费延迟失败: %s (%s)", kafka_server.bootstrap_servers, error)
+                with self._lock:
+                    self._last_error[kafka_server] = repr(error)
+                continue
+
+            now = time.monotonic()
+            with self._lock:
+                self._last_error.pop(kafka_server, None)
+                sampled_keys = set()
+                for record in records:
+                    key = (kafka_server, record["group"], record["topic"], record["partition"])
+                    sampled_keys.add(key)
+                    samples = self._samples.setdefault(key, collections.deque())
+                    samples.append((now, record["end_offset"], record["committed_offset"]))
+                    while len(samples) > 2 and now - samples[0][0] > self._window:  # 至少保留两个样本用于计算速度
+                        samples.popleft()
+                for key in [key for key in self._samples if key[0] == kafka_server and key not in sampled_keys]:
+                    del self._samples[key]
+
+    def estimates(self, kafka_server: Optional[KafkaServer] = None) -> List[Dict[str, Any]]:
+        """获取各分区的延迟、生产速度、消费速度和追平时间估算
+
+        Parameters
+        ----------
+        kafka_server : Optional[KafkaServer], default = None
+            只返回指定 Kafka 集群的估算，为 None 时返回全部
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            每个消费者组、分区一条记录：
+            - produce_rate / consume_rate：每秒生产、消费的消息数，样本不足时为 None
+            - eta_seconds：按当前速度追平延迟所需的秒数，无法追平时为 None
+            - status：ok（无延迟）、catching_up（正在追平）、falling_behind（延迟在增加）、stalled（有延迟但未消费）、
+              unknown（样本不足或没有已提交偏移量）
+        """
+        with self._lock:
+            items = [(key, list(samples)) for key, samples in self._samples.items()
+                     if kafka_server is None or key[0] == kafka_server]
+
+        result = []
+        for (item_server, group, topic, partition), samples in sorted(items, key=lambda item: item[0][1:]):
+            last_time, last_end, last_committed = samples[-1]
+            first_time, first_end, first_committed = samples[0]
+            lag = last_end - last_committed if last_committed is not None else None
+
+            duration = last_time - first_time
+            produce_rate = (last_end - first_end) / duration if duration > 0 else None
+            if duration > 0 and first_committed is not None and last_committed is not None:
+                consume_rate = (last_committed - first_committed) / duration
+            else:
+                consume_rate = None
+
+            result.append({
+                "group": group,
+                "topic": topic,
+                "partition": partition,
+                "lag": lag,
+                "produce_rate": produce_rate,
+                "consume_rate": consume_rate,
+                "eta_seconds": self._estimate_eta(lag, produce_rate, consume_rate),
+                "status": self._estimate_status(lag, produce_rate, consume_rate),
+                "n_samples": len(samples)
+            })
+        return result
+
+    def last_error(self, kafka_server: KafkaServer) -> Optional[str]:
+        """获取 Kafka 集群最近一次采样失败的异常信息，最近一次采样成功时为 None"""
+        with self._lock:
+            return self._last_error.get(kafka_server)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self.sample_once()
+            self._stop_event.wait(self._interval)
+
+    @staticmethod
+    def _estimate_eta(lag: Optional[int], produce_rate: Optional[float], consume_rate: Optional[float]
+                      ) -> Optional[float]:
+        if lag is None:
+            return None
+        if lag == 0:
+            return 0.0
+        if produce_rate is None or consume_rate is None or consume_rate <= produce_rate:
+            return None
+        return lag / (consume_rate - produce_rate)
+
+    @staticmethod
+    def _estimate_status(lag: Optional[int], produce_rate: Optional[float], consume_rate: Optional[float]) -> str:
+        if lag is None:
+            return "unknown"
+        if lag == 0:
+            return "ok"
+        if produce_rate is None or consume_rate is None:
+            return "unknown"
+        if consume_rate == 0:
+            return "stalled"
+        if consume_rate <= produce_rate:
+            return "falling_behind"
+        return "catching_up"
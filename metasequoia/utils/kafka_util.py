@@ -1,9 +1,14 @@
-from typing import List, Dict, Any
+from __future__ import annotations
 
-from kafka.admin import ConfigResource, ConfigResourceType
-from kafka.protocol.admin import DescribeConfigsResponse_v2
+from typing import List, Dict, Any, Optional
 
-from metasequoia.connector.kafka_connector import KafkaServer, KafkaTopic, KafkaGroup, ConnKafkaAdminClient
+from metasequoia.connector.kafka_connector import (KafkaServer, KafkaTopic, KafkaGroup, ConnKafkaAdminClient,
+                                                   ConnKafkaConsumer)
+from metasequoia.utils.lazy_import_util import lazy_import
+
+kafka = lazy_import("kafka")
+kafka_admin = lazy_import("kafka.admin")
+kafka_protocol_admin = lazy_import("kafka.protocol.admin")
 
 
 def list_topics(kafka_server: KafkaServer) -> List[str]:
@@ -22,12 +27,12 @@ def get_topic_configs(kafka_topic: KafkaTopic) -> Dict[str, Any]:
     """获取 TOPIC 的配置信息"""
     with ConnKafkaAdminClient(kafka_topic.kafka_server) as kafka_admin_client:
         configs = kafka_admin_client.describe_configs(config_resources=[
-            ConfigResource(resource_type=ConfigResourceType.TOPIC, name=kafka_topic.topic)
+            kafka_admin.ConfigResource(resource_type=kafka_admin.ConfigResourceType.TOPIC, name=kafka_topic.topic)
         ], include_synonyms=False)
 
         topic_configs = {}
 
-        config: DescribeConfigsResponse_v2
+        config: kafka_protocol_admin.DescribeConfigsResponse_v2
         for config in configs:
             for resource in config.get_item("resources"):
                 _, _, _, _, config_entries = resource
@@ -43,3 +48,61 @@ def get_consume_topic(kafka_group: KafkaGroup) -> List[str]:
         for topic_partition in kafka_admin_client.list_consumer_group_offsets(kafka_group.group):
             topic_set.add(topic_partition.topic)
         return list(topic_set)
+
+
+def get_consumer_lag(kafka_server: KafkaServer,
+                     groups: List[str],
+                     topics: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """批量计算多个消费者组消费多个 TOPIC 的各分区延迟
+
+    实现说明：
+    1. 每个消费者组通过一次 list_consumer_group_offsets 请求获取全部已提交偏移量
+    2. 全部分区的最小、最大偏移量分别通过一次 beginning_offsets / end_offsets 获取，kafka-python 会按分区 leader 所在的 broker
+       合并为每个 broker 一个请求并行发送
+    3. 没有已提交偏移量的分区，当前偏移量和延迟为 None
+
+    Parameters
+    ----------
+    kafka_server : KafkaServer
+        Kafka 集群
+    groups : List[str]
+        消费者组列表
+    topics : Optional[List[str]], default = None
+        TOPIC 列表，为 None 时使用消费者组已提交偏移量中的全部 TOPIC
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        每个消费者组、分区一条记录，包含 group、topic、partition、begin_offset、committed_offset、end_offset、lag
+    """
+    with ConnKafkaAdminClient(kafka_server) as kafka_admin_client:
+        committed = {group: {tp: offset_and_metadata.offset
+                             for tp, offset_and_metadata in kafka_admin_client.list_consumer_group_offsets(group).items()
+                             if offset_and_metadata.offset >= 0}
+                     for group in groups}
+
+    if topics is None:
+        topics = sorted({tp.topic for group_committed in committed.values() for tp in group_committed})
+
+    with ConnKafkaConsumer(kafka_server) as consumer:
+        tp_list = [kafka.TopicPartition(topic, partition)
+                   for topic in topics
+                   for partition in sorted(consumer.partitions_for_topic(topic) or ())]
+        begin_offsets = consumer.beginning_offsets(tp_list)
+        end_offsets = consumer.end_offsets(tp_list)
+
+    result = []
+    for group in groups:
+        group_committed = committed[group]
+        for tp in tp_list:
+            committed_offset = group_committed.get(tp)
+            result.append({
+                "group": group,
+                "topic": tp.topic,
+                "partition": tp.partition,
+                "begin_offset": begin_offsets[tp],
+                "committed_offset": committed_offset,
+                "end_offset": end_offsets[tp],
+                "lag": end_offsets[tp] - committed_offset if committed_offset is not None else None
+            })
+    return result
@@ -0,0 +1,37 @@
+"""
+延迟引用工具类
+
+用于延迟引用较重的第三方依赖（pymysql、paramiko、kafka-python、pyhive 等），使只使用部分数据源的页面不必在启动时加载全部依赖：
+
+    pymysql = lazy_import("pymysql")  # 此时不会引用 pymysql
+
+    def connect(...):
+        return pymysql.connect(...)  # 首次访问属性时才引用 pymysql
+
+使用延迟引用的模块需要添加 `from __future__ import annotations`，避免类型注解在定义函数时访问模块属性。
+"""
+
+import importlib
+import sys
+import types
+
+__all__ = ["lazy_import"]
+
+
+class _LazyModule(types.ModuleType):
+    """在首次访问属性时才引用的模块代理"""
+
+    def __getattr__(self, name: str):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)  # 之后访问已有属性时不再经过 __getattr__
+        return getattr(module, name)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self.__name__!r}>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """延迟引用模块：如果模块已经被引用则直接返回，否则返回在首次访问属性时才引用模块的代理"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
@@ -2,14 +2,88 @@
 MySQL 相关工具类
 """
 
-from typing import Tuple, Dict, Any
-from typing import Optional
+from __future__ import annotations
 
-import pymysql
-import pymysql.cursors
+import array
+import bisect
+import collections
+import csv
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Dict, Any, IO, List, Sequence, Union
+from typing import Optional
 
 from metasequoia.connector.rds_connector import RdsInstance, MysqlConnector
 from metasequoia.connector.ssh_tunnel import SshTunnel
+from metasequoia.utils.lazy_import_util import lazy_import
+
+pymysql = lazy_import("pymysql")
+
+_DDL_CACHE_MAX_SIZE = 4096
+_DDL_CACHE_TTL = 600  # DDL 缓存的最长有效期（秒），用于兜底版本无法反映的表结构变化
+_DDL_CACHE: "collections.OrderedDict[Tuple[str, int, str, str], Tuple[Any, Optional[str], float]]" = \
+    collections.OrderedDict()  # (host, port, 库, 表) -> (版本, DDL, 缓存时间)
+_DDL_CACHE_LOCK = threading.Lock()
+
+
+class RdsCatalog:
+    """RDS 实例的库表目录
+
+    每个数据库的表按表名排序后存储为并列的数组，表名和引擎名使用 sys.intern 驻留，以减少大量表时的内存占用
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, Tuple[str, ...]] = {}
+        self._engines: Dict[str, Tuple[Optional[str], ...]] = {}
+        self._rows: Dict[str, array.array] = {}  # 估算的行数，未知时为 -1
+        self._sizes: Dict[str, array.array] = {}  # 数据和索引的大小（字节），未知时为 -1
+
+    def add_schema(self, schema: str, records: List[Tuple[str, Optional[str], Optional[int], Optional[int]]]) -> None:
+        """添加数据库及其中表的（表名, 引擎, 估算行数, 大小），如果数据库已存在则合并"""
+        if schema in self._tables:  # 不区分大小写的排序规则可能使同一数据库的记录不连续
+            records = records + [(table, engine, rows if rows >= 0 else None, size if size >= 0 else None)
+                                 for table, engine, rows, size in zip(self._tables[schema], self._engines[schema],
+                                                                      self._rows[schema], self._sizes[schema])]
+        records = sorted(records, key=lambda record: record[0])
+        self._tables[schema] = tuple(sys.intern(record[0]) for record in records)
+        self._engines[schema] = tuple(sys.intern(record[1]) if record[1] is not None else None for record in records)
+        self._rows[schema] = array.array("q", (record[2] if record[2] is not None else -1 for record in records))
+        self._sizes[schema] = array.array("q", (record[3] if record[3] is not None else -1 for record in records))
+
+    def schemas(self, ignore_schema: Optional[List[str]] = None) -> List[str]:
+        """获取数据库列表"""
+        ignore_schema_set = set(ignore_schema) if ignore_schema is not None else set()
+        return [schema for schema in self._tables if schema not in ignore_schema_set]
+
+    def tables(self, schema: str) -> List[str]:
+        """获取数据库中的表名列表（按表名排序）"""
+        return list(self._tables.get(schema, ()))
+
+    def table_names(self, schema: str) -> Tuple[str, ...]:
+        """获取数据库中的表名元组（按表名排序），同一目录多次调用返回同一个对象，可以用于判断表名列表是否变化"""
+        return self._tables.get(schema, ())
+
+    def table_info(self, schema: str, table: str) -> Optional[Dict[str, Any]]:
+        """获取表的引擎、估算行数和大小，表不存在时返回 None"""
+        tables = self._tables.get(schema, ())
+        idx = bisect.bisect_left(tables, table)
+        if idx == len(tables) or tables[idx] != table:
+            return None
+        rows = self._rows[schema][idx]
+        size = self._sizes[schema][idx]
+        return {
+            "schema": schema,
+            "table": table,
+            "engine": self._engines[schema][idx],
+            "rows": rows if rows >= 0 else None,
+            "size": size if size >= 0 else None
+        }
+
+    def __len__(self) -> int:
+        """表的数量"""
+        return sum(len(tables) for tables in self._tables.values())
 
 
 def show_databases(rds_instance: RdsInstance):
@@ -26,11 +100,102 @@ def show_tables(rds_instance: RdsInstance, schema: str):
 
 def show_create_table(rds_instance: RdsInstance, schema: str, table: str, ssh_tunnel: Optional[SshTunnel] = None):
     """执行：SHOW CREATE TABLE"""
+    return show_create_tables(rds_instance, schema, [table])[table]
+
+
+def show_create_tables(rds_instance: RdsInstance,
+                       schema: str,
+                       tables: List[str],
+                       max_workers: int = 4) -> Dict[str, Optional[str]]:
+    """批量执行：SHOW CREATE TABLE
+
+    实现说明：
+    1. 先通过一次 information_schema 查询获取各表的 CREATE_TIME 和 UPDATE_TIME 作为版本，版本未变化且缓存时间在
+       _DDL_CACHE_TTL 以内的表直接使用缓存的 DDL
+    2. 只需要重新获取一张表时使用查询版本的连接直接获取；需要重新获取多张表时平均分给最多 max_workers 个线程，
+       每个线程从连接池中借出一个连接依次执行 SHOW CREATE TABLE
+    3. 无法获取版本的表（例如没有权限，或视图的 CREATE_TIME 为 NULL）每次都重新获取，且不缓存
+    4. 版本只是近似：INSTANT 算法的 ALTER TABLE 不改变 CREATE_TIME，MySQL 8.0 的 UPDATE_TIME 还受
+       information_schema_stats_expiry 的缓存影响，因此缓存的 DDL 最多使用 _DDL_CACHE_TTL 秒
+
+    Parameters
+    ----------
+    rds_instance : RdsInstance
+        RDS 实例
+    schema : str
+        数据库名称
+    tables : List[str]
+        表名列表
+    max_workers : int, default = 4
+        并发获取 DDL 的最大线程数（即最多同时使用的连接数）
+
+    Returns
+    -------
+    Dict[str, Optional[str]]
+        表名到 DDL 的映射，无法获取 DDL 的表为 None
+    """
+    def fetch_with_conn(chunk_conn: pymysql.Connection, chunk: List[str]) -> Dict[str, Optional[str]]:
+        chunk_result = {}
+        for chunk_table in chunk:
+            try:
+                chunk_result[chunk_table] = conn_show_create_table(chunk_conn, chunk_table)
+            except pymysql.err.ProgrammingError:  # 表不存在
+                chunk_result[chunk_table] = None
+        return chunk_result
+
+    def fetch(chunk: List[str]) -> Dict[str, Optional[str]]:
+        with MysqlConnector.create_by_rds_instance(rds_instance=rds_instance, schema=schema) as chunk_conn:
+            return fetch_with_conn(chunk_conn, chunk)
+
+    result = {}
+    missing = []
     with MysqlConnector.create_by_rds_instance(rds_instance=rds_instance, schema=schema) as conn:
-        return conn_show_create_table(conn, table)
+        versions = conn_get_table_versions(conn, schema, tables)
+
+        now = time.monotonic()
+        with _DDL_CACHE_LOCK:
+            for table in dict.fromkeys(tables):
+                key = (rds_instance.host, rds_instance.port, schema, table)
+                cached = _DDL_CACHE.get(key)
+                if (cached is not None and table in versions and cached[0] == versions[table]
+                        and now - cached[2] < _DDL_CACHE_TTL):
+                    _DDL_CACHE.move_to_end(key)
+                    result[table] = cached[1]
+                else:
+                    missing.append(table)
+
+        if len(missing) == 1:
+            result.update(fetch_with_conn(conn, missing))
+
+    if len(missing) > 1:
+        n_workers = max(min(max_workers, len(missing)), 1)
+        chunks = [missing[i::n_workers] for i in range(n_workers)]
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            for chunk_result in executor.map(fetch, chunks):
+                result.update(chunk_result)
 
+    if missing:
+        fetched_time = time.monotonic()
+        with _DDL_CACHE_LOCK:
+            for table in missing:
+                if table in versions and result[table] is not None:
+                    _DDL_CACHE[(rds_instance.host, rds_instance.port, schema, table)] = \
+                        (versions[table], result[table], fetched_time)
+            while len(_DDL_CACHE) > _DDL_CACHE_MAX_SIZE:
+                _DDL_CACHE.popitem(last=False)
 
-def conn_select_sql_as_dict(conn: pymysql.Connection, sql: str) -> Tuple[Dict[str, Any], ...]:
+    return {table: result[table] for table in tables}
+
+
+def load_catalog(rds_instance: RdsInstance) -> RdsCatalog:
+    """一次查询获取 RDS 实例的全部库表目录"""
+    with MysqlConnector.create_by_rds_instance(rds_instance=rds_instance) as conn:
+        return conn_load_catalog(conn)
+
+
+def conn_select_sql_as_dict(conn: pymysql.Connection, sql: str,
+                            params: Optional[Union[Sequence[Any], Dict[str, Any]]] = None
+                            ) -> Tuple[Dict[str, Any], ...]:
     """通过 MySQL 根据 WHERE 条件抽取数据
 
     Parameters
@@ -38,7 +203,9 @@ def conn_select_sql_as_dict(conn: pymysql.Connection, sql: str) -> Tuple[Dict[st
     conn : pymysql.Connection
         Mysql 连接
     sql : str
-        SQL 语句
+        SQL 语句，使用 params 时参数占位符为 %s 或 %(name)s，SQL 中的 % 需要写为 %%
+    params : Optional[Union[Sequence[Any], Dict[str, Any]]], default = None
+        SQL 语句的参数，由 pymysql 转义后填入占位符
 
     Returns
     -------
@@ -46,10 +213,84 @@ def conn_select_sql_as_dict(conn: pymysql.Connection, sql: str) -> Tuple[Dict[st
         根据 sql 和 query_data 读取的数据
     """
     with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-        cursor.execute(sql)
+        cursor.execute(sql, params)
         return cursor.fetchall()
 
 
+def conn_select_sql_to_csv(conn: pymysql.Connection,
+                           sql: str,
+                           file: IO[str],
+                           batch_size: int = 1000,
+                           null_value: str = "",
+                           max_rows: Optional[int] = None) -> int:
+    """通过 MySQL 执行查询，并将结果流式写入 csv 文件
+
+    使用无缓冲的服务端游标（SSCursor）按 batch_size 批量读取，内存占用与结果集大小无关。写入的 csv 文件符合 RFC-4180：
+    包含标题行，包含分隔符、引号或换行符的值会被引号包围，NULL 值写为 null_value。
+
+    Parameters
+    ----------
+    conn : pymysql.Connection
+        Mysql 连接
+    sql : str
+        SQL 语句
+    file : IO[str]
+        写入的文本文件，需要以 newline="" 打开
+    batch_size : int, default = 1000
+        每批读取的记录数
+    null_value : str, default = ""
+        NULL 值在 csv 文件中的值
+    max_rows : Optional[int], default = None
+        最多写入的记录数，为 None 时不限制；达到上限后不再写入，关闭游标时其余结果只读取并丢弃，不占用内存
+
+    Returns
+    -------
+    int
+        写入的记录数（不包括标题行）
+    """
+    writer = csv.writer(file)
+    n_rows = 0
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(sql)
+        writer.writerow([column[0] for column in cursor.description])
+        while max_rows is None or n_rows < max_rows:
+            rows = cursor.fetchmany(batch_size if max_rows is None else min(batch_size, max_rows - n_rows))
+            if not rows:
+                break
+            writer.writerows([null_value if value is None else value for value in row] for row in rows)
+            n_rows += len(rows)
+    return n_rows
+
+
+def conn_load_catalog(conn: pymysql.Connection, batch_size: int = 5000) -> RdsCatalog:
+    """通过 information_schema 一次查询获取全部库表目录
+
+    使用 SCHEMATA LEFT JOIN TABLES，使没有表的数据库也出现在目录中；使用无缓冲的服务端游标（SSCursor）流式读取，并按数据库
+    逐个写入 RdsCatalog，避免同时持有全部原始记录
+    """
+    catalog = RdsCatalog()
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute("SELECT s.SCHEMA_NAME, t.TABLE_NAME, t.ENGINE, t.TABLE_ROWS, t.DATA_LENGTH + t.INDEX_LENGTH "
+                       "FROM information_schema.SCHEMATA AS s "
+                       "LEFT JOIN information_schema.TABLES AS t ON t.TABLE_SCHEMA = s.SCHEMA_NAME "
+                       "ORDER BY s.SCHEMA_NAME")
+        schema, records = None, []
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for schema_name, table, engine, table_rows, size in rows:
+                if schema_name != schema:
+                    if schema is not None:
+                        catalog.add_schema(schema, records)
+                    schema, records = schema_name, []
+                if table is not None:
+                    records.append((table, engine, table_rows, size))
+        if schema is not None:
+            catalog.add_schema(schema, records)
+    return catalog
+
+
 def conn_show_databases(conn: pymysql.Connection):
     """执行 SHOW DATABASES 语句"""
     return [row["Database"] for row in conn_select_sql_as_dict(conn, "SHOW DATABASES")]
@@ -60,6 +301,28 @@ def conn_show_tables(conn: pymysql.Connection, schema: str):
     return [row[f"Tables_in_{schema}"] for row in conn_select_sql_as_dict(conn, "SHOW TABLES")]
 
 
+def conn_get_table_versions(conn: pymysql.Connection, schema: str,
+                            tables: Optional[Sequence[str]] = None) -> Dict[str, Tuple[Any, Any]]:
+    """获取数据库中各表的版本（CREATE_TIME, UPDATE_TIME），表结构变化时 CREATE_TIME 或 UPDATE_TIME 通常会变化
+
+    tables 不为 None 时只查询这些表；CREATE_TIME 为 NULL 的表（例如视图）无法判断是否变化，不包含在结果中
+    """
+    sql = ("SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME "
+           "FROM information_schema.TABLES "
+           "WHERE TABLE_SCHEMA = %s")
+    params: List[Any] = [schema]
+    if tables is not None:
+        tables = list(dict.fromkeys(tables))
+        if not tables:
+            return {}
+        sql += " AND TABLE_NAME IN (" + ", ".join(["%s"] * len(tables)) + ")"
+        params.extend(tables)
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {table: (create_time, update_time) for table, create_time, update_time in cursor.fetchall()
+                if create_time is not None}
+
+
 def conn_show_create_table(conn: pymysql.Connection, table: str) -> Optional[str]:
     """执行 SHOW CREATE TABLE 语句
 
@@ -0,0 +1,197 @@
+"""
+名称模糊搜索工具类
+
+用于在大量名称（表名、TOPIC、消费者组等）中按关键字搜索，返回按相关度排序的前 k 个结果。
+
+实现说明：
+1. 名称统一转为小写后建立三类索引：三元组（trigram）倒排索引、按名称排序的列表（用于前缀匹配）、按词排序的列表（用于词前缀匹配）；
+   名称按 `_`、`.`、`-` 等非字母数字字符切分为词
+2. 搜索时先通过索引召回候选名称，并过滤三元组重合比例过低的候选，只对剩余候选打分；
+   分数依次考虑：完全匹配 > 名称前缀匹配 > 子串匹配 > 关键字各词的词前缀匹配 > 三元组重合比例
+3. 名称列表变化时（例如缓存刷新）调用 update 增量更新索引，只处理新增和删除的名称
+"""
+
+import bisect
+import collections
+import heapq
+import itertools
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+__all__ = ["SearchIndex"]
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def _trigrams(text: str) -> Set[str]:
+    """计算字符串的三元组，首尾填充空格使短字符串和前缀也有三元组"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _tokens(text: str) -> List[str]:
+    return [token for token in _TOKEN_SPLIT.split(text) if token]
+
+
+class SearchIndex:
+    """名称的模糊搜索索引"""
+
+    MIN_TRIGRAM_RATIO = 0.5  # 通过三元组召回候选时，与关键字重合的三元组比例的最小值
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: Dict[int, str] = {}  # 名称 ID -> 名称
+        self._lowers: Dict[int, str] = {}  # 名称 ID -> 小写名称
+        self._ids: Dict[str, int] = {}  # 名称 -> 名称 ID
+        self._next_id = 0
+
+        self._trigram_postings: Dict[str, Set[int]] = {}  # 三元组 -> 名称 ID 集合
+        self._sorted_names: List[Tuple[str, int]] = []  # (小写名称, 名称 ID)，按小写名称排序
+        self._sorted_tokens: List[Tuple[str, int]] = []  # (词, 名称 ID)，按词排序
+
+        self._last_names: Optional[object] = None  # 最近一次 update 的名称列表，相同对象时跳过比较
+        self._lock = threading.RLock()
+
+        self.update(names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def update(self, names: Iterable[str]) -> None:
+        """将索引中的名称更新为 names：添加新增的名称，删除不存在的名称"""
+        with self._lock:
+            if names is self._last_names:
+                return
+            new_names = set(names)
+            for name in [name for name in self._ids if name not in new_names]:
+                self.remove(name)
+            added = [name for name in new_names if name not in self._ids]
+            if len(added) > 64:
+                # 批量添加时先追加到排序列表末尾再整体排序，避免逐个插入的 O(n) 移动
+                for name in added:
+                    self._add(name, insort=False)
+                self._sorted_names.sort()
+                self._sorted_tokens.sort()
+            else:
+                for name in added:
+                    self._add(name, insort=True)
+            self._last_names = names
+
+    def add(self, name: str) -> None:
+        """添加名称，名称已存在时不做任何处理"""
+        with self._lock:
+            if name not in self._ids:
+                self._add(name, insort=True)
+
+    def _add(self, name: str, insort: bool) -> None:
+        name_id = self._next_id
+        self._next_id += 1
+        self._names[name_id] = name
+        self._ids[name] = name_id
+
+        lower = name.lower()
+        tokens = set(_tokens(lower))
+        self._lowers[name_id] = lower
+        for trigram in _trigrams(lower):
+            self._trigram_postings.setdefault(trigram, set()).add(name_id)
+        sorted_items = [(lower, name_id)] + [(token, name_id) for token in tokens]
+        if insort:
+            bisect.insort(self._sorted_names, sorted_items[0])
+            for item in sorted_items[1:]:
+                bisect.insort(self._sorted_tokens, item)
+        else:
+            self._sorted_names.append(sorted_items[0])
+            self._sorted_tokens.extend(sorted_items[1:])
+
+    def remove(self, name: str) -> None:
+        """删除名称，名称不存在时不做任何处理"""
+        with self._lock:
+            name_id = self._ids.pop(name, None)
+            if name_id is None:
+                return
+            del self._names[name_id]
+            lower = self._lowers.pop(name_id)
+
+            for trigram in _trigrams(lower):
+                postings = self._trigram_postings.get(trigram)
+                if postings is not None:
+                    postings.discard(name_id)
+                    if not postings:
+                        del self._trigram_postings[trigram]
+            self._remove_sorted(self._sorted_names, (lower, name_id))
+            for token in set(_tokens(lower)):
+                self._remove_sorted(self._sorted_tokens, (token, name_id))
+
+    def names(self, k: Optional[int] = None) -> List[str]:
+        """按名称排序返回前 k 个名称，k 为 None 时返回全部名称"""
+        with self._lock:
+            items = self._sorted_names if k is None else self._sorted_names[:k]
+            return [self._names[name_id] for _, name_id in items]
+
+    def search(self, query: str, k: int = 20) -> List[str]:
+        """搜索与 query 最相关的前 k 个名称
+
+        Parameters
+        ----------
+        query : str
+            搜索关键字，多个词之间使用空格或其他非字母数字字符分隔
+        k : int, default = 20
+            返回的最大结果数
+
+        Returns
+        -------
+        List[str]
+            按相关度降序排列的名称；相关度相同时较短的名称在前
+        """
+        query = query.strip().lower()
+        if not query:
+            return self.names(k)
+        query_tokens = _tokens(query)
+        query_trigrams = _trigrams(query)
+
+        with self._lock:
+            # 三元组重合数量、词前缀匹配数量均使用 Counter 批量计数
+            shared = collections.Counter(itertools.chain.from_iterable(
+                self._trigram_postings.get(trigram, ()) for trigram in query_trigrams))
+            matched = collections.Counter(itertools.chain.from_iterable(
+                set(self._prefix_ids(self._sorted_tokens, token)) for token in query_tokens))
+
+            # 召回候选：名称前缀匹配、全部词前缀匹配或三元组重合比例达到阈值的名称
+            min_shared = max(1, int(len(query_trigrams) * self.MIN_TRIGRAM_RATIO))
+            candidates = {name_id for name_id, n_shared in shared.items() if n_shared >= min_shared}
+            candidates.update(name_id for name_id, n_matched in matched.items() if n_matched == len(query_tokens))
+            candidates.update(self._prefix_ids(self._sorted_names, query))
+
+            scored = []
+            for name_id in candidates:
+                lower = self._lowers[name_id]
+                score = shared[name_id] / len(query_trigrams) * 100
+                if query_tokens:
+                    score += matched[name_id] / len(query_tokens) * 200
+                if lower == query:
+                    score += 1000
+                elif lower.startswith(query):
+                    score += 500
+                elif query in lower:
+                    score += 300
+                name = self._names[name_id]
+                scored.append((score, -len(name), name))
+
+        return [name for _, _, name in heapq.nlargest(k, scored)]
+
+    @staticmethod
+    def _prefix_ids(sorted_items: List[Tuple[str, int]], prefix: str) -> Iterable[int]:
+        """在按字符串排序的列表中查找以 prefix 开头的元素"""
+        i = bisect.bisect_left(sorted_items, (prefix, -1))
+        while i < len(sorted_items) and sorted_items[i][0].startswith(prefix):
+            yield sorted_items[i][1]
+            i += 1
+
+    @staticmethod
+    def _remove_sorted(sorted_items: List[Tuple[str, int]], item: Tuple[str, int]) -> None:
+        i = bisect.bisect_left(sorted_items, item)
+        if i < len(sorted_items) and sorted_items[i] == item:
+            del sorted_items[i]
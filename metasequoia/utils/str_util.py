@@ -1,5 +1,154 @@
-def edit_distance(word1: str, word2: str) -> float:
-    """计算编辑距离"""
+"""
+字符串相关工具类
+
+编辑距离的实现说明：
+1. edit_distance 使用 Myers / Hyyrö 的位并行算法，将较短字符串的每个位置映射到整数的一个二进制位，每处理较长字符串的一个字符只需要常数次整数运算
+2. 指定 max_distance 时，先按长度差过滤，再在计算过程中根据当前得分的下界提前退出，超过阈值时返回 max_distance + 1
+3. edit_distance_batch 计算一个字符串与多个候选字符串的编辑距离，查询字符串的位掩码只计算一次；安装 NumPy 时可以使用在候选字符串维度上向量化的动态规划
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+__all__ = ["edit_distance", "edit_distance_batch"]
+
+
+def _build_peq(pattern: str) -> Dict[str, int]:
+    """计算每个字符在 pattern 中出现位置的位掩码"""
+    peq: Dict[str, int] = {}
+    for i, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    return peq
+
+
+def _myers(peq: Dict[str, int], m: int, text: str, max_distance: Optional[int]) -> int:
+    """使用位并行算法计算长度为 m 的模式串（位掩码为 peq）与 text 的编辑距离"""
+    n = len(text)
+    if m == 0:
+        return n
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    for j, char in enumerate(text):
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # 剩余 n - j - 1 列每列最多使得分减少 1，下界超过阈值时提前退出
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def edit_distance(word1: str, word2: str, max_distance: Optional[int] = None) -> int:
+    """计算编辑距离（Levenshtein 距离）
+
+    Parameters
+    ----------
+    word1 : str
+        字符串 1
+    word2 : str
+        字符串 2
+    max_distance : Optional[int], default = None
+        编辑距离的阈值，编辑距离超过阈值时提前退出并返回 max_distance + 1；为 None 时计算准确的编辑距离
+    """
+    if len(word1) > len(word2):
+        word1, word2 = word2, word1
+    if max_distance is not None and len(word2) - len(word1) > max_distance:
+        return max_distance + 1
+    return _myers(_build_peq(word1), len(word1), word2, max_distance)
+
+
+def edit_distance_batch(query: str,
+                        candidates: Sequence[str],
+                        max_distance: Optional[int] = None,
+                        use_numpy: Optional[bool] = None) -> List[int]:
+    """计算 query 与每个候选字符串的编辑距离
+
+    Parameters
+    ----------
+    query : str
+        查询字符串
+    candidates : Sequence[str]
+        候选字符串
+    max_distance : Optional[int], default = None
+        编辑距离的阈值，超过阈值的候选字符串返回 max_distance + 1
+    use_numpy : Optional[bool], default = None
+        是否使用 NumPy 向量化计算；为 None 时在安装了 NumPy 且候选字符串较多时使用
+
+    Returns
+    -------
+    List[int]
+        与 candidates 顺序一致的编辑距离
+    """
+    if use_numpy is None:
+        use_numpy = np is not None and len(candidates) >= 256
+    if use_numpy:
+        if np is None:
+            raise ImportError("edit_distance_batch(use_numpy=True) 需要安装 NumPy")
+        return _edit_distance_batch_numpy(query, candidates, max_distance)
+
+    # 以 query 作为模式串，位掩码只需要计算一次
+    peq = _build_peq(query)
+    m = len(query)
+    result = []
+    for candidate in candidates:
+        if max_distance is not None and abs(len(candidate) - m) > max_distance:
+            result.append(max_distance + 1)
+        else:
+            result.append(_myers(peq, m, candidate, max_distance))
+    return result
+
+
+def _edit_distance_batch_numpy(query: str, candidates: Sequence[str], max_distance: Optional[int]) -> List[int]:
+    """在候选字符串维度上向量化的两行动态规划"""
+    n_candidates = len(candidates)
+    if n_candidates == 0:
+        return []
+    lengths = np.fromiter((len(candidate) for candidate in candidates), dtype=np.int64, count=n_candidates)
+    max_length = int(lengths.max())
+
+    # 候选字符串按 Unicode 码点填充为矩阵，填充位置使用 -1，不会与任何字符相等
+    codes = np.full((n_candidates, max_length), -1, dtype=np.int64)
+    for i, candidate in enumerate(candidates):
+        if candidate:
+            codes[i, :len(candidate)] = np.frombuffer(candidate.encode("utf-32-le"), dtype=np.uint32)
+
+    previous = np.broadcast_to(np.arange(max_length + 1, dtype=np.int64), (n_candidates, max_length + 1)).copy()
+    current = np.empty_like(previous)
+    for i, char in enumerate(query, start=1):
+        # 替换和删除只依赖上一行，可以整行计算；插入依赖同一行左侧的值，需要逐列计算
+        substitute = previous[:, :-1] + (codes != ord(char))
+        delete = previous[:, 1:] + 1
+        current[:, 0] = i
+        current[:, 1:] = np.minimum(substitute, delete)
+        for j in range(1, max_length + 1):
+            np.minimum(current[:, j], current[:, j - 1] + 1, out=current[:, j])
+        previous, current = current, previous
+
+    result = previous[np.arange(n_candidates), lengths]
+    if max_distance is not None:
+        result = np.minimum(result, max_distance + 1)
+    return result.tolist()
+
+
+def _edit_distance_matrix(word1: str, word2: str) -> int:
+    """使用完整矩阵的动态规划计算编辑距离（用于校验和性能对比）"""
     m, n = len(word1), len(word2)
     dp = [[0] * (n + 1) for _ in range(m + 1)]
 
@@ -19,6 +168,39 @@ def edit_distance(word1: str, word2: str) -> float:
 
 
 if __name__ == "__main__":
+    import random
+    import string
+    import timeit
+
     print(edit_distance("cat", "cut"))  # 输出: 1
     print(edit_distance("sunday", "saturday"))  # 输出: 3
-    print(edit_distance("abcd", "efg"))  # 输出: 3
+    print(edit_distance("abcd", "efg"))  # 输出: 4
+    print(edit_distance("sunday", "saturday", max_distance=2))  # 输出: 3
+
+    # 性能对比：一个表名与 10000 个候选表名
+    random.seed(0)
+    words = ["ods", "dwd", "dws", "ads", "order", "user", "pay", "item", "detail", "shop", "refund", "di", "hi"]
+    catalog = ["_".join(random.choice(words) for _ in range(random.randint(2, 5))) for _ in range(10000)]
+    query_name = "dwd_order_detail_di"
+    expected = [_edit_distance_matrix(query_name, name) for name in catalog]
+    assert [edit_distance(query_name, name) for name in catalog] == expected
+    assert edit_distance_batch(query_name, catalog, use_numpy=False) == expected
+    if np is not None:
+        assert edit_distance_batch(query_name, catalog, use_numpy=True) == expected
+    assert all(edit_distance(a, b) == _edit_distance_matrix(a, b)
+               for a, b in ((("".join(random.choices(string.ascii_lowercase[:4], k=random.randint(0, 80))),
+                              "".join(random.choices(string.ascii_lowercase[:4], k=random.randint(0, 80))))
+                             for _ in range(1000))))
+
+    benchmarks = {
+        "完整矩阵动态规划": lambda: [_edit_distance_matrix(query_name, name) for name in catalog],
+        "位并行 edit_distance": lambda: [edit_distance(query_name, name) for name in catalog],
+        "位并行 edit_distance(max_distance=3)": lambda: [edit_distance(query_name, name, 3) for name in catalog],
+        "edit_distance_batch": lambda: edit_distance_batch(query_name, catalog, use_numpy=False),
+        "edit_distance_batch(max_distance=3)": lambda: edit_distance_batch(query_name, catalog, 3, use_numpy=False),
+    }
+    if np is not None:
+        benchmarks["edit_distance_batch(NumPy)"] = lambda: edit_distance_batch(query_name, catalog, use_numpy=True)
+    for benchmark_name, benchmark in benchmarks.items():
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=3))
+        print(f"{benchmark_name}: {seconds * 1000:.1f} ms")
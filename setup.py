@@ -16,7 +16,7 @@ setup(
     url="https://github.com/ChangxingJiang/metasequoia",
     install_requires=["kafka_python>=2.0.2",
                       "PyMySQL>=1.1.0",
-                      "sshtunnel>=0.4.0",
+                      "paramiko>=2.7.2",
                       "streamlit>=1.32.0",
                       "streamlit_app>=0.0.3",
                       "pyhive",